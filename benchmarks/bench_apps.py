@@ -0,0 +1,80 @@
+"""
+Overhead of `.Executable.execute`, hashing and command line parsing.
+"""
+
+import shutil
+import tempfile
+
+from compapp.apps import Computer
+from compapp.interface import Executable
+from compapp.parser import parse_assignment_options
+from compapp.plugins.datastores import HashDataStore, hexdigest
+
+from .bench_core import wide_class
+
+
+class NoOpExecutable(Executable):
+
+    def run(self):
+        pass
+
+
+class NoOpComputer(Computer):
+
+    def run(self):
+        pass
+
+
+class Execute(object):
+
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def time_executable(self):
+        NoOpExecutable().execute()
+
+    def time_computer(self):
+        NoOpComputer().execute()
+
+    def time_computer_with_datastore(self):
+        app = NoOpComputer()
+        app.datastore.dir = self.tmpdir
+        app.execute()
+
+
+class Hashing(object):
+
+    params = ([1, 10, 100],)
+    param_names = ['width']
+
+    def setup(self, width):
+        cls = type('Hashed', (wide_class(width),), {
+            'datastore': HashDataStore,
+        })
+        self.obj = cls()
+        self.obj.datastore.basedir = 'memo'
+        self.params = self.obj.params(nested=True)
+
+    def time_hexdigest(self, width):
+        hexdigest(self.params)
+
+    def time_hashdatastore_prepare(self, width):
+        self.obj.datastore.prepare()
+
+
+class ParseOptions(object):
+
+    params = ([10, 100, 1000],)
+    param_names = ['options']
+
+    def setup(self, options):
+        self.args = []
+        for i in range(options):
+            self.args.extend(['--sub{0}.x[{0}]'.format(i), str(i)])
+            self.args.extend(['--p{0}:leval='.format(i), '2**3'])
+
+    def time_parse_assignment_options(self, options):
+        parse_assignment_options(self.args)
@@ -0,0 +1,106 @@
+"""
+Throughput and ratio of the compression codecs of `.DumpResults`.
+
+The benchmarks follow the conventions of asv_ (airspeed velocity).
+To print a comparison table without asv, run::
+
+    python -m benchmarks.bench_compression
+
+.. _asv: https://asv.readthedocs.io
+
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+from compapp.plugins.recorders import Compression
+from compapp.plugins.serializers import registry
+
+SIZE = 10 ** 6
+
+
+def _arrays():
+    rng = numpy.random.RandomState(0)
+    t = numpy.linspace(0, 100, SIZE)
+    return {
+        # Random walk in 3D; typical simulation output.
+        'trajectory': numpy.cumsum(rng.standard_normal((SIZE, 3)), axis=0),
+        'smooth': numpy.sin(t) * numpy.exp(-t / 50),
+        'noise': rng.standard_normal(SIZE),
+        'integers': rng.randint(0, 100, SIZE),
+    }
+
+
+CODECS = {
+    'none': {},
+    'savez_compressed': dict(arrays='savez_compressed'),
+    'zlib-1': dict(arrays='zlib', level=1),
+    'zlib-6': dict(arrays='zlib', level=6),
+    'zlib-6-shuffle': dict(arrays='zlib', level=6, shuffle=True),
+    'lzma-0-shuffle': dict(arrays='lzma', level=0, shuffle=True),
+    'lzma-6-shuffle': dict(arrays='lzma', level=6, shuffle=True),
+}
+
+
+def serializer_for(codec):
+    return Compression(**CODECS[codec]).serializer_for(
+        'x', registry.get('npz'))
+
+
+class Codecs(object):
+
+    params = (['trajectory', 'smooth', 'noise', 'integers'], sorted(CODECS))
+    param_names = ['array', 'codec']
+    timeout = 300
+
+    def setup(self, array, codec):
+        self.array = _arrays()[array]
+        self.serializer = serializer_for(codec)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'x.' + self.serializer.ext)
+        self.serializer.save({'x': self.array}, self.path)
+
+    def teardown(self, array, codec):
+        shutil.rmtree(self.tmpdir)
+
+    def time_save(self, array, codec):
+        self.serializer.save({'x': self.array}, self.path)
+
+    def time_load(self, array, codec):
+        list(self.serializer.load(self.path, ['x']))
+
+    def track_ratio(self, array, codec):
+        return self.array.nbytes / float(os.path.getsize(self.path))
+    track_ratio.unit = 'ratio'
+
+
+def main():
+    bench = Codecs()
+    print('{0:<12} {1:<18} {2:>10} {3:>10} {4:>7}'.format(
+        'array', 'codec', 'save MB/s', 'load MB/s', 'ratio'))
+    for array in Codecs.params[0]:
+        for codec in Codecs.params[1]:
+            bench.setup(array, codec)
+            try:
+                megabytes = bench.array.nbytes / 1e6
+                start = time.time()
+                bench.time_save(array, codec)
+                save = megabytes / (time.time() - start)
+                start = time.time()
+                bench.time_load(array, codec)
+                load = megabytes / (time.time() - start)
+                ratio = bench.track_ratio(array, codec)
+            finally:
+                bench.teardown(array, codec)
+            print('{0:<12} {1:<18} {2:>10.1f} {3:>10.1f} {4:>7.2f}'.format(
+                array, codec, save, load, ratio))
+
+
+if __name__ == '__main__':
+    main()
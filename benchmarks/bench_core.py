@@ -0,0 +1,100 @@
+"""
+Overhead of `.Parametric` trees: construction, `params` and links.
+"""
+
+from compapp.core import Parametric
+from compapp.descriptors import Link, Delegate
+
+
+def wide_class(width):
+    """
+    A `.Parametric` with `width` scalar parameters and `width` children.
+    """
+    attrs = {'p{0}'.format(i): float(i) for i in range(width)}
+    for i in range(width):
+        attrs['c{0}'.format(i)] = type('Child{0}'.format(i), (Parametric,), {
+            'a': 1, 'b': 'b', 'c': [1, 2],
+        })
+    return type('Wide', (Parametric,), attrs)
+
+
+def deep_class(depth):
+    """
+    A chain of `depth` nested `.Parametric` classes.
+
+    Each level has a `Link` to the root and a `Delegate` to its owner.
+    """
+    cls = type('Leaf', (Parametric,), {
+        'x': 0, 'value': 0,
+        'root_x': Link('x'), 'parent_x': Link('..x'),
+        'delegated': Delegate(),
+    })
+    for i in range(depth):
+        cls = type('Level{0}'.format(i), (Parametric,), {
+            'x': i, 'delegated': i, 'child': cls,
+        })
+    return cls
+
+
+def leaf(obj):
+    while hasattr(type(obj), 'child'):
+        obj = obj.child
+    return obj
+
+
+class Construction(object):
+
+    params = ([1, 10, 100],)
+    param_names = ['size']
+
+    def setup(self, size):
+        self.wide = wide_class(size)
+        self.deep = deep_class(size)
+
+    def time_wide(self, size):
+        self.wide()
+
+    def time_deep(self, size):
+        self.deep()
+
+    def time_deep_access_leaf(self, size):
+        leaf(self.deep())
+
+
+class Params(object):
+
+    params = ([1, 10, 100],)
+    param_names = ['size']
+
+    def setup(self, size):
+        self.wide = wide_class(size)()
+        self.deep = deep_class(size)()
+        leaf(self.deep)  # instantiate all levels
+
+    def time_wide_nested(self, size):
+        self.wide.params(nested=True)
+
+    def time_deep_nested(self, size):
+        self.deep.params(nested=True)
+
+    def time_wide_flat(self, size):
+        self.wide.params()
+
+
+class Links(object):
+
+    params = ([1, 10, 100],)
+    param_names = ['depth']
+
+    def setup(self, depth):
+        self.root = deep_class(depth)()  # owners are weakly referenced
+        self.leaf = leaf(self.root)
+
+    def time_link_root(self, depth):
+        self.leaf.root_x
+
+    def time_link_parent(self, depth):
+        self.leaf.parent_x
+
+    def time_delegate(self, depth):
+        self.leaf.delegated
@@ -0,0 +1,55 @@
+"""
+Throughput of `.DumpResults` for various sizes of results.
+"""
+
+import shutil
+import tempfile
+
+import numpy
+
+from compapp.apps import Computer
+from compapp.plugins.recorders import DumpResults
+
+SIZES = [10, 10 ** 4, 10 ** 6]
+
+
+class ResultsApp(Computer):
+
+    size = 10
+    keys = 4
+
+    def run(self):
+        for i in range(self.keys):
+            self.results['a{0}'.format(i)] = numpy.arange(
+                self.size, dtype=float)
+        self.results.scalar = 1.0
+        self.results.label = 'label'
+
+
+class SaveLoad(object):
+
+    params = (SIZES, [0, 4])
+    param_names = ['size', 'workers']
+    timeout = 300
+
+    def setup(self, size, workers):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = ResultsApp(size=size)
+        self.app.datastore.dir = self.tmpdir
+        self.app.magics.dumpresults.workers = workers
+        self.app.execute()
+
+    def teardown(self, size, workers):
+        shutil.rmtree(self.tmpdir)
+
+    def time_save(self, size, workers):
+        errors = list(DumpResults.save_results(self.app, 'results',
+                                               workers=workers))
+        assert not errors
+
+    def time_load(self, size, workers):
+        app = ResultsApp(size=size)
+        app.mode = 'load'
+        app.datastore.dir = self.tmpdir
+        app.magics.dumpresults.workers = workers
+        app.execute()
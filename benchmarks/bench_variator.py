@@ -0,0 +1,55 @@
+"""
+Overhead of parameter sweeps by `.Variator` for each executor.
+"""
+
+import shutil
+import tempfile
+
+from compapp.apps import Computer
+from compapp.variator import Variator
+
+
+class Sum(Computer):
+
+    a = 1.0
+    b = 2.0
+
+    def run(self):
+        self.results.c = self.a + self.b
+
+    def run_batch(self, params):
+        return dict(c=params['a'] + self.b)
+
+
+class Sweep(object):
+
+    params = (['dumb', 'thread', 'process'], [10, 100])
+    param_names = ['executor', 'variants']
+    timeout = 300
+
+    def setup(self, executor, variants):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def teardown(self, executor, variants):
+        shutil.rmtree(self.tmpdir)
+
+    def _sweep(self, executor, variants, **kwds):
+        app = Variator(
+            classpath=__name__ + '.Sum',
+            builder=dict(ranges=dict(a=(variants,))),
+            executor=executor,
+            **kwds)
+        app.execute()
+        return app
+
+    def time_sweep(self, executor, variants):
+        self._sweep(executor, variants)
+
+    def time_sweep_with_datastore(self, executor, variants):
+        self._sweep(executor, variants, datastore=dict(dir=self.tmpdir))
+
+    def time_sweep_stream(self, executor, variants):
+        self._sweep(executor, variants, stream=True, chunksize=10)
+
+    def time_sweep_batch(self, executor, variants):
+        self._sweep(executor, variants, batch_size=10)
@@ -0,0 +1,204 @@
+"""
+Run the benchmarks without asv and write the results in JSON.
+
+The benchmark modules (``benchmarks/bench_*.py``) follow the asv_
+conventions, so they can also be run by ``asv run``.  This script is a
+dependency-free alternative which is handy for quick checks and for
+tracking numbers across releases::
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run -b 'bench_core\\.Params' --quick
+    python -m benchmarks.run -o new.json --compare old.json
+
+.. _asv: https://asv.readthedocs.io
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import glob
+import importlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def discover(pattern=None):
+    """
+    Yield ``(name, cls)`` of benchmark classes matching `pattern`.
+    """
+    for path in sorted(glob.glob(os.path.join(HERE, 'bench_*.py'))):
+        modname = os.path.splitext(os.path.basename(path))[0]
+        module = importlib.import_module(__package__ + '.' + modname)
+        for clsname, cls in sorted(vars(module).items()):
+            if not (inspect.isclass(cls) and cls.__module__ == module.__name__
+                    and benchmark_methods(cls)):
+                continue
+            name = modname + '.' + clsname
+            if pattern and not any(re.search(pattern, name + '.' + m)
+                                   for m in benchmark_methods(cls)):
+                continue
+            yield name, cls
+
+
+def benchmark_methods(cls):
+    return [m for m in sorted(dir(cls))
+            if m.startswith(('time_', 'track_'))]
+
+
+def param_combinations(cls):
+    params = getattr(cls, 'params', ())
+    if params and not isinstance(params[0], (list, tuple)):
+        params = (params,)  # asv allows a single list of parameters
+    names = getattr(cls, 'param_names', None) or [
+        'param{0}'.format(i + 1) for i in range(len(params))]
+    for values in itertools.product(*params):
+        yield names, values
+
+
+def measure(func, repeat, min_time):
+    """
+    Time `func` like `timeit` and return ``(number, samples)``.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    # Increase `number` until one sample takes at least `min_time`:
+    while min_time > 0 and timer.timeit(number) < min_time:
+        number *= 10
+    samples = [t / number for t in timer.repeat(repeat, number)]
+    return number, samples
+
+
+def run_benchmarks(pattern=None, repeat=5, min_time=0.2):
+    """
+    Run benchmarks and yield results as JSON-friendly `dict`\\ s.
+    """
+    for name, cls in discover(pattern):
+        methods = [m for m in benchmark_methods(cls)
+                   if not pattern or re.search(pattern, name + '.' + m)]
+        for names, values in param_combinations(cls):
+            bench = cls()
+            if hasattr(bench, 'setup'):
+                try:
+                    bench.setup(*values)
+                except NotImplementedError:
+                    continue  # asv convention to skip the benchmark
+            try:
+                for method in methods:
+                    func = getattr(bench, method)
+                    result = dict(
+                        name=name + '.' + method,
+                        params=dict(zip(names, values)),
+                    )
+                    if method.startswith('track_'):
+                        result.update(
+                            type='track', value=func(*values),
+                            unit=getattr(func, 'unit', 'unit'))
+                    else:
+                        number, samples = measure(
+                            lambda: func(*values), repeat, min_time)
+                        samples.sort()
+                        result.update(
+                            type='time', unit='seconds', number=number,
+                            min=samples[0],
+                            median=samples[len(samples) // 2],
+                            samples=samples)
+                    yield result
+            finally:
+                if hasattr(bench, 'teardown'):
+                    bench.teardown(*values)
+
+
+def environment():
+    import compapp
+    from compapp.plugins.vcs import getvcs
+    vcs = getvcs(compapp.__file__, 'direct')
+    return dict(
+        compapp_version=compapp.__version__,
+        revision=vcs and vcs.revision(),
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        node=platform.node(),
+        date=datetime.datetime.utcnow().isoformat() + 'Z',
+    )
+
+
+def result_key(result):
+    return (result['name'], json.dumps(result['params'], sort_keys=True))
+
+
+def format_result(result):
+    params = ', '.join('{0}={1}'.format(k, v)
+                       for k, v in sorted(result['params'].items()))
+    label = result['name'] + ('({0})'.format(params) if params else '')
+    if result['type'] == 'time':
+        value = '{0:12.3f} us'.format(result['median'] * 1e6)
+    else:
+        value = '{0:12.3f} {1}'.format(result['value'], result['unit'])
+    return '{0:<80} {1}'.format(label, value)
+
+
+def compare(results, old):
+    """
+    Print the ratio of median time (new / old) for each benchmark.
+    """
+    old = {result_key(r): r for r in old['results'] if r['type'] == 'time'}
+    for result in results:
+        prev = old.get(result_key(result))
+        if result['type'] != 'time' or prev is None:
+            continue
+        ratio = result['median'] / prev['median']
+        mark = '+' if ratio > 1.1 else '-' if ratio < 1 / 1.1 else ' '
+        print('{0} {1:6.2f}  {2}'.format(mark, ratio,
+                                         format_result(result)))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=__doc__)
+    parser.add_argument(
+        '--bench', '-b', metavar='REGEX',
+        help='run only benchmarks whose name matches REGEX')
+    parser.add_argument(
+        '--output', '-o', metavar='FILE',
+        help='write results to FILE in JSON')
+    parser.add_argument(
+        '--compare', metavar='FILE',
+        help='compare with results in FILE written by --output')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--quick', action='store_true',
+        help='run each benchmark only once (for smoke testing)')
+    ns = parser.parse_args(args)
+
+    repeat, min_time = (1, 0) if ns.quick else (ns.repeat, 0.2)
+    results = []
+    for result in run_benchmarks(ns.bench, repeat=repeat,
+                                 min_time=min_time):
+        print(format_result(result))
+        sys.stdout.flush()
+        results.append(result)
+
+    if ns.output:
+        with open(ns.output, 'w') as file:
+            json.dump(dict(environment(), results=results), file,
+                      indent=1, sort_keys=True)
+    if ns.compare:
+        with open(ns.compare) as file:
+            print()
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
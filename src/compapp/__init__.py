@@ -15,4 +15,5 @@ from .plugins import *
 from .apps import *
 from .variator import Variator
 from .interactive import *
-from .loader import load
+from .loader import load, load_many
+from .reader import read
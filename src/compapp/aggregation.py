@@ -0,0 +1,262 @@
+"""
+Columnar tables of sweep parameters and scalar results.
+
+`TableWriter` appends one row per variant to a JSON-lines spool file
+as soon as the variant finishes, so that the rows survive
+interruption.  When it is closed, the rows are converted to a
+columnar file (``.npz``, ``.hdf5`` or ``.parquet``) which can be read
+in one go by `read_table`.
+
+"""
+
+import json
+import os
+import sys
+
+from .base import nesteditems
+from .utils.files import safewrite
+
+basic_scalars = (int, float, bool, str, type(None))
+if sys.version_info[0] == 2:
+    basic_scalars += (long, unicode)  # noqa
+
+
+def flatten(dct):
+    """
+    Flatten a nested `dict` using dotted keys.
+
+    >>> flatten({'a': 1, 'b': {'c': 2}}) == {'a': 1, 'b.c': 2}
+    True
+
+    """
+    return dict(('.'.join(keys), val) for keys, val in nesteditems(dct))
+
+
+def getdotted(obj, dotted):
+    for name in dotted.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def tabular(value, max_size=16):
+    """
+    Convert `value` to a JSON-friendly value if it fits in a table cell.
+
+    Scalars and arrays with at most `max_size` elements are accepted.
+    `None` is returned for other values.
+
+    >>> import numpy
+    >>> tabular(numpy.float64(0.5)), tabular(numpy.arange(3))
+    (0.5, [0, 1, 2])
+    >>> tabular(numpy.arange(100)) is None
+    True
+
+    """
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, numpy.generic):
+        return value.item()
+    if isinstance(value, basic_scalars):
+        return value
+    if numpy is None:
+        return None
+    if (isinstance(value, numpy.ndarray) and value.size <= max_size
+            and not value.dtype.hasobject):
+        return value.tolist()
+    return None
+
+
+def table_row(app, index, param_keys, max_size=16, results='results'):
+    """
+    Make a row of the table from an executed `app`.
+
+    The row has the column ``index``, dotted parameter names in
+    `param_keys` and ``results.<key>`` for each tabular result.
+
+    """
+    row = {'index': index}
+    for key in param_keys:
+        row[key] = tabular(getdotted(app, key), max_size)
+    for key, value in getattr(app, results, {}).__dict__.items():
+        value = tabular(value, max_size)
+        if value is not None:
+            row[results + '.' + key] = value
+    return row
+
+
+def _column(values):
+    import numpy
+    present = [v for v in values if v is not None]
+    if len(present) < len(values) and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            for v in present):
+        values = [float('nan') if v is None else v for v in values]
+    try:
+        column = numpy.asarray(values)
+    except ValueError:  # ragged arrays
+        column = None
+    if column is None or column.dtype.hasobject:
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+    return column
+
+
+def columns(rows):
+    """
+    Convert a list of rows (`dict`) to an ordered list of columns.
+    """
+    names = sorted(set(k for row in rows for k in row),
+                   key=lambda k: (k != 'index', k.startswith('results.'), k))
+    return [(name, _column([row.get(name) for row in rows]))
+            for name in names]
+
+
+def available_formats():
+    formats = ['npz']
+    for fmt, module in [('hdf5', 'tables'), ('parquet', 'pyarrow')]:
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        formats.append(fmt)
+    return formats
+
+
+def resolve_format(format):
+    if format == 'auto':
+        return 'parquet' if 'parquet' in available_formats() else 'npz'
+    return format
+
+
+def _dataframe(cols):
+    import pandas
+    data = {}
+    for name, column in cols:
+        data[name] = list(column) if column.ndim > 1 else column
+    return pandas.DataFrame(data, columns=[name for name, _ in cols])
+
+
+def write_table(rows, path, format='npz'):
+    """
+    Write `rows` to `path` in a columnar `format`.
+    """
+    cols = columns(rows)
+    if format == 'npz':
+        import numpy
+        with safewrite(path, 'wb') as file:
+            numpy.savez(file, **dict(cols))
+    elif format == 'hdf5':
+        _dataframe(cols).to_hdf(path, key='table', mode='w')
+    elif format == 'parquet':
+        with safewrite(path, 'wb') as file:
+            _dataframe(cols).to_parquet(file)
+    else:
+        raise ValueError('Unknown table format: {0!r}'.format(format))
+
+
+class TableWriter(object):
+
+    """
+    Write rows incrementally and convert them to a columnar file.
+
+    >>> getfixture('cleancwd')
+    >>> writer = TableWriter('table', 'npz')
+    >>> writer.append({'index': 0, 'a': 1.0, 'results.x': [0, 1]})
+    >>> writer.append({'index': 1, 'a': 2.0, 'results.x': [2, 3]})
+    >>> sorted(os.listdir('.'))
+    ['table.jsonl']
+    >>> writer.close()
+    >>> sorted(os.listdir('.'))
+    ['table.npz']
+    >>> table = read_table('table.npz', 'dict')
+    >>> table['results.x']
+    array([[0, 1],
+           [2, 3]])
+
+    """
+
+    def __init__(self, basepath, format='auto'):
+        self.format = resolve_format(format)
+        self.path = basepath + '.' + self.format
+        self.spoolpath = basepath + '.jsonl'
+        self._spool = open(self.spoolpath, 'w')
+
+    def append(self, row):
+        self._spool.write(json.dumps(row) + '\n')
+        self._spool.flush()
+
+    def close(self):
+        if self._spool is None:
+            return
+        self._spool.close()
+        self._spool = None
+        # Rows may be appended in the order of completion:
+        rows = sorted(read_rows(self.spoolpath),
+                      key=lambda row: row.get('index', 0))
+        write_table(rows, self.path, self.format)
+        os.remove(self.spoolpath)
+
+
+def read_rows(path):
+    with open(path) as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # incomplete line (e.g., crash while writing)
+
+
+def find_table(path):
+    if not os.path.isdir(path):
+        return path
+    for ext in ['npz', 'hdf5', 'parquet', 'jsonl']:
+        candidate = os.path.join(path, 'table.' + ext)
+        if os.path.exists(candidate):
+            return candidate
+    raise IOError('No table found in {0}'.format(path))
+
+
+def read_table(path, kind='dataframe'):
+    """
+    Read a table written by `TableWriter`.
+
+    Parameters
+    ----------
+    path : str
+        Path to a table file or a directory of a sweep.  The spool
+        file (``table.jsonl``) of an interrupted sweep can also be
+        read.
+    kind : {'dataframe', 'structured', 'dict'}
+        Return `pandas.DataFrame`, numpy structured array, or `dict`
+        of columns.
+
+    """
+    path = find_table(path)
+    ext = os.path.splitext(path)[1]
+    if ext == '.npz':
+        import numpy
+        with numpy.load(path, allow_pickle=True) as npz:
+            cols = [(name, npz[name]) for name in npz.files]
+    elif ext == '.jsonl':
+        cols = columns(list(read_rows(path)))
+    else:
+        import pandas
+        if ext == '.hdf5':
+            df = pandas.read_hdf(path, 'table')
+        else:
+            df = pandas.read_parquet(path)
+        if kind == 'dataframe':
+            return df
+        cols = [(name, _column(list(df[name]))) for name in df.columns]
+
+    if kind == 'dataframe':
+        return _dataframe(cols)
+    elif kind == 'dict':
+        return dict(cols)
+    elif kind == 'structured':
+        import numpy
+        dtype = [(name, c.dtype, c.shape[1:]) for name, c in cols]
+        table = numpy.empty(len(cols[0][1]) if cols else 0, dtype=dtype)
+        for name, column in cols:
+            table[name] = column
+        return table
+    raise ValueError('Unknown kind: {0!r}'.format(kind))
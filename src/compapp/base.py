@@ -232,12 +232,21 @@ def setnestedattr(obj, dct, emptydict=False):
     >>> a.f
     3
 
+    Missing keys of a `dict` are created:
+
+    >>> a.g = {}
+    >>> setnestedattr(a, dict(g=dict(h=dict(i=1))))
+    >>> a.g
+    {'h': {'i': 1}}
+
     """
     for keys, val in nesteditems(dct, emptydict=emptydict):
         holder = obj
         for k in keys[:-1]:
             if hasattr(holder, k):
                 holder = getattr(holder, k)
+            elif isinstance(holder, dict):
+                holder = holder.setdefault(k, {})
             else:
                 holder = holder[k]
             # FIXME: find a better approach (& rename setnestedattr)
@@ -110,6 +110,46 @@ def cli_mrun(path, args):
     app.cli(args)
 
 
+def cli_status(root, stale, as_json):
+    """
+    Summarize progress of jobs under directory `root`.
+
+    It reads heartbeat files written by `.Heartbeat` plugin.  The app
+    code is not imported.
+
+    """
+    from .plugins.heartbeat import summarize_heartbeats, format_heartbeats
+    summaries = summarize_heartbeats(root, stale=stale)
+    if as_json:
+        import json
+        print(json.dumps(summaries, indent=2, sort_keys=True))
+    else:
+        print(format_heartbeats(summaries))
+
+
+def cli_worker(queue, idle, lease, max_tasks):
+    """
+    Execute variants submitted to a queue directory by `mrun`.
+
+    Run this command on any number of nodes which can see `queue`
+    (e.g., via a network file system) to execute a sweep by the
+    ``'queue'`` executor::
+
+      capp mrun DOTTED.PATH.TO.A.CLASS -- \\
+          --executor queue --datastore.dir OUT --queue_dir QUEUE
+      capp worker QUEUE
+
+    Each worker executes one variant at a time; run several workers
+    to use multiple cores.  Running workers exit when the queue is
+    stopped by writing a new token to the file :file:`QUEUE/STOP`
+    (e.g., ``uuidgen > QUEUE/STOP``; see `.FileQueue.stop`).
+
+    """
+    from .utils.filequeue import FileQueue, work
+    work(FileQueue(queue, lease=lease), idle=idle, max_tasks=max_tasks,
+         log=print)
+
+
 def make_parser(doc=__doc__):
     import argparse
 
@@ -161,6 +201,39 @@ def make_parser(doc=__doc__):
     p = subp('mrun', cli_mrun)
     run_arguments(p)
 
+    p = subp('status', cli_status)
+    p.add_argument(
+        'root', nargs='?', default='.',
+        help="directory to be searched for heartbeat files")
+    p.add_argument(
+        '--stale', type=float, default=60,
+        help="""
+        report running jobs not updated for this many seconds as stale
+        """)
+    p.add_argument(
+        '--json', dest='as_json', action='store_true',
+        help="print summaries in JSON")
+
+    p = subp('worker', cli_worker)
+    p.add_argument(
+        'queue',
+        help="directory of the queue (`Variator.queue_dir`)")
+    p.add_argument(
+        '--idle', type=float, default=0,
+        help="""
+        exit if there is no task for this many seconds (0 means to
+        wait forever)
+        """)
+    p.add_argument(
+        '--lease', type=float, default=60,
+        help="""
+        lease of the queue (`Variator.queue_lease`) in seconds; a
+        heartbeat is sent every third of it
+        """)
+    p.add_argument(
+        '--max-tasks', type=int, default=0,
+        help="exit after executing this many tasks (0 means no limit)")
+
     return parser
 
 
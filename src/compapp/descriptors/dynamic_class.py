@@ -37,14 +37,20 @@ class ClassPath(DataDescriptor):
         self.getclass(obj)
         return ret
 
-    def getclass(self, obj):
+    def resolve(self, obj):
+        """
+        Return the full dotted path (relative path is resolved).
+        """
         path = self.get(obj)
         if path.startswith('.'):
             if self.prefix is None:
                 raise ValueError('relative import path is specified but no'
                                  ' prefix is defined.')
             path = self.prefix + path
-        return import_object(path)
+        return path
+
+    def getclass(self, obj):
+        return import_object(self.resolve(obj))
 
 
 class ClassPlaceholder(DataDescriptor):
@@ -17,10 +17,12 @@ class MagicPlugins(PluginWrapper):
         DumpResults as dumpresults,
         RecordVCS as recordvcs,
         RecordTiming as recordtiming,
+        RecordProfile as profile,
         RecordProgramInfo as programinfo,
         RecordSysInfo as sysinfo,
         DumpParameters as dumpparameters,
         AutoUpstreams as autoupstreams,
+        Heartbeat as heartbeat,
     )
 
 
@@ -78,6 +80,21 @@ class Assembler(Executable):
         return (self.mode == 'load' or
                 self.mode == 'auto' and self.is_loadable())
 
+    def progress(self, fraction=None, **metrics):
+        """
+        Report progress of `.run`; see `.Heartbeat`.
+
+        Parameters
+        ----------
+        fraction : float, optional
+            Fraction (0 to 1) of the work done.  It is used to
+            estimate the time of completion.
+        metrics
+            Any JSON-serializable values to be shown (e.g., ``loss``).
+
+        """
+        self.magics.heartbeat.update(fraction, **metrics)
+
     def is_loadable(self):
         """
         |TO BE EXTENDED| Return `True` if `self` is loadable.
@@ -1,8 +1,9 @@
+import glob
 import os
-import json
 
 from .plugins.metastore import MetaStore
 from .utils.importer import import_object
+from .utils.pool import imap_bounded
 
 
 def _meta_path(path):
@@ -18,13 +19,16 @@ def _meta_path(path):
         raise RuntimeError("Meta file not found at: {}".format(path))
 
 
-def load(path):
+def load(path, keys=None):
     """
     Load result saved at `path`.
 
     `path` can be a path to a datastore directory, a path to a
     params.json file, or a path to a meta.json file.
 
+    If a list of result names is given as `keys`, only these results
+    are loaded (see `.DumpResults.load_keys`).
+
     Examples
     --------
     .. Run the code below in a clean temporary directory:
@@ -46,19 +50,129 @@ def load(path):
     >>> assert load('out').results == app.results
     >>> assert load('out/meta.json').results == app.results
     >>> assert load('out/params.json').results == app.results
+    >>> load('out', keys=['y']).results.y
+    1
 
     .. rewind the hack:
        >>> del sys.modules[__name__].MyApp
 
     """
     metapath = _meta_path(path)
-    with open(metapath) as file:
-        meta = json.load(file)
+    meta = MetaStore.read(metapath)
     classname = meta['programinfo']['class']
     module = meta['programinfo']['module']
     cls = import_object(module + '.' + classname)
     app = cls()
     app.mode = 'load'
     app.datastore.dir = os.path.dirname(metapath)
+    if keys is not None:
+        app.magics.dumpresults.load_keys = keys
     app.execute()
     return app
+
+
+def _load_one(args):
+    loader, path, keys = args
+    try:
+        if loader == 'read':
+            from .reader import read
+            run = read(path)
+            run.meta  # noqa; load now, i.e., in the worker
+            for key in (run.results if keys is None else keys):
+                run.results[key]
+        else:
+            run = load(path, keys=keys)
+    except Exception as err:
+        return (path, None, err)
+    return (path, run, None)
+
+
+def load_many(paths, keys=None, workers=0, executor='thread',
+              loader='load', window=None):
+    """
+    Load many saved runs concurrently and yield them one by one.
+
+    Each item is a tuple ``(path, run, error)``.  If loading `path`
+    failed (e.g., the run is missing or corrupted), `run` is `None`
+    and `error` is the exception; the iteration is not stopped.
+
+    Parameters
+    ----------
+    paths : str or iterable of str
+        A glob pattern or paths (see `load` for what `path` can be).
+    keys : list of str, optional
+        Names of results to be loaded.  Load all results if `None`.
+    workers : int
+        Number of workers.  If 0, runs are loaded in the current
+        thread.
+    executor : {'thread', 'process'}
+        Kind of the pool of workers.
+    loader : {'load', 'read'}
+        ``'load'`` yields app objects created by `load`.  ``'read'``
+        yields `.SavedRun` objects created by `.read`, which is much
+        faster since the app classes are not used.  The results in
+        `keys` (or all results) are loaded in the workers.  The
+        ``'process'`` executor requires ``'read'`` since app objects
+        cannot be sent across processes.
+    window : int, optional
+        Maximum number of runs loaded ahead of the consumer (default:
+        ``4 * workers``).  It bounds the memory usage.  Runs are
+        yielded in the order of `paths`.
+
+    Examples
+    --------
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp import Computer
+    >>> class MyApp(Computer):
+    ...     x = 1
+    ...     def run(self):
+    ...         self.results.y = self.x ** 2
+    >>> for x in range(3):
+    ...     app = MyApp(x=x)
+    ...     app.datastore.dir = 'out/{0}'.format(x)
+    ...     app.execute()
+
+    >>> for path, run, error in load_many('out/*', loader='read',
+    ...                                   workers=2):
+    ...     print(path, run.results.y)
+    out/0 0
+    out/1 1
+    out/2 4
+
+    >>> [error for (_, _, error) in load_many(['out/0', 'missing'],
+    ...                                       loader='read')]
+    ...                                     # doctest: +NORMALIZE_WHITESPACE
+    [None, RuntimeError('Meta file not found at: ...missing')]
+
+    """
+    if loader not in ('load', 'read'):
+        raise ValueError('loader must be "load" or "read": got {0!r}'
+                         .format(loader))
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths))
+    tasks = ((loader, path, keys) for path in paths)
+
+    if workers <= 0:
+        for task in tasks:
+            yield _load_one(task)
+        return
+
+    if executor == 'thread':
+        # Note: multiprocessing.dummy implements threading pool
+        from multiprocessing.dummy import Pool
+    elif executor == 'process':
+        if loader != 'read':
+            raise ValueError('executor="process" requires loader="read"')
+        from multiprocessing import Pool
+    else:
+        raise ValueError('executor must be "thread" or "process": got {0!r}'
+                         .format(executor))
+    pool = Pool(workers)
+    try:
+        for item in imap_bounded(pool, _load_one, tasks,
+                                 window or 4 * workers):
+            yield item
+    finally:
+        pool.terminate()
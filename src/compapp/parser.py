@@ -142,7 +142,10 @@ def assign_option(obj, lhs, rhs):
     if isinstance(root, ast.Attribute):
         assign_to_attr(holder, root.attr, parse_value(holder, root.attr, rhs))
     elif isinstance(root, ast.Subscript):
-        idx = ast.literal_eval(root.slice.value)
+        index = root.slice
+        if not isinstance(index, ast.expr):  # ast.Index (Python < 3.9)
+            index = index.value
+        idx = ast.literal_eval(index)
         holder[idx] = rhs
         # FIXME: somehow parse_value has to be called like above, but how?
     else:
@@ -3,6 +3,8 @@ from .recorders import *
 from .misc import *
 from .vcs import RecordVCS
 from .timing import RecordTiming
+from .profiling import RecordProfile
+from .heartbeat import Heartbeat
 from .programinfo import RecordProgramInfo
 from .sysinfo import RecordSysInfo
 from .metastore import MetaStore
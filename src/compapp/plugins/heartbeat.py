@@ -0,0 +1,213 @@
+from socket import gethostname
+import json
+import os
+import time
+
+from ..interface import Plugin
+from ..descriptors import Link, Root, OfType
+from ..utils.files import safewrite
+from .misc import real_owner
+
+
+class Heartbeat(Plugin):
+
+    """
+    Write progress of the owner app to :file:`heartbeat.json`.
+
+    This plugin is disabled by default; set `enabled` to true to use
+    it.  Call
+    `.Assembler.progress` (or `.update`) from `.run` to report
+    progress.  Updates are rate-limited; the file is rewritten (using
+    `.safewrite`) at most once in `interval` seconds.  The root app
+    always writes the file at start and at the end of the run, so
+    that ``capp status`` can list running, finished and failed jobs.
+    Calling `.update` while the owner is not running (e.g., in the
+    ``'load'`` mode) does nothing.
+
+    Example
+    -------
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp.apps import Computer
+    >>> class MyApp(Computer):
+    ...     def run(self):
+    ...         for i in range(10):
+    ...             self.progress((i + 1) / 10.0, loss=1.0 / (i + 1))
+    >>> app = MyApp()
+    >>> app.datastore.dir = 'out'
+    >>> app.magics.heartbeat.enabled = True
+    >>> app.execute()
+    >>> beat = read_heartbeat('out/heartbeat.json')
+    >>> beat['status'], beat['fraction'], beat['metrics']
+    ('finished', 1.0, {'loss': 0.1})
+
+    """
+
+    datastore = Link('..datastore')
+    root = Root()
+
+    enabled = OfType(bool, default=False, isparam=False)
+    """
+    Write the heartbeat file.  It is disabled by default since it
+    writes the file (at least) twice for each app.  This is not a
+    parameter so that monitoring does not change, e.g., the hash of
+    `.Memoizer`.
+    """
+
+    interval = OfType(int, float, default=5, isparam=False)
+    """
+    Minimum interval (in seconds) between writes of the heartbeat file.
+    """
+
+    filename = 'heartbeat.json'
+
+    beat = None
+    """
+    Current heartbeat (`dict`); `None` if not running.
+    """
+
+    def pre_run(self):
+        self.beat = None
+        if not self.enabled:
+            return
+        self.beat = dict(
+            status='running',
+            pid=os.getpid(),
+            hostname=gethostname(),
+            started=time.time(),
+            interval=self.interval,
+            fraction=None,
+            eta=None,
+            metrics={},
+            count=0,
+        )
+        self._written = None
+        if real_owner(self) is self.root:
+            self.write()
+        real_owner(self).defer()(self._failed)
+
+    def update(self, fraction=None, **metrics):
+        """
+        Update `fraction` (0 to 1) of the work done and `metrics`.
+        """
+        beat = self.beat
+        if beat is None:
+            return
+        now = time.time()
+        beat['count'] += 1
+        beat['metrics'].update(metrics)
+        if fraction is not None:
+            beat['fraction'] = fraction
+            elapsed = now - beat['started']
+            if fraction > 0:
+                beat['eta'] = now + elapsed * (1 - fraction) / fraction
+        if (self._written is None or now - self._written >= self.interval
+                or fraction is not None and fraction >= 1):
+            self.write(now)
+
+    def write(self, now=None):
+        if not self.datastore.is_writable():
+            return
+        now = time.time() if now is None else now
+        self.beat['updated'] = now
+        with safewrite(self.datastore.path(self.filename)) as file:
+            json.dump(self.beat, file)
+        self._written = now
+
+    def post_run(self):
+        if self.beat is None:
+            return
+        self.beat['status'] = 'finished'
+        if self._written is not None or real_owner(self) is self.root:
+            self.write()
+
+    def finish(self):
+        self.beat = None
+
+    def _failed(self):
+        if self.beat is None:  # finished
+            return
+        if self.beat['status'] == 'running' and self._written is not None:
+            self.beat['status'] = 'failed'
+            self.write()
+        self.beat = None
+
+
+def read_heartbeat(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def find_heartbeats(root, filename=Heartbeat.filename):
+    """
+    Yield paths to heartbeat files under the directory `root`.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if filename in filenames:
+            yield os.path.join(dirpath, filename)
+
+
+def summarize_heartbeats(root, now=None, stale=60,
+                         filename=Heartbeat.filename):
+    """
+    Read heartbeat files under `root` and return a list of `dict`.
+
+    A running job is reported as ``'stale'`` if its heartbeat file is
+    not updated for `stale` seconds or three times of its update
+    interval, whichever is longer.  Importing the app is not required.
+
+    """
+    now = time.time() if now is None else now
+    summaries = []
+    for path in find_heartbeats(root, filename):
+        try:
+            beat = read_heartbeat(path)
+        except ValueError:
+            continue
+        age = now - beat.get('updated', beat['started'])
+        status = beat['status']
+        if status == 'running' and age > max(stale, 3 * beat['interval']):
+            status = 'stale'
+        summaries.append(dict(
+            beat,
+            path=os.path.relpath(os.path.dirname(path), root),
+            status=status,
+            age=age,
+            elapsed=beat.get('updated', now) - beat['started'],
+        ))
+    return summaries
+
+
+def format_heartbeats(summaries, now=None):
+    """
+    Format `summaries` (see `summarize_heartbeats`) as a table.
+    """
+    now = time.time() if now is None else now
+
+    def fmtdur(seconds):
+        seconds = int(round(seconds))
+        return '{0}:{1:02d}:{2:02d}'.format(
+            seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+    rows = [('PATH', 'STATUS', 'PROGRESS', 'ELAPSED', 'ETA', 'METRICS')]
+    for s in summaries:
+        fraction = s.get('fraction')
+        eta = s.get('eta')
+        rows.append((
+            s['path'],
+            s['status'],
+            '-' if fraction is None else '{0:.1%}'.format(fraction),
+            fmtdur(s['elapsed']),
+            '-' if eta is None or s['status'] != 'running'
+            else fmtdur(max(0, eta - now)),
+            ' '.join('{0}={1}'.format(k, v)
+                     for k, v in sorted(s.get('metrics', {}).items())),
+        ))
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]) - 1)]
+    return '\n'.join(
+        ('  '.join(c.ljust(w) for c, w in zip(r, widths)) + '  ' + r[-1])
+        .rstrip()
+        for r in rows)
@@ -1,13 +1,78 @@
 import json
+import os
 
 from ..descriptors import Delegate
 from ..interface import Plugin
 from ..utils.files import safewrite
+from .misc import real_owner
+
+
+def read_journal(path):
+    """
+    Yield ``(name, data)`` pairs recorded in a journal file at `path`.
+
+    An incomplete last line (e.g., due to a crash while writing it) is
+    ignored.
+
+    """
+    with open(path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            yield entry['name'], entry['data']
 
 
 class MetaStore(Plugin):
 
+    """
+    Store meta data of the owner app in :file:`meta.json`.
+
+    Records are kept in memory and :file:`meta.json` is written once
+    at the end of execution.  To make meta data survive crashes, each
+    record is also appended to a journal file :file:`meta.json.journal`
+    which is compacted into :file:`meta.json` at the end.
+
+    Examples
+    --------
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp.apps import Computer
+    >>> app = Computer()
+    >>> app.datastore.dir = 'out'
+    >>> meta = app.magics.meta
+    >>> meta.prepare()
+    >>> meta.record('answer', 42)
+    >>> sorted(os.listdir('out'))
+    ['meta.json.journal']
+
+    Even if the process is killed at this point, the meta data can be
+    read by:
+
+    >>> MetaStore.read('out')
+    {'answer': 42}
+
+    `.flush` writes :file:`meta.json` and removes the journal.  It is
+    called automatically at the end of `.Executable.execute`.
+
+    >>> meta.flush()
+    >>> sorted(os.listdir('out'))
+    ['meta.json']
+    >>> MetaStore.read('out')
+    {'answer': 42}
+
+    """
+
     metafile = 'meta.json'
+
+    buffered = True
+    """
+    If false, rewrite :file:`meta.json` on each `.record` (no journal).
+    """
+
     datastore = Delegate()
     log = Delegate()
 
@@ -15,8 +80,15 @@ class MetaStore(Plugin):
     def metafilepath(self):
         return self.datastore.path(self.metafile)
 
+    @property
+    def journalpath(self):
+        return self.metafilepath + '.journal'
+
     def prepare(self):
         self.data = {}
+        self._journal = None
+        self._dirty = False
+        real_owner(self).defer()(self.flush)
 
     def record(self, name, data):
         self.data[name] = data
@@ -25,9 +97,51 @@ class MetaStore(Plugin):
                 'Datastore is not available. Not saving meta data {}'
                 .format(name))
             return
+        if not self.buffered:
+            with safewrite(self.metafilepath) as file:
+                json.dump(self.data, file)
+            return
+        if self._journal is None:
+            self._journal = open(self.journalpath, 'w')
+        self._journal.write(json.dumps(dict(name=name, data=data)) + '\n')
+        self._journal.flush()
+        self._dirty = True
+
+    def flush(self):
+        """
+        Write recorded data to :file:`meta.json` and remove the journal.
+        """
+        if not self._dirty:
+            return
         with safewrite(self.metafilepath) as file:
             json.dump(self.data, file)
+        self._journal.close()
+        self._journal = None
+        os.remove(self.journalpath)
+        self._dirty = False
+
+    def finish(self):
+        self.flush()
+
+    @classmethod
+    def read(cls, path, metafile=None):
+        """
+        Read meta data in a directory `path` (or a meta file at `path`).
+
+        Records in a journal left by a crashed run are merged.
+
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, metafile or cls.metafile)
+        data = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+        elif not os.path.exists(path + '.journal'):
+            raise IOError("Meta file not found at: {}".format(path))
+        if os.path.exists(path + '.journal'):
+            data.update(read_journal(path + '.journal'))
+        return data
 
     def load(self):
-        with open(self.metafilepath) as file:
-            self.data = json.load(file)
+        self.data = self.read(self.metafilepath)
@@ -0,0 +1,168 @@
+import threading
+
+from ..interface import Plugin
+from ..descriptors import Link, OfType, Choice
+from .misc import real_owner
+
+_local = threading.local()
+
+
+def _active():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def function_label(func):
+    filename, lineno, name = func
+    return '{0}:{1}({2})'.format(filename, lineno, name)
+
+
+class RecordProfile(Plugin):
+
+    """
+    Profile `.run` using `cProfile` and optionally `tracemalloc`.
+
+    Profiling is off by default.  It can be enabled per run from the
+    command line by ``--magics.profile.on true``.  Profile data is
+    saved in :file:`profile.pstats` in the datastore, and headline
+    numbers are recorded in :file:`meta.json`.  If `tracemalloc` is
+    true, top allocations during `.run` are written to
+    :file:`profile.tracemalloc.txt`.
+
+    Each nested `.Executable` has its own profiler so that profile of
+    only a subtree can be taken (e.g., ``--sub.magics.profile.on
+    true``).  While a nested executable is profiled, the profiler of
+    its parent is paused; i.e., the time spent in the child does not
+    appear in the parent's profile.
+
+    Example
+    -------
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp.apps import Computer
+    >>> class MyApp(Computer):
+    ...     def run(self):
+    ...         self.results.x = sum(range(1000))
+    >>> app = MyApp()
+    >>> app.datastore.dir = 'out'
+    >>> app.magics.profile.on = True
+    >>> app.execute()
+    >>> import os
+    >>> os.path.exists('out/profile.pstats')
+    True
+    >>> sorted(app.magics.meta.data['profile'])
+    ['top', 'total_calls', 'total_time']
+
+    """
+
+    meta = Link('..meta')
+    datastore = Link('..datastore')
+
+    on = OfType(bool, default=False, isparam=False)
+    """
+    Enable profiling by `cProfile`.
+    """
+
+    tracemalloc = OfType(bool, default=False, isparam=False)
+    """
+    Take `tracemalloc` snapshots before and after `.run`.
+    """
+
+    top = OfType(int, default=10, isparam=False)
+    """
+    Number of functions/allocations to be recorded.
+    """
+
+    sort = Choice('cumulative', 'tottime', 'ncalls', isparam=False)
+    """
+    Key to sort functions recorded in :file:`meta.json`.
+    """
+
+    pstatsfile = OfType(str, default='profile.pstats', isparam=False)
+    tracemallocfile = OfType(str, default='profile.tracemalloc.txt',
+                             isparam=False)
+
+    def pre_run(self):
+        self.profiler = None
+        self._snapshot = None
+        self._started_tracemalloc = False
+        if not self.on:
+            return
+        import cProfile
+        real_owner(self).defer()(self._stop)
+        if self.tracemalloc:
+            import tracemalloc
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+        stack = _active()
+        if stack:
+            stack[-1].disable()
+        self.profiler = cProfile.Profile()
+        stack.append(self.profiler)
+        self.profiler.enable()
+
+    def _disable(self):
+        stack = _active()
+        if self.profiler is None or self.profiler not in stack:
+            return
+        self.profiler.disable()
+        stack.remove(self.profiler)
+        if stack:
+            stack[-1].enable()
+
+    def _stop(self):
+        """
+        Make sure profilers are stopped even if `.run` failed.
+        """
+        self._disable()
+        if self._started_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def post_run(self):
+        if self.profiler is None:
+            return
+        self._disable()
+        import pstats
+        stats = pstats.Stats(self.profiler)
+        stats.sort_stats(self.sort)
+        top = []
+        for func in stats.fcn_list[:self.top]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[func]
+            top.append(dict(function=function_label(func), ncalls=ncalls,
+                            tottime=tottime, cumtime=cumtime))
+        info = dict(
+            total_calls=stats.total_calls,
+            total_time=stats.total_tt,
+            top=top,
+        )
+        writable = self.datastore.is_writable()
+        if writable:
+            stats.dump_stats(self.datastore.path(self.pstatsfile))
+        if self._snapshot is not None:
+            info['tracemalloc'] = self._tracemalloc_info(writable)
+        self.meta.record('profile', info)
+
+    def _tracemalloc_info(self, writable):
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        self._stop()
+        diff = snapshot.compare_to(self._snapshot, 'lineno')[:self.top]
+        if writable:
+            with open(self.datastore.path(self.tracemallocfile), 'w') as f:
+                for stat in diff:
+                    f.write(str(stat) + '\n')
+        return dict(
+            traced_current=current,
+            traced_peak=peak,
+            top=[dict(location=str(stat.traceback),
+                      size_diff=stat.size_diff,
+                      count_diff=stat.count_diff) for stat in diff],
+        )
@@ -1,12 +1,103 @@
-import itertools
 import json
 import os
-import sys
 
 from ..base import setnestedattr, MultiException
-from ..core import basic_types, private
+from ..core import Parametric, private
 from ..interface import Plugin
+from ..descriptors import Link, Dict, Choice, OfType
 from .misc import real_owner
+from .serializers import registry, BlobSerializer, NPZSerializer, \
+    CompressedNPYSerializer, HDF5Serializer
+
+
+class Compression(Parametric):
+
+    """
+    Compression settings for `.DumpResults`.
+
+    >>> comp = Compression(arrays='zlib', keys={'x': {'arrays': 'lzma'}})
+    >>> comp.settings('x')['arrays']
+    'lzma'
+    >>> comp.settings('y')['arrays']
+    'zlib'
+    >>> comp.serializer_for('y', registry.get('npz')).name
+    'npyc'
+
+    """
+
+    arrays = Choice('none', 'savez_compressed', 'zlib', 'lzma')
+    """
+    How to compress `numpy.ndarray`.  ``'savez_compressed'`` uses
+    `numpy.savez_compressed` instead of `numpy.savez`.  ``'zlib'`` and
+    ``'lzma'`` save each array in its own file (see
+    `.CompressedNPYSerializer`).
+    """
+
+    level = -1
+    """
+    Compression level for ``'zlib'`` (0--9) and ``'lzma'`` (0--9).
+    Negative value means the default level of the codec.
+    """
+
+    shuffle = False
+    """
+    Byte-shuffle arrays before compressing by ``'zlib'`` or ``'lzma'``.
+    """
+
+    hdf5_complevel = 0
+    """
+    ``complevel`` of `pandas.HDFStore` (0 means no compression).
+    """
+
+    hdf5_complib = Choice('zlib', 'lzo', 'bzip2', 'blosc')
+    """
+    ``complib`` of `pandas.HDFStore`.
+    """
+
+    keys = Dict(str, dict, default={})
+    """
+    Per-key settings; e.g., ``{'traj': {'arrays': 'lzma', 'level': 9}}``.
+    """
+
+    def settings(self, key):
+        settings = self.params()
+        del settings['keys']
+        settings.update(self.keys.get(key, {}))
+        return settings
+
+    def serializer_for(self, key, serializer):
+        """
+        Return a variant of `serializer` configured for `key`.
+        """
+        settings = self.settings(key)
+        if serializer.name == 'npz':
+            arrays = settings['arrays']
+            if arrays == 'savez_compressed':
+                config = (NPZSerializer, dict(compressed=True))
+            elif arrays in ('zlib', 'lzma'):
+                config = (CompressedNPYSerializer, dict(
+                    codec=arrays,
+                    level=settings['level'],
+                    shuffle=settings['shuffle'],
+                ))
+            else:
+                return serializer
+        elif serializer.name == 'hdf5' and settings['hdf5_complevel']:
+            config = (HDF5Serializer, dict(
+                complevel=settings['hdf5_complevel'],
+                complib=settings['hdf5_complib'],
+            ))
+        else:
+            return serializer
+
+        # Return the same instance for the same configuration so that
+        # entries can be grouped into one file:
+        cache = self.__dict__.setdefault('_serializers', {})
+        cls, kwds = config
+        cachekey = (cls, tuple(sorted(kwds.items())))
+        if cachekey not in cache:
+            cache[cachekey] = cls(**kwds)
+        return cache[cachekey]
 
 
 class DumpResults(Plugin):
@@ -14,7 +105,7 @@ class DumpResults(Plugin):
     """
     Automatically save owner's results.
 
-    Supported back-ends:
+    Supported back-ends (by default):
 
     - `json`
       for `dict`, `list` or `tuple`
@@ -23,6 +114,10 @@ class DumpResults(Plugin):
     - :ref:`pandas.HDFStore <pandas:io.hdf5>`
       for pandas object
 
+    More back-ends can be selected by `.serializers` or registered in
+    `compapp.plugins.serializers`.  The back-end used for each entry
+    is recorded in :file:`results.manifest.json`.
+
     Example
     -------
 
@@ -66,7 +161,9 @@ class DumpResults(Plugin):
 
     >>> from glob import glob
     >>> sorted(glob(app.datastore.path('results.*')))
-    ['out/results.hdf5', 'out/results.json', 'out/results.npz']
+    ... # doctest: +NORMALIZE_WHITESPACE
+    ['out/results.hdf5', 'out/results.json', 'out/results.manifest.json',
+     'out/results.npz']
 
     Now let's load these results.
 
@@ -94,6 +191,31 @@ class DumpResults(Plugin):
     >>> app2.results.tuple
     [5, 6, 7]
 
+    **Deduplication.**
+    If `.dedup` is true, arrays are stored only once in a
+    content-addressed blob store at `.blobdir` and the datastore of
+    each run refers to them by hard links (if possible) and a small
+    manifest :file:`results.blobs.json`.  Loading is transparent:
+
+    >>> class ArrayApp(Computer):
+    ...     def run(self):
+    ...         self.results.grid = numpy.linspace(0, 1, 100)
+    ...
+    >>> for dir in ['run1', 'run2']:
+    ...     app = ArrayApp()
+    ...     app.datastore.dir = dir
+    ...     app.magics.dumpresults.dedup = True
+    ...     app.execute()
+    ...
+    >>> app.magics.meta.data['dedup']['bytes_saved']
+    800
+    >>> app3 = ArrayApp()
+    >>> app3.mode = 'load'
+    >>> app3.datastore.dir = 'run1'
+    >>> app3.execute()
+    >>> app3.results.grid.shape
+    (100,)
+
     """
 
     result_names = ('results',)
@@ -101,6 +223,46 @@ class DumpResults(Plugin):
     These attributes of the owner class are dumped.
     """
 
+    dedup = False
+    """
+    Store `numpy.ndarray` results in a content-addressed blob store
+    (`.blobdir`) so that identical arrays are written only once.
+    Statistics are recorded in the ``'dedup'`` entry of the meta data.
+    """
+
+    blobdir = os.path.join('Data', 'blobs')
+    """
+    Directory of the blob store used when `.dedup` is true.
+    """
+
+    meta = Link('..meta')
+
+    serializers = Dict(str, str, default={})
+    """
+    Mapping from a result key to the name of the serializer used for
+    it (e.g., ``{'trajectory': 'npy'}``).  Other keys are saved by the
+    highest-priority serializer accepting the value.  See
+    `compapp.plugins.serializers`.
+    """
+
+    workers = 0
+    """
+    If positive, each result entry is saved in its own file and the
+    files are written (and read) concurrently by this many threads.
+    """
+
+    compression = Compression
+    """
+    Compression settings (see `.Compression`).
+    """
+
+    load_keys = OfType(list, tuple, type(None), default=None, isparam=False)
+    """
+    If not `None`, only the results with these keys are loaded.  Other
+    entries are not read from the disk at all.  See also
+    `compapp.loader.load`.
+    """
+
     def pre_run(self):
         self.defer()(self._save)
 
@@ -121,94 +283,192 @@ class DumpResults(Plugin):
         owner = private(self).owner
         if not owner.datastore.exists():
             return
+        blobs = BlobSerializer(self.blobdir) if self.dedup else None
         with MultiException.recorder() as mexc:
             for name in self.result_names:
                 with mexc.record():
-                    mexc.errors.extend(self.save_results(owner, name))
+                    mexc.errors.extend(self.save_results(
+                        owner, name, self.serializers, blobs, self.workers,
+                        self.compression))
+            if blobs is not None and hasattr(self, 'meta'):
+                with mexc.record():
+                    self.meta.record('dedup', blobs.blobstore.summary())
+
+    @staticmethod
+    def choose_serializer(key, value, overrides={}, blobs=None,
+                          compression=None):
+        if key in overrides:
+            return registry.get(overrides[key])
+        if blobs is not None and blobs.accepts(value):
+            return blobs
+        serializer = registry.find(value)
+        if serializer is not None and compression is not None:
+            serializer = compression.serializer_for(key, serializer)
+        return serializer
 
     @classmethod
-    def save_results(cls, owner, name):
+    def save_results(cls, owner, name, overrides={}, blobs=None, workers=0,
+                     compression=None):
+        """
+        Save ``owner.<name>`` and yield errors (if any).
+        """
         results = getattr(owner, name)
-        numpy = sys.modules.get('numpy', None)
-        pandas = sys.modules.get('pandas', None)
 
-        datamap = {}
+        groups = {}
+        files = {}
         for key, value in results().items():
-            if isinstance(value, basic_types):
-                ext = 'json'
-            elif numpy and isinstance(value, numpy.ndarray):
-                ext = 'npz'
-            elif pandas and isinstance(value,
-                                       pandas.core.generic.PandasObject):
-                ext = 'hdf5'
-            else:
+            try:
+                serializer = cls.choose_serializer(key, value, overrides,
+                                                   blobs, compression)
+            except Exception as err:
+                yield err
+                continue
+            if serializer is None:
                 yield ValueError("Unsupported type of results: "
                                  "{0} = {1!r}".format(key, value))
                 continue
-            datamap.setdefault(ext, {})[key] = value
-
-        basepath = owner.datastore.path(name + '.')
-        for ext, data in datamap.items():
-            try:
-                getattr(cls, 'save_results_' + ext)(data, basepath + ext)
-            except Exception as err:
+            if serializer.grouped and not workers:
+                # Differently configured serializers with the same
+                # extension (e.g., per-key compression) need their
+                # own files:
+                file = name + '.' + serializer.ext
+                suffix = 0
+                while files.setdefault(file, serializer) is not serializer:
+                    suffix += 1
+                    file = '{0}-{1}.{2}'.format(name, suffix, serializer.ext)
+            else:
+                file = name + '/' + key + '.' + serializer.ext
+            groups.setdefault((serializer, file), {})[key] = value
+
+        tasks = [(serializer, (serializer.save, data,
+                               owner.datastore.path(*file.split('/'))))
+                 for (serializer, file), data in groups.items()]
+        entries = {}
+        for ((serializer, file), data), (_, err) in zip(
+                groups.items(), _calltasks(tasks, workers)):
+            if err is not None:
                 yield err
+                continue
+            for key in data:
+                entries[key] = dict(serializer=serializer.name, file=file)
 
-    @staticmethod
-    def save_results_json(data, path):
-        with open(path, 'w') as file:
-            json.dump(data, file)
-
-    @staticmethod
-    def save_results_npz(data, path):
-        import numpy
-        numpy.savez(path, **data)
-
-    @staticmethod
-    def save_results_hdf5(data, path):
-        import pandas
-        with pandas.HDFStore(path) as store:
-            for key, value in data.items():
-                store[key] = value
-    # http://pandas.pydata.org/pandas-docs/stable/io.html#hdf5-pytables
+        with open(owner.datastore.path(name + '.manifest.json'), 'w') as file:
+            json.dump(dict(entries=entries), file)
 
     def load(self):
         owner = private(self).owner
-        iters = []
         for name in self.result_names:
             results = getattr(owner, name)
-
-            for ext in ['json', 'npz', 'hdf5']:
-                path = owner.datastore.path(name + '.' + ext, mkdir=False)
-                if os.path.exists(path):
-                    iters.append(getattr(self, 'load_results_' + ext)(path))
-
-            for key, value in itertools.chain(*iters):
+            for key, value in self.load_results(owner, name,
+                                                workers=self.workers,
+                                                keys=self.load_keys):
                 setattr(results, key, value)
 
     @staticmethod
-    def load_results_json(path):
-        with open(path) as file:
-            obj = json.load(file)
-        return obj.items()
+    def load_results(owner, name, workers=0, keys=None):
+        """
+        Return pairs of key and value saved in ``owner.<name>``.
 
-    @staticmethod
-    def load_results_npz(path):
-        import numpy
-        npz = numpy.load(path)
-        try:
-            for key in npz.files:
-                yield key, npz[key]
-        finally:
-            npz.close()
+        If `keys` is given, only these entries are loaded.
 
-    @staticmethod
-    def load_results_hdf5(path):
-        import pandas
-        with pandas.HDFStore(path, 'r') as store:
-            for key in store.keys():
-                yield key.lstrip('/'), store[key]
-    # http://pandas.pydata.org/pandas-docs/stable/io.html#hdf5-pytables
+        """
+        def path(*parts):
+            return owner.datastore.path(*parts, mkdir=False)
+
+        tasks = []
+        for (serializer, file), keys in result_groups(path, name,
+                                                      keys).items():
+            serializer = registry.get(serializer)
+            filepath = path(*file.split('/'))
+            tasks.append((serializer, (_loadlist, serializer, filepath,
+                                       keys)))
+
+        items = []
+        errors = []
+        for loaded, err in _calltasks(tasks, workers):
+            if err is None:
+                items.extend(loaded)
+            else:
+                errors.append(err)
+        if len(errors) == 1:
+            raise errors[0]
+        elif errors:
+            raise MultiException(errors=errors)
+        return items
+
+
+def result_groups(path, name, keys=None):
+    """
+    Map ``(serializer_name, file)`` to the list of keys stored in it.
+
+    `path` is a function which maps parts of a file path relative to
+    the datastore to the full path.  Results ``<name>`` are looked up
+    by the manifest :file:`<name>.manifest.json`.  For results saved
+    without the manifest, files are probed and the keys are `None`
+    (i.e., unknown until the files are loaded).
+
+    """
+    manifest = path(name + '.manifest.json')
+    groups = {}
+    if os.path.exists(manifest):
+        with open(manifest) as file:
+            entries = json.load(file)['entries']
+        if keys is not None:
+            missing = set(keys) - set(entries)
+            if missing:
+                raise KeyError('No such result(s) in {0}: {1}'.format(
+                    manifest, ', '.join(sorted(missing))))
+            entries = dict((k, entries[k]) for k in keys)
+        for key, entry in entries.items():
+            group = (entry['serializer'], entry['file'])
+            groups.setdefault(group, []).append(key)
+    else:
+        # Results saved before the manifest was introduced:
+        for serializer in ['json', 'npz', 'hdf5', 'blobs']:
+            file = name + '.' + registry.get(serializer).ext
+            if os.path.exists(path(file)):
+                groups[serializer, file] = keys
+    return groups
+
+
+def _loadlist(serializer, path, keys):
+    return list(serializer.load(path, keys))
+
+
+def _calltask(task):
+    try:
+        return (task[0](*task[1:]), None)
+    except Exception as err:
+        return (None, err)
+
+
+def _calltasks(tasks, workers=0):
+    """
+    Call ``func(*args)`` for each ``(serializer, (func, *args))`` in `tasks`.
+
+    It returns a list of ``(returned_value, error)`` pairs in the
+    same order as `tasks`.  If `workers` is positive, the tasks of
+    thread-safe serializers are run concurrently by a thread pool
+    while the others are run sequentially in the current thread.
+
+    """
+    concurrent = [i for i, (s, _) in enumerate(tasks) if s.threadsafe]
+    if workers <= 0 or len(concurrent) < 2:
+        return [_calltask(t) for (_, t) in tasks]
+
+    # Note: multiprocessing.dummy implements threading pool
+    from multiprocessing.dummy import Pool
+    pool = Pool(min(workers, len(concurrent)))
+    try:
+        async_result = pool.map_async(_calltask,
+                                      [tasks[i][1] for i in concurrent])
+        outcomes = [None if s.threadsafe else _calltask(t)
+                    for (s, t) in tasks]
+        for i, outcome in zip(concurrent, async_result.get()):
+            outcomes[i] = outcome
+    finally:
+        pool.close()
+    return outcomes
 
 
 class DumpParameters(Plugin):
@@ -0,0 +1,516 @@
+"""
+Serializers for results saved by `.DumpResults`.
+
+A serializer is chosen for each result entry by looking up the
+`registry`: the available serializer with the highest priority which
+`~Serializer.accepts` the value is used.  Projects can add their own
+format by registering a `Serializer`::
+
+    from compapp.plugins.serializers import Serializer, register
+
+    class MySerializer(Serializer):
+        name = 'mine'
+        ext = 'mine'
+        ...
+
+    register(MySerializer(), priority=10)
+
+Which serializer was used for each entry is recorded in a manifest
+file :file:`{name}.manifest.json` (e.g., :file:`results.manifest.json`)
+so that loading does not need to probe files.
+
+"""
+
+import json
+import os
+import pickle
+import struct
+import sys
+import zlib
+
+from ..core import basic_types
+from ..utils.blobstore import BlobStore
+
+
+class Serializer(object):
+
+    """
+    Base class of result serializers.
+    """
+
+    name = None
+    """
+    Name of this serializer.  This is recorded in the manifest and
+    used for finding the serializer at load time.
+    """
+
+    ext = None
+    """
+    File extension.
+    """
+
+    grouped = False
+    """
+    If true, all entries handled by this serializer are saved in one
+    file.  Otherwise, each entry is saved in its own file.
+    """
+
+    threadsafe = True
+    """
+    If false, `.save` and `.load` are never called concurrently from
+    multiple threads (see `.DumpResults.workers`).
+    """
+
+    def accepts(self, value):
+        """
+        |TO BE EXTENDED| Return `True` if `value` can be saved.
+        """
+        return False
+
+    def available(self):
+        """
+        |TO BE EXTENDED| Return `False` if required libraries are missing.
+        """
+        return True
+
+    def save(self, data, path):
+        """
+        |TO BE EXTENDED| Save a `dict` `data` at `path`.
+        """
+        raise NotImplementedError
+
+    def load(self, path, keys=None):
+        """
+        |TO BE EXTENDED| Yield pairs of key and value saved at `path`.
+
+        If `keys` is not `None`, only the entries in `keys` have to be
+        loaded.
+
+        """
+        raise NotImplementedError
+
+
+def _module_type(module, *attrs):
+    mod = sys.modules.get(module)
+    if mod is None:
+        return ()
+    for name in attrs:
+        mod = getattr(mod, name)
+    return (mod,)
+
+
+def isndarray(value):
+    return isinstance(value, _module_type('numpy', 'ndarray'))
+
+
+class JSONSerializer(Serializer):
+
+    name = ext = 'json'
+    grouped = True
+
+    def accepts(self, value):
+        return isinstance(value, basic_types)
+
+    def save(self, data, path):
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    def load(self, path, keys=None):
+        with open(path) as file:
+            obj = json.load(file)
+        return ((k, v) for (k, v) in obj.items() if keys is None or k in keys)
+
+
+class NPZSerializer(Serializer):
+
+    name = ext = 'npz'
+    grouped = True
+
+    def __init__(self, compressed=False):
+        self.compressed = compressed
+
+    def accepts(self, value):
+        return isndarray(value)
+
+    def save(self, data, path):
+        import numpy
+        if self.compressed:
+            numpy.savez_compressed(path, **data)
+        else:
+            numpy.savez(path, **data)
+
+    def load(self, path, keys=None):
+        import numpy
+        npz = numpy.load(path)
+        try:
+            for key in npz.files:
+                if keys is None or key in keys:
+                    yield key, npz[key]
+        finally:
+            npz.close()
+
+
+class HDF5Serializer(Serializer):
+
+    name = ext = 'hdf5'
+    grouped = True
+    threadsafe = False  # PyTables is not thread-safe
+
+    def __init__(self, complevel=0, complib='zlib'):
+        self.complevel = complevel
+        self.complib = complib
+
+    def accepts(self, value):
+        return isinstance(value, _module_type('pandas', 'core', 'generic',
+                                              'PandasObject'))
+
+    def save(self, data, path):
+        import pandas
+        kwds = {}
+        if self.complevel:
+            kwds.update(complevel=self.complevel, complib=self.complib)
+        with pandas.HDFStore(path, **kwds) as store:
+            for key, value in data.items():
+                store[key] = value
+    # http://pandas.pydata.org/pandas-docs/stable/io.html#hdf5-pytables
+
+    def load(self, path, keys=None):
+        import pandas
+        with pandas.HDFStore(path, 'r') as store:
+            for key in store.keys():
+                key = key.lstrip('/')
+                if keys is None or key in keys:
+                    yield key, store[key]
+
+
+class NPYSerializer(Serializer):
+
+    """
+    Save each array in its own ``.npy`` file.
+    """
+
+    name = ext = 'npy'
+
+    def accepts(self, value):
+        return isndarray(value)
+
+    def save(self, data, path):
+        import numpy
+        (value,) = data.values()
+        numpy.save(path, value)
+
+    def load(self, path, keys=None):
+        import numpy
+        (key,) = keys
+        yield key, numpy.load(path)
+
+
+class CompressedNPYSerializer(Serializer):
+
+    """
+    Save each array in its own file compressed by zlib or lzma.
+
+    The file starts with a small JSON header recording the dtype,
+    shape, codec and whether the bytes are shuffled.  *Byte-shuffle*
+    groups the i-th bytes of all elements together before compression
+    which usually improves the compression ratio of floating point
+    arrays a lot.
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> import numpy
+    >>> serializer = CompressedNPYSerializer('zlib', level=6, shuffle=True)
+    >>> serializer.save({'x': numpy.linspace(0, 1, 11)}, 'x.npyc')
+    >>> (key, value), = serializer.load('x.npyc', ['x'])
+    >>> value.tolist() == numpy.linspace(0, 1, 11).tolist()
+    True
+
+    """
+
+    name = ext = 'npyc'
+    _magic = b'CNPY'
+    _length = struct.Struct('<I')
+    _chunksize = 2 ** 24
+
+    def __init__(self, codec='zlib', level=-1, shuffle=False):
+        self.codec = codec
+        self.level = level
+        self.shuffle = shuffle
+
+    def accepts(self, value):
+        return isndarray(value) and not value.dtype.hasobject
+
+    def available(self):
+        try:
+            self._compressor(self.codec, self.level)
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def _compressor(codec, level):
+        if codec == 'zlib':
+            return zlib.compressobj(level)
+        elif codec == 'lzma':
+            import lzma
+            if level < 0:
+                return lzma.LZMACompressor()
+            return lzma.LZMACompressor(preset=level)
+        raise ValueError('Unknown codec: {0!r}'.format(codec))
+
+    @staticmethod
+    def _decompressor(codec):
+        if codec == 'zlib':
+            return zlib.decompressobj()
+        elif codec == 'lzma':
+            import lzma
+            return lzma.LZMADecompressor()
+        raise ValueError('Unknown codec: {0!r}'.format(codec))
+
+    def save(self, data, path):
+        import numpy
+        (value,) = data.values()
+        array = numpy.ascontiguousarray(value)
+        raw = array.reshape(-1).view(numpy.uint8)
+        if self.shuffle and array.dtype.itemsize > 1:
+            raw = numpy.ascontiguousarray(
+                raw.reshape(-1, array.dtype.itemsize).T)
+        raw = raw.data
+        header = json.dumps(dict(
+            dtype=array.dtype.str,
+            shape=array.shape,
+            codec=self.codec,
+            shuffle=self.shuffle,
+        )).encode()
+        compressor = self._compressor(self.codec, self.level)
+        with open(path, 'wb') as file:
+            file.write(self._magic)
+            file.write(self._length.pack(len(header)))
+            file.write(header)
+            for i in range(0, len(raw), self._chunksize):
+                file.write(compressor.compress(raw[i:i + self._chunksize]))
+            file.write(compressor.flush())
+
+    def load(self, path, keys=None):
+        import numpy
+        (key,) = keys
+        with open(path, 'rb') as file:
+            if file.read(len(self._magic)) != self._magic:
+                raise ValueError('{0} is not a npyc file'.format(path))
+            (size,) = self._length.unpack(file.read(self._length.size))
+            header = json.loads(file.read(size).decode())
+            decompressor = self._decompressor(header['codec'])
+            chunks = []
+            while True:
+                chunk = file.read(self._chunksize)
+                if not chunk:
+                    break
+                chunks.append(decompressor.decompress(chunk))
+        raw = numpy.frombuffer(bytearray(b''.join(chunks)), dtype=numpy.uint8)
+        dtype = numpy.dtype(header['dtype'])
+        if header['shuffle'] and dtype.itemsize > 1:
+            raw = raw.reshape(dtype.itemsize, -1).T
+        array = numpy.ascontiguousarray(raw).view(dtype)
+        yield key, array.reshape(header['shape'])
+
+
+class PickleSerializer(Serializer):
+
+    """
+    Pickle any object.
+
+    With Python >= 3.8, pickle protocol 5 is used and the buffers
+    (e.g., data of `numpy.ndarray`) are written out-of-band, i.e.,
+    without being copied into the pickle stream.
+
+    This serializer is never chosen automatically; select it by
+    `.DumpResults.serializers`.
+
+    """
+
+    name = 'pickle'
+    ext = 'pickle'
+    _header = struct.Struct('<QQ')
+    _length = struct.Struct('<Q')
+
+    def save(self, data, path):
+        (value,) = data.values()
+        buffers = []
+        if pickle.HIGHEST_PROTOCOL >= 5:
+            payload = pickle.dumps(value, protocol=5,
+                                   buffer_callback=buffers.append)
+        else:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(path, 'wb') as file:
+            file.write(self._header.pack(len(payload), len(buffers)))
+            file.write(payload)
+            for buf in buffers:
+                raw = buf.raw()
+                file.write(self._length.pack(raw.nbytes))
+                file.write(raw)
+
+    def load(self, path, keys=None):
+        (key,) = keys
+        with open(path, 'rb') as file:
+            size, nbuffers = self._header.unpack(
+                file.read(self._header.size))
+            payload = file.read(size)
+            buffers = []
+            for _ in range(nbuffers):
+                (nbytes,) = self._length.unpack(file.read(self._length.size))
+                buf = bytearray(nbytes)
+                file.readinto(buf)
+                buffers.append(buf)
+        if buffers:
+            yield key, pickle.loads(payload, buffers=buffers)
+        else:
+            yield key, pickle.loads(payload)
+
+
+class ParquetSerializer(Serializer):
+
+    """
+    Save `pandas.DataFrame` in Apache Parquet format (requires pyarrow).
+    """
+
+    name = ext = 'parquet'
+
+    def accepts(self, value):
+        return isinstance(value, _module_type('pandas', 'DataFrame'))
+
+    def available(self):
+        try:
+            import pyarrow  # noqa
+        except ImportError:
+            return False
+        return True
+
+    def save(self, data, path):
+        (value,) = data.values()
+        value.to_parquet(path)
+
+    def load(self, path, keys=None):
+        import pandas
+        (key,) = keys
+        yield key, pandas.read_parquet(path)
+
+
+class BlobSerializer(Serializer):
+
+    """
+    Save arrays in a content-addressed `.BlobStore`.
+
+    See `.DumpResults.dedup`.
+
+    """
+
+    name = 'blobs'
+    ext = 'blobs.json'
+    grouped = True
+
+    def __init__(self, blobdir=os.path.join('Data', 'blobs')):
+        self.blobstore = BlobStore(blobdir)
+
+    def accepts(self, value):
+        return isndarray(value) and self.blobstore.accepts(value)
+
+    def save(self, data, path):
+        """
+        Put arrays in the blob store and hard-link them next to `path`.
+
+        The file at `path` maps each key to the digest of the blob.
+        It is used when hard-linking is not possible (e.g., the blob
+        store is on another file system).
+
+        """
+        linkdir = path[:-len('.json')]
+        if not os.path.isdir(linkdir):
+            os.makedirs(linkdir)
+        blobs = {}
+        for key, value in data.items():
+            digest = blobs[key] = self.blobstore.put(value)
+            self.blobstore.link(digest, os.path.join(linkdir, key + '.npy'))
+        with open(path, 'w') as file:
+            json.dump(dict(blobdir=os.path.abspath(self.blobstore.basedir),
+                           blobs=blobs), file)
+
+    def load(self, path, keys=None):
+        import numpy
+        with open(path) as file:
+            manifest = json.load(file)
+        blobstore = BlobStore(manifest['blobdir'])
+        linkdir = path[:-len('.json')]
+        for key, digest in manifest['blobs'].items():
+            if keys is not None and key not in keys:
+                continue
+            linked = os.path.join(linkdir, key + '.npy')
+            if os.path.exists(linked):
+                yield key, numpy.load(linked)
+            else:
+                yield key, blobstore.get(digest)
+
+
+class SerializerRegistry(object):
+
+    """
+    Registry of `Serializer` instances.
+
+    >>> registry = SerializerRegistry()
+    >>> registry.register(JSONSerializer())
+    >>> registry.find(1).name
+    'json'
+    >>> registry.find(object()) is None
+    True
+    >>> registry.get('json').ext
+    'json'
+
+    """
+
+    def __init__(self):
+        self._entries = []
+
+    def register(self, serializer, priority=0):
+        """
+        Register `serializer`; it replaces the one with the same name.
+        """
+        self.unregister(serializer.name)
+        self._entries.append((priority, serializer))
+        # Stable sort keeps earlier registration first among the
+        # serializers with the same priority:
+        self._entries.sort(key=lambda e: -e[0])
+
+    def unregister(self, name):
+        self._entries[:] = [e for e in self._entries if e[1].name != name]
+
+    def get(self, name):
+        for _, serializer in self._entries:
+            if serializer.name == name:
+                return serializer
+        raise KeyError("No serializer named {0!r} is registered."
+                       .format(name))
+
+    def find(self, value):
+        """
+        Return the highest-priority serializer accepting `value` (or None).
+        """
+        for _, serializer in self._entries:
+            if serializer.accepts(value) and serializer.available():
+                return serializer
+        return None
+
+    def names(self):
+        return [s.name for _, s in self._entries]
+
+
+registry = SerializerRegistry()
+register = registry.register
+
+register(JSONSerializer())
+register(NPZSerializer())
+register(HDF5Serializer())
+register(NPYSerializer(), priority=-10)
+register(CompressedNPYSerializer(), priority=-10)
+register(ParquetSerializer(), priority=-10)
+register(PickleSerializer(), priority=-100)
+register(BlobSerializer(), priority=-100)
@@ -1,36 +1,184 @@
+from fnmatch import fnmatchcase
 from socket import gethostname
+import hashlib
+import json
 import os
 import sys
+import threading
 
 from .. import __version__
 from ..interface import Plugin
-from ..descriptors import Link, Root
+from ..descriptors import Link, Root, List, OfType
+from ..utils.files import safewrite
 from .misc import real_owner
 
 
+def filter_environ(environ, allow=('*',), deny=()):
+    """
+    Return a copy of `environ` filtered by glob patterns.
+
+    >>> filter_environ({'HOME': '~', 'PATH': '/bin', 'API_TOKEN': 'x'},
+    ...                deny=['*TOKEN*']) == {'HOME': '~', 'PATH': '/bin'}
+    True
+    >>> filter_environ({'HOME': '~', 'PATH': '/bin'}, allow=['PATH'])
+    {'PATH': '/bin'}
+
+    """
+    return {k: v for k, v in environ.items()
+            if any(fnmatchcase(k, p) for p in allow)
+            and not any(fnmatchcase(k, p) for p in deny)}
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+_written = set()
+
+
+def sysinfo_snapshot(allow=('*',), deny=()):
+    """
+    Return a pair ``(digest, snapshot)`` of static system information.
+
+    The snapshot is computed only once per process for each set of
+    `allow` and `deny` patterns.  It does not include the information
+    which may change during the process (e.g., the current directory).
+
+    """
+    key = (tuple(allow), tuple(deny))
+    with _snapshots_lock:
+        if key not in _snapshots:
+            snapshot = dict(
+                hostname=gethostname(),
+                environ=filter_environ(os.environ, allow, deny),
+                sys=dict(
+                    argv=list(sys.argv),
+                    path=list(sys.path),
+                    version=sys.version,
+                    version_info=list(sys.version_info),
+                ),
+                compapp_version=__version__,
+            )
+            digest = hashlib.sha1(json.dumps(
+                snapshot, sort_keys=True).encode()).hexdigest()
+            _snapshots[key] = (digest, snapshot)
+        return _snapshots[key]
+
+
+def write_snapshot(dirpath, digest, snapshot):
+    """
+    Write `snapshot` to ``<dirpath>/<digest>.json`` unless it exists.
+    """
+    path = os.path.abspath(os.path.join(dirpath, digest + '.json'))
+    with _snapshots_lock:
+        if path in _written:
+            return path
+        _written.add(path)
+    if not os.path.exists(path):
+        if not os.path.isdir(dirpath):
+            try:
+                os.makedirs(dirpath)
+            except OSError:
+                # Other process may have created it in the meantime.
+                if not os.path.isdir(dirpath):
+                    raise
+        with safewrite(path) as file:
+            json.dump(snapshot, file)
+    return path
+
+
 class RecordSysInfo(Plugin):
+
+    """
+    Record system information (host, environment variables, etc.).
+
+    The static part of the information is computed once per process.
+    If `snapshotdir` is given, it is written to a file named after its
+    hash in that directory and :file:`meta.json` of each run only
+    refers to it.  `Variator` uses this to share one snapshot among
+    all the variants of a sweep.  Use `expand` to get the full
+    information back.
+
+    Examples
+    --------
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp.apps import Computer
+    >>> app = Computer()
+    >>> app.datastore.dir = 'out'
+    >>> app.magics.sysinfo.environ_allow = ['PATH']
+    >>> app.execute()
+    >>> sysinfo = app.magics.meta.data['sysinfo']
+    >>> sorted(sysinfo)
+    ['compapp_version', 'cwd', 'environ', 'hostname', 'sys']
+    >>> sorted(sysinfo['environ'])
+    ['PATH']
+
+    >>> app = Computer()
+    >>> app.datastore.dir = 'out'
+    >>> app.magics.sysinfo.snapshotdir = 'snapshots'
+    >>> app.execute()
+    >>> sysinfo = app.magics.meta.data['sysinfo']
+    >>> sorted(sysinfo)
+    ['cwd', 'digest', 'snapshot']
+    >>> sorted(os.listdir('out/snapshots')) == [sysinfo['digest'] + '.json']
+    True
+    >>> sorted(RecordSysInfo.expand(sysinfo, 'out'))
+    ['compapp_version', 'cwd', 'environ', 'hostname', 'sys']
+
+    """
+
     meta = Link('..meta')
     root = Root()
+    datastore = Link('..datastore')
+
+    environ_allow = List(str, default=['*'])
+    """
+    Glob patterns of environment variables to be recorded.
+    """
+
+    environ_deny = List(str, default=[
+        '*PASSWORD*', '*SECRET*', '*TOKEN*', '*CREDENTIAL*', 'LS_COLORS',
+    ])
+    """
+    Glob patterns of environment variables not to be recorded.
+    This takes precedence over `environ_allow`.
+    """
+
+    snapshotdir = OfType(str, type(None), default=None)
+    """
+    Directory to store the static part of the information.  A relative
+    path is resolved against the datastore directory.  If `None`, the
+    information is embedded in :file:`meta.json`.
+    """
 
     def save(self):
         owner = real_owner(self)
         if owner is not self.root:
             return
 
-        sysdict = {}
-        for key in [
-                'argv',
-                'path',
-                'version',
-                'version_info',
-        ]:
-            sysdict[key] = getattr(sys, key)
-        sysdict['version_info'] = tuple(sysdict['version_info'])  # for Py 2.7
+        digest, snapshot = sysinfo_snapshot(self.environ_allow,
+                                            self.environ_deny)
+        cwd = os.getcwd()
+        if self.snapshotdir is None or not self.datastore.is_writable():
+            self.meta.record('sysinfo', dict(snapshot, cwd=cwd))
+            return
 
+        dirpath = self.datastore.path(self.snapshotdir)
+        path = write_snapshot(dirpath, digest, snapshot)
         self.meta.record('sysinfo', dict(
-            hostname=gethostname(),
-            cwd=os.getcwd(),
-            environ=dict(os.environ),
-            sys=sysdict,
-            compapp_version=__version__,
+            snapshot=os.path.relpath(path, self.datastore.dir),
+            digest=digest,
+            cwd=cwd,
         ))
+
+    @staticmethod
+    def expand(sysinfo, dirpath):
+        """
+        Return full information from recorded `sysinfo` of a run at `dirpath`.
+        """
+        if 'snapshot' not in sysinfo:
+            return sysinfo
+        with open(os.path.join(dirpath, sysinfo['snapshot'])) as file:
+            snapshot = json.load(file)
+        return dict(snapshot, cwd=sysinfo['cwd'])
@@ -0,0 +1,335 @@
+import os
+import time
+
+import numpy
+import pandas
+import pytest
+
+from ...apps import Computer
+
+
+class ArrayApp(Computer):
+
+    n = 10
+
+    def run(self):
+        self.results.grid = numpy.arange(self.n, dtype=float)
+        self.results.mask = self.results.grid > 3
+
+
+def run_dedup(tmpdir, name, **params):
+    app = ArrayApp(**params)
+    app.datastore.dir = str(tmpdir.join(name))
+    app.magics.dumpresults.dedup = True
+    app.magics.dumpresults.blobdir = str(tmpdir.join('blobs'))
+    app.execute()
+    return app
+
+
+def load(tmpdir, name):
+    app = ArrayApp()
+    app.mode = 'load'
+    app.datastore.dir = str(tmpdir.join(name))
+    app.execute()
+    return app
+
+
+def test_dedup_stores_once(tmpdir):
+    run_dedup(tmpdir, 'a')
+    app = run_dedup(tmpdir, 'b')
+    blobs = [f for _, _, fs in os.walk(str(tmpdir.join('blobs'))) for f in fs]
+    assert len(blobs) == 2
+
+    stat_a = os.stat(str(tmpdir.join('a', 'results.blobs', 'grid.npy')))
+    stat_b = os.stat(str(tmpdir.join('b', 'results.blobs', 'grid.npy')))
+    assert stat_a.st_ino == stat_b.st_ino
+
+    dedup = app.magics.meta.data['dedup']
+    assert dedup['arrays'] == 2
+    assert dedup['stored_bytes'] == 0
+    assert dedup['bytes_saved'] == dedup['nbytes']
+    assert dedup['dedup_ratio'] == 1.0
+
+
+def test_dedup_different_content(tmpdir):
+    run_dedup(tmpdir, 'a')
+    app = run_dedup(tmpdir, 'b', n=20)
+    assert app.magics.meta.data['dedup']['bytes_saved'] == 0
+
+
+def test_dedup_load_without_links(tmpdir):
+    run_dedup(tmpdir, 'a')
+    tmpdir.join('a', 'results.blobs').remove()
+    app = load(tmpdir, 'a')
+    numpy.testing.assert_equal(app.results.grid, numpy.arange(10.0))
+    assert app.results.mask.dtype == bool
+
+
+def test_blobstore_concurrent_put(tmpdir, monkeypatch):
+    from multiprocessing.dummy import Pool
+    from ...utils.blobstore import BlobStore
+    store = BlobStore(str(tmpdir.join('blobs')))
+    write = store._write
+
+    def slow_write(path, array):
+        time.sleep(0.1)
+        write(path, array)
+    monkeypatch.setattr(store, '_write', slow_write)
+
+    array = numpy.arange(10)
+
+    def put_and_link(i):
+        digest = store.put(array)
+        return store.link(digest, str(tmpdir.join('link{0}.npy'.format(i))))
+
+    pool = Pool(4)
+    try:
+        assert pool.map(put_and_link, range(4)) == [True] * 4
+    finally:
+        pool.close()
+    assert store.stats['stored_bytes'] == array.nbytes
+
+
+def test_blobstore_link_missing_blob(tmpdir):
+    from ...utils.blobstore import BlobStore
+    store = BlobStore(str(tmpdir.join('blobs')))
+    with pytest.raises(OSError):
+        store.link('0' * 40, str(tmpdir.join('link.npy')))
+
+
+class MixedApp(Computer):
+
+    def run(self):
+        self.results.x = 1.0
+        self.results.array = numpy.arange(5)
+        self.results.obj = Point(1, 2)
+
+
+class Point(object):
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+def run_mixed(tmpdir, serializers):
+    app = MixedApp()
+    app.datastore.dir = str(tmpdir)
+    app.magics.dumpresults.serializers = serializers
+    app.execute()
+    app = MixedApp()
+    app.mode = 'load'
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    return app
+
+
+def test_serializer_overrides(tmpdir):
+    app = run_mixed(tmpdir, {'array': 'npy', 'obj': 'pickle'})
+    assert tmpdir.join('results', 'array.npy').check()
+    assert tmpdir.join('results', 'obj.pickle').check()
+    assert not tmpdir.join('results.npz').check()
+    numpy.testing.assert_equal(app.results.array, numpy.arange(5))
+    assert app.results.obj == Point(1, 2)
+    assert app.results.x == 1.0
+
+
+def test_pickle_out_of_band(tmpdir):
+    app = run_mixed(tmpdir, {'array': 'pickle', 'obj': 'pickle'})
+    numpy.testing.assert_equal(app.results.array, numpy.arange(5))
+    app.results.array[0] = 100  # loaded buffer must be writable
+
+
+def test_unsupported_type(tmpdir):
+    app = MixedApp()
+    app.datastore.dir = str(tmpdir)
+    try:
+        app.execute()
+    except Exception as err:
+        assert 'Unsupported type of results' in str(err)
+    else:
+        raise AssertionError('error was not raised')
+
+
+def test_custom_serializer(tmpdir):
+    from ..serializers import Serializer, register, registry
+
+    class PointSerializer(Serializer):
+        name = ext = 'point'
+
+        def accepts(self, value):
+            return isinstance(value, Point)
+
+        def save(self, data, path):
+            (value,) = data.values()
+            with open(path, 'w') as file:
+                file.write('{0} {1}'.format(value.x, value.y))
+
+        def load(self, path, keys=None):
+            (key,) = keys
+            with open(path) as file:
+                yield key, Point(*map(int, file.read().split()))
+
+    register(PointSerializer(), priority=10)
+    try:
+        app = run_mixed(tmpdir, {})
+    finally:
+        registry.unregister('point')
+    assert tmpdir.join('results', 'obj.point').check()
+    assert app.results.obj == Point(1, 2)
+
+
+def test_load_without_manifest(tmpdir):
+    app = ArrayApp()
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    tmpdir.join('results.manifest.json').remove()
+    app = load(tmpdir, '.')
+    numpy.testing.assert_equal(app.results.grid, numpy.arange(10.0))
+
+
+class ManyArraysApp(Computer):
+
+    def run(self):
+        for i in range(8):
+            self.results['a{0}'.format(i)] = numpy.arange(i + 1)
+        self.results.x = 1.0
+
+
+def test_parallel_per_key(tmpdir):
+    app = ManyArraysApp()
+    app.datastore.dir = str(tmpdir)
+    app.magics.dumpresults.workers = 4
+    app.execute()
+    assert tmpdir.join('results', 'a0.npz').check()
+    assert tmpdir.join('results', 'x.json').check()
+    assert not tmpdir.join('results.npz').check()
+
+    for workers in [0, 4]:
+        app = ManyArraysApp()
+        app.mode = 'load'
+        app.datastore.dir = str(tmpdir)
+        app.magics.dumpresults.workers = workers
+        app.execute()
+        assert sorted(app.results) == ['a{0}'.format(i) for i in range(8)] \
+            + ['x']
+        numpy.testing.assert_equal(app.results.a7, numpy.arange(8))
+
+
+def test_parallel_errors_are_collected(tmpdir):
+    from ..recorders import DumpResults
+    app = MixedApp()
+    app.datastore.dir = str(tmpdir)
+    app.run()
+    errors = list(DumpResults.save_results(app, 'results', {'x': 'hdf5'},
+                                           workers=4))
+    assert len(errors) == 2
+    assert 'Unsupported type of results' in str(errors[0])
+    assert tmpdir.join('results', 'array.npz').check()
+
+
+class TrajectoryApp(Computer):
+
+    def run(self):
+        t = numpy.linspace(0, 10, 10000)
+        self.results.x = numpy.sin(t)
+        self.results.y = numpy.cos(t)
+        self.results.df = pandas.DataFrame({'t': t})
+
+
+def run_compressed(tmpdir, **compression):
+    app = TrajectoryApp(magics=dict(dumpresults=dict(
+        compression=compression)))
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    app = TrajectoryApp()
+    app.mode = 'load'
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    return app
+
+
+@pytest.mark.parametrize('compression, files', [
+    (dict(arrays='savez_compressed'), ['results.npz']),
+    (dict(arrays='zlib'), ['results/x.npyc', 'results/y.npyc']),
+    (dict(arrays='lzma', level=1, shuffle=True),
+     ['results/x.npyc', 'results/y.npyc']),
+    (dict(arrays='zlib', keys={'x': {'arrays': 'none'}}),
+     ['results.npz', 'results/y.npyc']),
+    (dict(hdf5_complevel=9), ['results.hdf5']),
+    (dict(arrays='savez_compressed', keys={'x': {'arrays': 'none'}}),
+     ['results.npz', 'results-1.npz']),
+])
+def test_compression(tmpdir, compression, files):
+    app = run_compressed(tmpdir, **compression)
+    for path in files:
+        assert tmpdir.join(*path.split('/')).check()
+    t = numpy.linspace(0, 10, 10000)
+    numpy.testing.assert_equal(app.results.x, numpy.sin(t))
+    numpy.testing.assert_equal(app.results.y, numpy.cos(t))
+    numpy.testing.assert_equal(app.results.df['t'].values, t)
+
+
+def test_compression_per_key_hdf5(tmpdir):
+    class DataFrames(Computer):
+        def run(self):
+            self.results.a = pandas.DataFrame({'v': [1, 2]})
+            self.results.b = pandas.DataFrame({'v': [3, 4]})
+
+    app = DataFrames(magics=dict(dumpresults=dict(compression=dict(
+        hdf5_complevel=9, keys={'a': {'hdf5_complevel': 1}}))))
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    app = DataFrames(mode='load')
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    assert sorted(app.results) == ['a', 'b']
+    assert app.results.a['v'].tolist() == [1, 2]
+    assert app.results.b['v'].tolist() == [3, 4]
+
+
+def test_compression_reduces_size(tmpdir):
+    run_compressed(tmpdir.join('none'))
+    run_compressed(tmpdir.join('zlib'), arrays='zlib', shuffle=True)
+    raw = tmpdir.join('none', 'results.npz').size()
+    compressed = (tmpdir.join('zlib', 'results', 'x.npyc').size() +
+                  tmpdir.join('zlib', 'results', 'y.npyc').size())
+    assert compressed < raw
+
+
+@pytest.mark.parametrize('workers', [0, 4])
+def test_load_keys(tmpdir, workers, monkeypatch):
+    from ..serializers import NPZSerializer
+    app = TrajectoryApp()
+    app.datastore.dir = str(tmpdir)
+    app.magics.dumpresults.workers = workers
+    app.execute()
+
+    # Make sure that the file for unrequested entries is not read:
+    if not workers:
+        def fail(*_):
+            raise AssertionError('results.npz must not be read')
+        monkeypatch.setattr(NPZSerializer, 'load', fail)
+
+    app = TrajectoryApp()
+    app.mode = 'load'
+    app.datastore.dir = str(tmpdir)
+    app.magics.dumpresults.load_keys = ['df']
+    app.execute()
+    assert sorted(app.results) == ['df']
+
+
+def test_load_keys_missing(tmpdir):
+    app = TrajectoryApp()
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+
+    app = TrajectoryApp()
+    app.mode = 'load'
+    app.datastore.dir = str(tmpdir)
+    app.magics.dumpresults.load_keys = ['z']
+    with pytest.raises(KeyError):
+        app.execute()
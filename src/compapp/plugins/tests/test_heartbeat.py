@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from ...apps import Computer
+from ...cli import main
+from ..heartbeat import Heartbeat, read_heartbeat, summarize_heartbeats
+
+
+class Steps(Computer):
+
+    steps = 100
+
+    def prepare(self):
+        super(Steps, self).prepare()
+        self.magics.heartbeat.enabled = True
+
+    def run(self):
+        for i in range(self.steps):
+            self.progress((i + 1) / float(self.steps), step=i)
+
+
+def test_rate_limit(tmpdir, monkeypatch):
+    writes = []
+    write = Heartbeat.write
+
+    def counting_write(self, now=None):
+        writes.append(self.beat['fraction'])
+        write(self, now)
+    monkeypatch.setattr(Heartbeat, 'write', counting_write)
+
+    app = Steps()
+    app.datastore.dir = str(tmpdir)
+    app.magics.heartbeat.interval = 3600
+    app.execute()
+    # start, fraction == 1 and finish:
+    assert writes == [None, 1.0, 1.0]
+    beat = read_heartbeat(str(tmpdir.join('heartbeat.json')))
+    assert beat['count'] == 100
+    assert beat['metrics'] == {'step': 99}
+
+
+class Failing(Steps):
+
+    def run(self):
+        self.progress(0.5)
+        raise RuntimeError('failed')
+
+
+def test_failed(tmpdir):
+    app = Failing()
+    app.datastore.dir = str(tmpdir)
+    with pytest.raises(RuntimeError):
+        app.execute()
+    beat = read_heartbeat(str(tmpdir.join('heartbeat.json')))
+    assert beat['status'] == 'failed'
+    assert beat['fraction'] == 0.5
+
+
+def test_status(tmpdir, capsys):
+    for name in ['a', 'b']:
+        app = Steps()
+        app.datastore.dir = str(tmpdir.join(name))
+        app.execute()
+    path = tmpdir.join('b', 'heartbeat.json')
+    beat = json.loads(path.read())
+    beat.update(status='running', updated=beat['started'])
+    path.write(json.dumps(beat))
+
+    summaries = summarize_heartbeats(str(tmpdir), now=beat['started'] + 10)
+    assert [(s['path'], s['status']) for s in summaries] == [
+        ('a', 'finished'), ('b', 'running')]
+    summaries = summarize_heartbeats(str(tmpdir), now=beat['started'] + 100)
+    assert summaries[1]['status'] == 'stale'
+
+    main(['status', str(tmpdir)])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['PATH', 'STATUS', 'PROGRESS', 'ELAPSED',
+                                'ETA', 'METRICS']
+    assert lines[1].split()[:3] == ['a', 'finished', '100.0%']
+
+    main(['status', str(tmpdir), '--json'])
+    assert len(json.loads(capsys.readouterr().out)) == 2
+
+
+def test_disabled_by_default(tmpdir):
+    class Quiet(Computer):
+        def run(self):
+            self.progress(0.5)
+
+    app = Quiet()
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    assert not tmpdir.join('heartbeat.json').check()
+
+
+def test_progress_outside_run(tmpdir):
+    app = Steps()
+    app.datastore.dir = str(tmpdir)
+    app.progress(0.5)  # not running yet
+    app.execute()
+
+    app = Steps(mode='load')
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    app.progress(0.5)
+    assert read_heartbeat(str(tmpdir.join('heartbeat.json')))['status'] == \
+        'finished'
+
+
+def test_not_a_parameter():
+    assert 'enabled' not in Steps().magics.heartbeat.params()
+
+
+def test_state_is_reset(tmpdir):
+    app = Steps(steps=2)
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    assert app.magics.heartbeat.beat is None
+    app.progress(0.5)  # no-op after the run
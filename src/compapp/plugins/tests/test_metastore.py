@@ -0,0 +1,30 @@
+import pytest
+
+from ...apps import Computer
+
+
+class RecordsAndFails(Computer):
+
+    def run(self):
+        self.magics.meta.record('progress', 0.5)
+        raise RuntimeError('failed')
+
+
+def test_meta_is_flushed_on_error(tmpdir):
+    app = RecordsAndFails()
+    app.datastore.dir = str(tmpdir)
+    with pytest.raises(Exception):
+        app.execute()
+    assert tmpdir.join('meta.json').check()
+    assert not tmpdir.join('meta.json.journal').check()
+    assert app.magics.meta.read(str(tmpdir))['progress'] == 0.5
+
+
+def test_meta_unbuffered(tmpdir):
+    app = RecordsAndFails()
+    app.datastore.dir = str(tmpdir)
+    app.magics.meta.buffered = False
+    app.magics.meta.prepare()
+    app.magics.meta.record('progress', 0.5)
+    assert tmpdir.join('meta.json').check()
+    assert not tmpdir.join('meta.json.journal').check()
@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+from ...apps import Computer
+
+
+def work(n):
+    return sum(i * i for i in range(n))
+
+
+class Child(Computer):
+
+    def run(self):
+        self.results.y = work(1000)
+
+
+class Parent(Computer):
+
+    child = Child
+
+    def run(self):
+        self.results.x = [0] * 100000
+        self.child.execute()
+
+
+def test_cli(tmpdir):
+    app = Parent()
+    app.cli(['--datastore.dir', str(tmpdir), '--magics.profile.on', 'true',
+             '--magics.profile.tracemalloc', 'true'])
+    assert tmpdir.join('profile.pstats').check()
+    assert tmpdir.join('profile.tracemalloc.txt').check()
+    profile = app.magics.meta.data['profile']
+    assert profile['total_calls'] > 0
+    assert profile['tracemalloc']['traced_peak'] > 0
+
+    import tracemalloc
+    assert not tracemalloc.is_tracing()
+
+
+def test_subtree(tmpdir):
+    app = Parent()
+    app.datastore.dir = str(tmpdir)
+    app.child.magics.profile.on = True
+    app.child.magics.profile.top = 1000
+    app.execute()
+    assert 'profile' not in app.magics.meta.data
+    functions = [f['function'] for f in
+                 app.child.magics.meta.data['profile']['top']]
+    assert any(f.endswith('(work)') for f in functions)
+    assert tmpdir.join('child', 'profile.pstats').check()
+
+
+def test_nested_pauses_parent():
+    app = Parent()
+    app.magics.profile.on = True
+    app.magics.profile.top = 1000
+    app.child.magics.profile.on = True
+    app.execute()
+    parent = [f['function'] for f in app.magics.meta.data['profile']['top']]
+    child = [f['function'] for f in
+             app.child.magics.meta.data['profile']['top']]
+    assert any(f.endswith('(work)') for f in child)
+    assert not any(f.endswith('(work)') for f in parent)
+
+
+class Failing(Computer):
+
+    def run(self):
+        raise RuntimeError('failed')
+
+
+def test_stopped_on_error():
+    app = Failing()
+    app.magics.profile.on = True
+    app.magics.profile.tracemalloc = True
+    with pytest.raises(RuntimeError):
+        app.execute()
+
+    import tracemalloc
+    assert not tracemalloc.is_tracing()
+    assert sys.getprofile() is None
+
+
+def test_not_parameters():
+    from ..profiling import RecordProfile
+    assert RecordProfile().params() == {}
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+import pytest
+
+from ...apps import Computer
+from ..timing import resource, getio_self
+
+
+class SubprocessApp(Computer):
+
+    def run(self):
+        subprocess.check_call([sys.executable, '-c', 'sum(range(10**7))'])
+
+
+@pytest.mark.skipif(resource is None, reason='requires resource module')
+def test_children_cpu_time():
+    app = SubprocessApp()
+    app.execute()
+    summary = app.magics.meta.data['timing']['summary']
+    assert summary['cpu_children'] > 0
+    assert summary['cpu'] >= summary['cpu_children']
+
+
+def test_getio_self(tmpdir):
+    path = tmpdir.join('io')
+    path.write('rchar: 10\nwchar: 20\nread_bytes: 4096\nbroken\n')
+    assert getio_self(str(path)) == dict(rchar=10, wchar=20, read_bytes=4096)
+    assert getio_self(str(tmpdir.join('missing'))) == {}
@@ -0,0 +1,71 @@
+import subprocess
+
+import pytest
+
+from .. import vcs
+
+
+def git(repo, *args):
+    return subprocess.check_output(
+        ('git', '-c', 'user.name=test', '-c', 'user.email=test@example.com')
+        + args,
+        cwd=str(repo), universal_newlines=True).strip()
+
+
+@pytest.fixture
+def repo(tmpdir):
+    git(tmpdir, 'init', '-q')
+    tmpdir.join('module.py').write('x = 1\n')
+    git(tmpdir, 'add', 'module.py')
+    git(tmpdir, 'commit', '-q', '-m', 'first')
+    vcs._cache.clear()
+    return tmpdir
+
+
+def test_direct_revision(repo):
+    filepath = str(repo.join('module.py'))
+    direct = vcs.getvcs(filepath, 'direct')
+    assert direct.root == str(repo)
+    assert direct.revision() == git(repo, 'rev-parse', 'HEAD')
+    assert direct.isclean() is None
+
+
+def test_direct_packed_and_detached(repo):
+    filepath = str(repo.join('module.py'))
+    head = git(repo, 'rev-parse', 'HEAD')
+    git(repo, 'pack-refs', '--all')
+    assert vcs.getvcs(filepath, 'direct').revision() == head
+    git(repo, 'checkout', '-q', '--detach')
+    assert vcs.getvcs(filepath, 'direct').revision() == head
+
+
+def test_direct_worktree(repo, tmpdir_factory):
+    path = tmpdir_factory.mktemp('wt').join('tree')
+    git(repo, 'worktree', 'add', '-q', '-b', 'other', str(path))
+    git(path, 'commit', '-q', '--allow-empty', '-m', 'second')
+    direct = vcs.getvcs(str(path.join('module.py')), 'direct')
+    assert direct.root == str(path)
+    assert direct.revision() == git(path, 'rev-parse', 'HEAD')
+
+
+def test_cache(repo, monkeypatch):
+    filepath = str(repo.join('module.py'))
+    first = vcs.cached_vcsinfo(filepath)
+    assert first['revision'] == git(repo, 'rev-parse', 'HEAD')
+
+    def fail(*_, **__):
+        raise AssertionError('git must not be called')
+    monkeypatch.setattr(subprocess, 'check_output', fail)
+    assert vcs.cached_vcsinfo(filepath) == first
+    other = str(repo.join('other.py'))
+    assert vcs.cached_vcsinfo(other)['filepath'] == other
+    monkeypatch.undo()
+
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'second')
+    second = vcs.cached_vcsinfo(filepath)
+    assert second['revision'] == git(repo, 'rev-parse', 'HEAD')
+    assert second['revision'] != first['revision']
+
+
+def test_not_in_repository(tmpdir):
+    assert vcs.cached_vcsinfo(str(tmpdir.join('module.py'))) is None
@@ -1,31 +1,123 @@
+import sys
 import time
 try:
     import resource
 except ImportError:
     resource = None
 
-from ..interface import Plugin
+from ..base import itervars
+from ..interface import Plugin, Executable
 from ..descriptors import Link
+from .misc import real_owner
 
+perf_counter = getattr(time, 'perf_counter', time.time)
+process_time = getattr(time, 'process_time', time.clock
+                       if hasattr(time, 'clock') else time.time)
 
-def _getrusage_self():
+
+def _getrusage(who):
     """
     See: getrusage(2)
     """
-    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    rusage = resource.getrusage(who)
     return {k: getattr(rusage, k) for k in dir(rusage) if k.startswith('ru_')}
 
+
+def _getrusage_self():
+    return _getrusage(resource.RUSAGE_SELF)
+
+
+def _getrusage_children():
+    return _getrusage(resource.RUSAGE_CHILDREN)
+
 if resource is None:
     def getrusage_self():
         return {}
+
+    def getrusage_children():
+        return {}
 else:
     getrusage_self = _getrusage_self
+    getrusage_children = _getrusage_children
+
+
+def getio_self(path='/proc/self/io'):
+    """
+    I/O counters of the current process (Linux only; `{}` otherwise).
+    """
+    try:
+        with open(path) as file:
+            lines = file.readlines()
+    except (IOError, OSError):
+        return {}
+    counters = {}
+    for line in lines:
+        key, _, value = line.partition(':')
+        try:
+            counters[key.strip()] = int(value)
+        except ValueError:
+            continue
+    return counters
 
 
 def gettimings():
     return dict(
         time=time.time(),
+        perf_counter=perf_counter(),
+        process_time=process_time(),
         rusage=getrusage_self(),
+        rusage_children=getrusage_children(),
+        io=getio_self(),
+    )
+
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS:
+_maxrss_unit = 1 if sys.platform == 'darwin' else 1024
+
+
+def summarize(pre, post):
+    """
+    Headline numbers of resource usage between two `gettimings` calls.
+
+    ``cpu`` includes the CPU time of child processes which have been
+    waited for (e.g., terminated pool workers).  ``maxrss_delta`` is
+    the increase of the peak resident set size in bytes; it is zero if
+    the peak was reached before `pre`.  ``cpu_utilization`` close to
+    (or more than) 1 indicates CPU-bound stage and low value with large
+    ``io_*`` indicates I/O-bound stage.
+
+    >>> pre = gettimings()
+    >>> post = gettimings()
+    >>> sorted(summarize(pre, post))         # doctest: +NORMALIZE_WHITESPACE
+    ['cpu', 'cpu_children', 'cpu_self', 'cpu_utilization', 'io_read_bytes',
+     'io_write_bytes', 'maxrss_delta', 'wall']
+
+    """
+    def delta(key, sub=None, name=None):
+        a, b = pre.get(key, {}), post.get(key, {})
+        if sub is not None:
+            a, b = a.get(sub, {}), b.get(sub, {})
+        if name not in a or name not in b:
+            return 0
+        return b[name] - a[name]
+
+    def cputime(key):
+        return (delta(key, name='ru_utime') +
+                delta(key, name='ru_stime'))
+
+    wall = post['perf_counter'] - pre['perf_counter']
+    cpu_self = post['process_time'] - pre['process_time']
+    cpu_children = cputime('rusage_children')
+    cpu = cpu_self + cpu_children
+    return dict(
+        wall=wall,
+        cpu_self=cpu_self,
+        cpu_children=cpu_children,
+        cpu=cpu,
+        cpu_utilization=(cpu / wall) if wall > 0 else 0.0,
+        maxrss_delta=delta('rusage', name='ru_maxrss') * _maxrss_unit,
+        io_read_bytes=delta('io', name='read_bytes'),
+        io_write_bytes=delta('io', name='write_bytes'),
     )
 
 
@@ -51,14 +143,61 @@ class RecordTiming(Plugin):
     >>> 0.5 < timing['post']['time'] - timing['pre']['time'] < 1.5
     True
 
+    Headline numbers are in ``timing['summary']``:
+
+    >>> 0.5 < timing['summary']['wall'] < 1.5
+    True
+    >>> timing['summary']['cpu_utilization'] < 0.5
+    True
+
+    Summaries of nested executables are collected in
+    ``timing['stages']``:
+
+    >>> class Stage(Computer):
+    ...     def run(self):
+    ...         time.sleep(0.1)
+    >>> class Pipeline(Computer):
+    ...     first = Stage
+    ...     second = Stage
+    ...     def run(self):
+    ...         self.first.execute()
+    ...         self.second.execute()
+    >>> app = Pipeline()
+    >>> app.execute()
+    >>> stages = app.magics.meta.data['timing']['stages']
+    >>> sorted(stages)
+    ['first', 'second']
+    >>> 0.1 < stages['first']['wall'] < 0.5
+    True
+
     """
 
     meta = Link('..meta')
 
     def pre_run(self):
         self.timing = {}
+        self.summary = None
         self.timing['pre'] = gettimings()
 
     def post_run(self):
         self.timing['post'] = gettimings()
+        self.summary = summarize(self.timing['pre'], self.timing['post'])
+        self.timing['summary'] = self.summary
+        stages = dict(self.stages())
+        if stages:
+            self.timing['stages'] = stages
         self.meta.record('timing', self.timing)
+
+    def stages(self):
+        """
+        Yield ``(name, summary)`` of nested executables which have run.
+        """
+        for name, excbl in itervars(real_owner(self)):
+            if not isinstance(excbl, Executable):
+                continue
+            try:
+                summary = excbl.magics.recordtiming.summary
+            except AttributeError:
+                continue
+            if summary is not None:
+                yield name, summary
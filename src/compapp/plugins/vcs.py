@@ -1,9 +1,10 @@
 import os
 import subprocess
 import sys
+import threading
 
 from ..interface import Plugin
-from ..descriptors import Link
+from ..descriptors import Link, Choice
 from .misc import real_owner
 
 
@@ -44,8 +45,89 @@ class Git(object):
         )
 
 
-def getvcs(filepath):
-    vcs_candidates = [cls(filepath) for cls in [Git]]
+def find_git_root(dirpath):
+    """
+    Find the top-level directory of git repository containing `dirpath`.
+    """
+    path = os.path.abspath(dirpath)
+    while True:
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def git_dirs(root):
+    """
+    Return a pair of git directory and common directory of `root`.
+
+    They are different for a working tree added by ``git worktree``.
+
+    """
+    gitdir = os.path.join(root, '.git')
+    if os.path.isfile(gitdir):
+        # Work tree or submodule; .git is a file "gitdir: <path>"
+        with open(gitdir) as file:
+            content = file.read().strip()
+        if content.startswith('gitdir:'):
+            gitdir = os.path.normpath(os.path.join(
+                root, content[len('gitdir:'):].strip()))
+    commondir = gitdir
+    if os.path.isfile(os.path.join(gitdir, 'commondir')):
+        with open(os.path.join(gitdir, 'commondir')) as file:
+            commondir = os.path.normpath(os.path.join(
+                gitdir, file.read().strip()))
+    return gitdir, commondir
+
+
+class GitDirect(Git):
+
+    """
+    Read git information from the :file:`.git` directory without forking.
+
+    It can determine the revision but not whether the working tree
+    is clean; `.isclean` returns `None`.
+
+    """
+
+    def _get_root(self):
+        return find_git_root(self.dirpath)
+
+    def revision(self):
+        gitdir, commondir = git_dirs(self.root)
+        with open(os.path.join(gitdir, 'HEAD')) as file:
+            head = file.read().strip()
+        if not head.startswith('ref:'):
+            return head  # detached HEAD
+        ref = head[len('ref:'):].strip()
+        for base in (gitdir, commondir):
+            path = os.path.join(base, *ref.split('/'))
+            if os.path.isfile(path):
+                with open(path) as file:
+                    return file.read().strip()
+        packed = os.path.join(commondir, 'packed-refs')
+        if os.path.isfile(packed):
+            with open(packed) as file:
+                for line in file:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        return None  # branch without any commit
+
+    def isclean(self):
+        return None
+
+
+vcs_methods = {
+    'subprocess': [Git],
+    'direct': [GitDirect],
+}
+
+
+def getvcs(filepath, method='subprocess'):
+    vcs_candidates = [cls(filepath) for cls in vcs_methods[method]]
     depth, vcs = max(((-1 if vcs.root is None else len(vcs.root)), vcs)
                      for vcs in vcs_candidates)
     if depth < 0:
@@ -53,6 +135,63 @@ def getvcs(filepath):
     return vcs
 
 
+def _stamp(root):
+    """
+    Modification times of the files changed by commits and checkouts.
+    """
+    gitdir, commondir = git_dirs(root)
+    paths = [os.path.join(gitdir, 'HEAD'),
+             os.path.join(gitdir, 'index'),
+             os.path.join(commondir, 'packed-refs')]
+    try:
+        with open(paths[0]) as file:
+            head = file.read().strip()
+    except IOError:
+        head = ''
+    if head.startswith('ref:'):
+        ref = head[len('ref:'):].strip().split('/')
+        paths.append(os.path.join(gitdir, *ref))
+        paths.append(os.path.join(commondir, *ref))
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None
+                 for p in paths)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def cached_vcsinfo(filepath, method='subprocess'):
+    """
+    Return VCS information of `filepath` using a process-wide cache.
+
+    The information is cached per repository root and invalidated
+    when :file:`.git/HEAD`, :file:`.git/index` or the current branch
+    ref are modified.  Note that editing a tracked file without
+    staging it (i.e., without ``git add``) does not touch the index
+    and is not detected; ``isclean`` may be stale in that case.
+
+    """
+    root = find_git_root(os.path.dirname(filepath))
+    if root is None:
+        return None
+    stamp = _stamp(root)
+    key = (root, method)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        info = cached[1]
+    else:
+        vcs = getvcs(filepath, method)
+        if vcs is None:
+            return None
+        info = vcs.vcsinfo()
+        # `git status` may refresh .git/index; take the stamp again:
+        stamp = _stamp(root)
+        with _cache_lock:
+            _cache[key] = (stamp, info)
+    return dict(info, filepath=filepath)
+
+
 class RecordVCS(Plugin):
 
     """
@@ -90,9 +229,26 @@ class RecordVCS(Plugin):
 
     meta = Link('..meta')
 
+    method = Choice('subprocess', 'direct')
+    """
+    How to get VCS information.  ``'subprocess'`` runs ``git``
+    commands.  ``'direct'`` reads the :file:`.git` directory without
+    forking any process but it cannot tell if the working tree is
+    clean (``isclean`` is recorded as `None`).
+    """
+
+    cache = True
+    """
+    Reuse VCS information within the process (see `cached_vcsinfo`).
+    """
+
     def pre_run(self):
         cls = type(real_owner(self))
         filepath = sys.modules[cls.__module__].__file__
-        vcs = getvcs(filepath)
-        if vcs:
-            self.meta.record('vcs', vcs.vcsinfo())
+        if self.cache:
+            info = cached_vcsinfo(filepath, self.method)
+        else:
+            vcs = getvcs(filepath, self.method)
+            info = vcs and vcs.vcsinfo()
+        if info:
+            self.meta.record('vcs', info)
@@ -0,0 +1,174 @@
+"""
+Read saved runs without importing the app classes.
+"""
+
+import json
+import os
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from .loader import _meta_path
+from .plugins.metastore import MetaStore
+from .plugins.recorders import result_groups
+from .plugins.serializers import registry
+
+
+class LazyResults(Mapping):
+
+    """
+    Read-only mapping of results which are loaded on the first access.
+
+    Only the file holding the requested entry is read and loaded
+    values are cached.  Entries can also be accessed as attributes.
+
+    """
+
+    def __init__(self, dirpath, name='results'):
+        self._dirpath = dirpath
+        self._loaded = {}
+        self._where = {}
+        self._unindexed = []
+        for group, keys in result_groups(self._path, name).items():
+            if keys is None:
+                self._unindexed.append(group)
+            else:
+                self._where.update((k, group) for k in keys)
+
+    def _path(self, *parts):
+        return os.path.join(self._dirpath, *parts)
+
+    def _load(self, group, keys):
+        serializer, file = group
+        items = registry.get(serializer).load(self._path(*file.split('/')),
+                                              keys)
+        for key, value in items:
+            self._loaded[key] = value
+            self._where[key] = group
+
+    def _index(self):
+        # Files saved without manifest have to be loaded to know keys:
+        while self._unindexed:
+            self._load(self._unindexed.pop(), None)
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            self._index()
+            if key not in self._where:
+                raise KeyError(key)
+            if key not in self._loaded:
+                self._load(self._where[key], [key])
+        return self._loaded[key]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __iter__(self):
+        self._index()
+        return iter(sorted(self._where))
+
+    def __len__(self):
+        self._index()
+        return len(self._where)
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(type(self).__name__, list(self))
+
+
+class SavedRun(object):
+
+    """
+    A run saved in a datastore directory.
+
+    See `read`.
+
+    """
+
+    def __init__(self, path):
+        self.metapath = _meta_path(path)
+        self.path = os.path.dirname(self.metapath)
+        self._params = self._meta = self._results = None
+
+    @property
+    def params(self):
+        """Parameters (contents of :file:`params.json`)."""
+        if self._params is None:
+            with open(os.path.join(self.path, 'params.json')) as file:
+                self._params = json.load(file)
+        return self._params
+
+    @property
+    def meta(self):
+        """Meta data (contents of :file:`meta.json`)."""
+        if self._meta is None:
+            self._meta = MetaStore.read(self.metapath)
+        return self._meta
+
+    @property
+    def results(self):
+        """Results as `LazyResults`."""
+        if self._results is None:
+            self._results = LazyResults(self.path)
+        return self._results
+
+    @property
+    def classpath(self):
+        """Dotted path to the class of the app which saved this run."""
+        info = self.meta['programinfo']
+        return info['module'] + '.' + info['class']
+
+    def load(self, keys=None):
+        """
+        Load the run as a live app object by `compapp.load`.
+        """
+        from .loader import load
+        return load(self.path, keys=keys)
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(type(self).__name__, self.path)
+
+
+def read(path):
+    """
+    Read a run saved at `path` without importing its app class.
+
+    `path` can be a path to a datastore directory, a path to a
+    params.json file, or a path to a meta.json file (as in
+    `compapp.load`).  Unlike `compapp.load`, the app module is not
+    imported and no plugin is run.  Results are loaded lazily.  Use
+    `SavedRun.load` if the live app object is needed.
+
+    Examples
+    --------
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> from compapp import Computer
+    >>> class MyApp(Computer):
+    ...     x = 2
+    ...     def run(self):
+    ...         self.results.y = self.x ** 2
+    ...         self.results.z = [self.x]
+    >>> app = MyApp()
+    >>> app.datastore.dir = 'out'
+    >>> app.execute()
+
+    >>> run = read('out')
+    >>> run.params['x']
+    2
+    >>> run.results.y
+    4
+    >>> sorted(run.results)
+    ['y', 'z']
+    >>> run.classpath
+    'compapp.reader.MyApp'
+
+    """
+    return SavedRun(path)
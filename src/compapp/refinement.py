@@ -0,0 +1,194 @@
+"""
+Acquisition rules for adaptive refinement of `.Variator` sweeps.
+
+After the initial sweep, `.Variator` repeatedly passes the rows of the
+sweep table (`dict`\\ s mapping ``'index'``, dotted parameter names
+and ``'results.<key>'`` to values; see `.table_row`) of all completed
+variants to `Refiner.propose` and executes the proposed points, until
+the rule proposes nothing (e.g., the tolerance is met) or the budget
+is used up.  Select a rule by `.Variator.refinerpath`::
+
+    capp mrun DOTTED.PATH.TO.A.CLASS -- \\
+        '--builder.linspaces["x"]:leval=(0.0, 1.0, 5)' \\
+        --refinerpath .Bisection \\
+        --refiner.axis x --refiner.result y --refiner.tolerance 0.01
+
+"""
+
+import json
+import numbers
+
+from .core import Parametric
+from .utils.importer import import_object
+
+
+def group_rows(rows, axis):
+    """
+    Group `rows` by parameters other than `axis` and sort by `axis`.
+
+    >>> rows = [{'index': 0, 'a': 1, 'b': 'x'},
+    ...         {'index': 1, 'a': 0, 'b': 'x'},
+    ...         {'index': 2, 'a': 0, 'b': 'y'}]
+    >>> [[r['index'] for r in g] for g in group_rows(rows, 'a')]
+    [[1, 0], [2]]
+
+    """
+    groups = {}
+    for row in rows:
+        if row.get(axis) is None:
+            continue
+        others = dict((k, v) for k, v in row.items()
+                      if k != axis and k != 'index'
+                      and not k.startswith('results.'))
+        groups.setdefault(json.dumps(others, sort_keys=True), []).append(row)
+    return [sorted(groups[k], key=lambda r: r[axis]) for k in sorted(groups)]
+
+
+def midpoint(row0, row1, axis):
+    """
+    Varied parameters of the point between `row0` and `row1`.
+    """
+    point = dict((k, v) for k, v in row0.items()
+                 if k != 'index' and not k.startswith('results.'))
+    point[axis] = (row0[axis] + row1[axis]) / 2.0
+    return point
+
+
+def _number(value):
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class Refiner(Parametric):
+
+    """
+    Base class of acquisition rules.  It does not refine anything.
+
+    Subclasses override `propose` (and set `rounds` to a positive
+    number).
+    """
+
+    rounds = 0
+    """
+    Maximum number of refinement rounds.  ``0`` disables refinement.
+    """
+
+    budget = 100
+    """
+    Maximum number of variants to be added by refinement in total.
+    """
+
+    def propose(self, rows):
+        """
+        |TO BE EXTENDED| Return new points given the completed `rows`.
+
+        Each point is a `dict` mapping dotted parameter names to
+        values.  An empty list means that refinement is finished.
+
+        """
+        return []
+
+
+class AxisRefiner(Refiner):
+
+    """
+    Base class of rules refining intervals along a parameter axis.
+    """
+
+    rounds = 10
+
+    axis = ''
+    """
+    Dotted name of the (float) parameter to be refined.
+    """
+
+    result = ''
+    """
+    Name of the scalar result (``results.<result>`` in the table).
+    """
+
+    tolerance = 0.0
+    """
+    Intervals narrower than this are not refined.
+    """
+
+    def intervals(self, rows):
+        """
+        Yield ``(row0, row1, f0, f1)`` for refinable adjacent points.
+        """
+        key = 'results.' + self.result
+        for group in group_rows(rows, self.axis):
+            for row0, row1 in zip(group, group[1:]):
+                f0 = _number(row0.get(key))
+                f1 = _number(row1.get(key))
+                if f0 is None or f1 is None:
+                    continue
+                if row1[self.axis] - row0[self.axis] <= self.tolerance:
+                    continue
+                yield row0, row1, f0, f1
+
+
+class Bisection(AxisRefiner):
+
+    """
+    Bisect intervals where the result crosses `threshold`.
+
+    >>> rows = [{'index': i, 'x': x, 'results.y': x - 0.3}
+    ...         for i, x in enumerate([0.0, 0.5, 1.0])]
+    >>> Bisection(axis='x', result='y', tolerance=0.1).propose(rows)
+    [{'x': 0.25}]
+
+    """
+
+    threshold = 0.0
+
+    def propose(self, rows):
+        return [midpoint(row0, row1, self.axis)
+                for row0, row1, f0, f1 in self.intervals(rows)
+                if (f0 > self.threshold) != (f1 > self.threshold)]
+
+
+class Gradient(AxisRefiner):
+
+    """
+    Bisect intervals where the result changes the most.
+
+    At most `per_round` intervals whose absolute change of the result
+    is larger than `min_change` are bisected in each round.
+
+    >>> rows = [{'index': i, 'x': x, 'results.y': x ** 4}
+    ...         for i, x in enumerate([0.0, 0.5, 1.0])]
+    >>> Gradient(axis='x', result='y', per_round=1).propose(rows)
+    [{'x': 0.75}]
+
+    """
+
+    per_round = 4
+    min_change = 0.0
+
+    def propose(self, rows):
+        scored = sorted(
+            ((-abs(f1 - f0), row0['index'], row0, row1)
+             for row0, row1, f0, f1 in self.intervals(rows)
+             if abs(f1 - f0) > self.min_change),
+            key=lambda s: s[:2])
+        return [midpoint(row0, row1, self.axis)
+                for _, _, row0, row1 in scored[:self.per_round]]
+
+
+class Callback(Refiner):
+
+    """
+    Call a user-defined function ``function(rows) -> points``.
+    """
+
+    rounds = 10
+
+    function = ''
+    """
+    Dotted path to the function (e.g., ``'mymodule.propose'``).
+    """
+
+    def propose(self, rows):
+        return list(import_object(self.function)(rows))
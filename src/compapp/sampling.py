@@ -0,0 +1,166 @@
+"""
+Sequences of points in the unit hypercube for parameter sampling.
+
+Each function returns an iterator yielding tuples of `dim` floats in
+``[0, 1)``.  Points are generated lazily so that they can be streamed
+to `.Variator`.  See `.ParamBuilder.sampler`.
+
+"""
+
+from __future__ import division
+
+import itertools
+
+# Primitive polynomials and initial direction numbers for the Sobol
+# sequence, taken from the "new-joe-kuo-6.21201" table of S. Joe and
+# F. Y. Kuo (2008).  Each entry is (degree s, coefficients a, m_1..m_s)
+# for the dimensions 2, 3, ...; the first dimension is the van der
+# Corput sequence.
+_SOBOL_TABLE = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+]
+
+SOBOL_MAX_DIM = len(_SOBOL_TABLE) + 1
+_SOBOL_BITS = 30
+
+
+def _direction_numbers(degree, coeffs, initial, bits=_SOBOL_BITS):
+    m = list(initial)
+    for i in range(degree, bits):
+        new = m[i - degree] ^ (m[i - degree] << degree)
+        for k in range(1, degree):
+            if (coeffs >> (degree - 1 - k)) & 1:
+                new ^= m[i - k] << k
+        m.append(new)
+    return [m[i] << (bits - i - 1) for i in range(bits)]
+
+
+def _trailing_zeros(n):
+    return (n & -n).bit_length() - 1
+
+
+def sobol(dim):
+    """
+    Sobol low-discrepancy sequence (without scrambling).
+
+    >>> points = sobol(2)
+    >>> [next(points) for _ in range(4)]
+    [(0.0, 0.0), (0.5, 0.5), (0.75, 0.25), (0.25, 0.75)]
+
+    At most `SOBOL_MAX_DIM` dimensions and ``2 ** 30`` points are
+    supported.
+
+    """
+    if not 1 <= dim <= SOBOL_MAX_DIM:
+        raise ValueError('Sobol sequence supports 1 to {0} dimensions;'
+                         ' got {1}.  Use Halton sequence instead.'
+                         .format(SOBOL_MAX_DIM, dim))
+    directions = [[1 << (_SOBOL_BITS - i - 1) for i in range(_SOBOL_BITS)]]
+    directions.extend(_direction_numbers(*entry)
+                      for entry in _SOBOL_TABLE[:dim - 1])
+    scale = 1.0 / (1 << _SOBOL_BITS)
+    x = [0] * dim
+    yield tuple(float(v) for v in x)
+    for n in itertools.islice(itertools.count(1), (1 << _SOBOL_BITS) - 1):
+        # Gray code ordering: flip the bit changed in n's Gray code
+        c = _trailing_zeros(n)
+        for j in range(dim):
+            x[j] ^= directions[j][c]
+        yield tuple(v * scale for v in x)
+
+
+def primes():
+    """
+    Yield prime numbers.
+
+    >>> list(itertools.islice(primes(), 6))
+    [2, 3, 5, 7, 11, 13]
+
+    """
+    found = []
+    for n in itertools.count(2):
+        if all(n % p for p in found if p * p <= n):
+            found.append(n)
+            yield n
+
+
+def radical_inverse(n, base):
+    """
+    Reflect the digits of `n` in `base` about the radix point.
+
+    >>> radical_inverse(6, 2)  # 110 -> 0.011
+    0.375
+
+    """
+    inv = 0.0
+    scale = 1.0 / base
+    while n:
+        n, digit = divmod(n, base)
+        inv += digit * scale
+        scale /= base
+    return inv
+
+
+def halton(dim):
+    """
+    Halton low-discrepancy sequence (starting from the index 1).
+
+    >>> points = halton(2)
+    >>> [next(points) for _ in range(3)] == [
+    ...     (1 / 2, 1 / 3), (1 / 4, 2 / 3), (3 / 4, 1 / 9)]
+    True
+
+    """
+    bases = list(itertools.islice(primes(), dim))
+    for n in itertools.count(1):
+        yield tuple(radical_inverse(n, b) for b in bases)
+
+
+def uniform(num, dim, seed=None):
+    """
+    `num` uniformly random points.
+    """
+    import numpy
+    rng = numpy.random.RandomState(seed)
+    for _ in range(num):
+        yield tuple(rng.random_sample(dim).tolist())
+
+
+def latin_hypercube(num, dim, seed=None):
+    """
+    Latin hypercube sample of `num` points.
+
+    Each of `num` equally spaced strata in each dimension contains
+    exactly one point:
+
+    >>> points = list(latin_hypercube(4, 2, seed=0))
+    >>> sorted(int(p[0] * 4) for p in points)
+    [0, 1, 2, 3]
+    >>> sorted(int(p[1] * 4) for p in points)
+    [0, 1, 2, 3]
+
+    """
+    import numpy
+    rng = numpy.random.RandomState(seed)
+    strata = numpy.array([rng.permutation(num) for _ in range(dim)]).T
+    for i in range(num):
+        yield tuple(((strata[i] + rng.random_sample(dim)) / num).tolist())
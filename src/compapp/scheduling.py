@@ -0,0 +1,237 @@
+"""
+Cost-aware scheduling of `.Variator` sweeps.
+
+Variants are ordered longest-first using cost estimates so that a few
+expensive variants do not run alone at the tail of a sweep.  Costs
+are estimated by a user-supplied function or from the wall time
+recorded by `.RecordTiming` in previous sweeps.
+
+"""
+
+from __future__ import division
+
+import json
+import numbers
+import os
+
+from .aggregation import read_rows
+from .plugins.metastore import MetaStore
+
+
+def _getnested(dct, dotted):
+    for key in dotted.split('.'):
+        dct = dct[key]
+    return dct
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+class TimingCostModel(object):
+
+    """
+    Estimate cost of variants from timings of previous sweeps.
+
+    The cost of a point is the wall time (``timing.summary.wall`` in
+    :file:`meta.json`) of the nearest previously executed variant.
+    Non-numeric parameters have to match exactly and numeric ones are
+    compared after being scaled by their range in the samples.
+    Samples are indexed by the non-numeric parameters and distances
+    are computed by NumPy so that estimating costs of a large sweep
+    is cheap.
+
+    >>> model = TimingCostModel.from_samples(
+    ...     ['x', 'y'],
+    ...     [({'x': 0.0, 'y': 'a'}, 1.0),
+    ...      ({'x': 1.0, 'y': 'a'}, 5.0),
+    ...      ({'x': 0.0, 'y': 'b'}, 9.0)])
+    >>> model({'x': 0.8, 'y': 'a'})
+    5.0
+    >>> model({'x': 0.8, 'y': 'b'})
+    9.0
+    >>> model({'x': 0.8, 'y': 'c'})  # mean
+    5.0
+
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.samples = []
+        self._index = None
+
+    @classmethod
+    def from_samples(cls, keys, samples):
+        model = cls(keys)
+        for point, cost in samples:
+            model.add(point, cost)
+        return model
+
+    @classmethod
+    def from_sweeps(cls, keys, dirs, manifest='sweep.jsonl'):
+        """
+        Collect samples from sweeps (`.Variator` datastores) in `dirs`.
+        """
+        model = cls(keys)
+        for sweepdir in dirs:
+            path = os.path.join(sweepdir, manifest)
+            if not os.path.exists(path):
+                continue
+            for entry in read_rows(path):
+                if entry.get('status') != 'finished' or not entry.get('path'):
+                    continue
+                try:
+                    # Paths are relative to the sweep; see SweepManifest:
+                    model.add_run(os.path.join(sweepdir, entry['path']))
+                except (IOError, OSError, ValueError, KeyError, TypeError):
+                    continue
+        return model
+
+    def add_run(self, path):
+        wall = MetaStore.read(path)['timing']['summary']['wall']
+        with open(os.path.join(path, 'params.json')) as file:
+            params = json.load(file)
+        self.add(flatten_point(params, self.keys), wall)
+
+    def add(self, point, cost):
+        self.samples.append((point, cost))
+        self._index = None
+
+    def _scales(self):
+        scales = {}
+        for key in self.keys:
+            values = [p[key] for p, _ in self.samples
+                      if _is_number(p.get(key))]
+            if values:
+                scales[key] = (max(values) - min(values)) or 1.0
+        return scales
+
+    def _build_index(self):
+        import numpy
+        scales = self._scales()
+        numeric = dict(
+            (key, numpy.array([p[key] if _is_number(p.get(key))
+                               else numpy.nan for p, _ in self.samples],
+                              dtype=float))
+            for key in scales)
+        costs = numpy.array([c for _, c in self.samples], dtype=float)
+        # groups[exact_keys][values] -> indices of matching samples
+        self._index = (scales, numeric, costs, {})
+
+    def _groups(self, exact):
+        import numpy
+        groups = {}
+        for i, (sample, _) in enumerate(self.samples):
+            groups.setdefault(_hashable(sample, exact), []).append(i)
+        return dict((k, numpy.array(v)) for k, v in groups.items())
+
+    def __call__(self, point):
+        if not self.samples:
+            return None
+        if self._index is None:
+            self._build_index()
+        scales, numeric, costs, groups = self._index
+        close = [k for k in self.keys
+                 if k in scales and _is_number(point.get(k))]
+        exact = tuple(k for k in self.keys if k not in close)
+        if exact not in groups:
+            groups[exact] = self._groups(exact)
+        members = groups[exact].get(_hashable(point, exact))
+        if members is None:
+            return float(costs.mean())
+        distance = 0.0
+        for key in close:
+            distance = distance + (
+                (point[key] - numeric[key][members]) / scales[key]) ** 2
+        if close:
+            import numpy
+            distance[numpy.isnan(distance)] = numpy.inf
+            best = numpy.argmin(distance)  # the first one on tie
+            if numpy.isinf(distance[best]):
+                return float(costs.mean())
+        else:
+            best = 0
+        return float(costs[members[best]])
+
+
+def _hashable(point, keys):
+    return json.dumps([point.get(k) for k in keys], sort_keys=True,
+                      default=repr)
+
+
+def flatten_point(param, keys):
+    """
+    Convert nested `param` to a `dict` with dotted `keys`.
+
+    >>> flatten_point({'a': {'b': 1}, 'c': 2}, ['a.b', 'c', 'd'])
+    {'a.b': 1, 'c': 2}
+
+    """
+    point = {}
+    for key in keys:
+        try:
+            point[key] = _getnested(param, key)
+        except (KeyError, TypeError):
+            pass
+    return point
+
+
+def longest_first(items, cost):
+    """
+    Sort `items` by decreasing `cost(item)`; unknown (`None`) costs last.
+
+    The sort is stable so that the original order is kept among items
+    with equal cost.
+
+    >>> longest_first([1, 3, None, 2], lambda x: x)
+    [3, 2, 1, None]
+
+    """
+    keyed = [(cost(item), i, item) for i, item in enumerate(items)]
+    keyed.sort(key=lambda k: (k[0] is None, -(k[0] or 0), k[1]))
+    return [item for _, _, item in keyed]
+
+
+def utilization(handles, workers):
+    """
+    Summarize how busy `workers` were while executing `handles`.
+
+    ``utilization`` is the total busy time divided by ``workers *
+    wall`` and ``tail`` is the time from when the first worker ran
+    out of work until the end of the sweep.
+
+    >>> class H(object):
+    ...     def __init__(self, worker, started, finished):
+    ...         self.worker = worker
+    ...         self.started = started
+    ...         self.finished = finished
+    >>> report = utilization([H('a', 0, 4), H('b', 0, 1), H('b', 1, 2)], 2)
+    >>> report['utilization'], report['tail'], report['wall']
+    (0.75, 2, 4)
+
+    """
+    timed = [h for h in handles
+             if getattr(h, 'started', None) is not None]
+    if not timed:
+        return None
+    start = min(h.started for h in timed)
+    end = max(h.finished for h in timed)
+    busy = {}
+    last = {}
+    for h in timed:
+        busy[h.worker] = busy.get(h.worker, 0) + (h.finished - h.started)
+        last[h.worker] = max(last.get(h.worker, start), h.finished)
+    wall = end - start
+    workers = max(workers, len(busy))
+    if len(last) < workers:
+        tail = wall  # some workers had nothing to do
+    else:
+        tail = end - min(last.values())
+    total = sum(busy.values())
+    return dict(
+        workers=workers,
+        wall=wall,
+        busy=total,
+        utilization=(total / (workers * wall)) if wall > 0 else 1.0,
+        tail=tail,
+    )
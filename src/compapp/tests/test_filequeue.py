@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ..utils.filequeue import FileQueue, work
+
+
+def slow_square(x):
+    time.sleep(0.01 * (5 - x))
+    return x * x
+
+
+def fail(x):
+    raise ValueError(x)
+
+
+def start_worker(queue, **kwds):
+    thread = threading.Thread(target=work, args=(queue,), kwargs=kwds)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('chunksize', [1, 2])
+def test_imap(tmpdir, ordered, chunksize):
+    queue = FileQueue(str(tmpdir), poll=0.01)
+    workers = [start_worker(queue) for _ in range(2)]
+    results = list(queue.imap(slow_square, range(5), window=3,
+                              chunksize=chunksize, ordered=ordered))
+    queue.stop()
+    for thread in workers:
+        thread.join()
+    if ordered:
+        assert results == [0, 1, 4, 9, 16]
+    else:
+        assert sorted(results) == [0, 1, 4, 9, 16]
+
+
+def test_imap_error(tmpdir):
+    queue = FileQueue(str(tmpdir), poll=0.01)
+    thread = start_worker(queue, max_tasks=1)
+    with pytest.raises(RuntimeError) as excinfo:
+        list(queue.imap(fail, [1], window=1))
+    thread.join()
+    assert 'ValueError' in str(excinfo.value)
+
+
+def test_requeue_expired(tmpdir):
+    queue = FileQueue(str(tmpdir), lease=10)
+    tid = queue.submit(abs, -1)
+    assert queue.claim() == tid
+    assert queue.claim() is None
+    assert queue.requeue_expired() == 0
+
+    # The worker died; its heartbeat is getting old:
+    claimed = str(tmpdir.join('claimed').listdir()[0])
+    past = time.time() - 11
+    os.utime(claimed, (past, past))
+    assert queue.requeue_expired() == 1
+
+    assert work(queue, max_tasks=1) == 1
+    assert queue.result(tid) == (True, 1)
+    assert os.listdir(os.path.join(str(tmpdir), 'claimed')) == []
+
+
+def test_work_idle(tmpdir):
+    queue = FileQueue(str(tmpdir), poll=0.01)
+    assert work(queue, idle=0.05) == 0
+
+
+def test_requeued_result_is_discarded(tmpdir):
+    queue = FileQueue(str(tmpdir), lease=10)
+    tid = queue.submit(abs, -1)
+    slow = FileQueue(str(tmpdir), lease=10)  # another worker
+    assert slow.claim() == tid
+    claimed = str(tmpdir.join('claimed').listdir()[0])
+    past = time.time() - 11
+    os.utime(claimed, (past, past))
+    assert queue.requeue_expired() == 1
+
+    assert work(queue, max_tasks=1) == 1
+    assert not slow.finish(tid, True, 'late')
+    assert queue.result(tid) == (True, 1)
+    assert queue.result(tid) is None
+
+
+def test_reuse_after_stop(tmpdir):
+    queue = FileQueue(str(tmpdir), poll=0.01)
+    queue.stop()
+    # Workers started after stop() are not stopped:
+    thread = start_worker(queue)
+    assert list(queue.imap(abs, [-1, -2], window=2)) == [1, 2]
+    queue.stop()
+    thread.join(10)
+    assert not thread.is_alive()
+
+    tid = queue.submit(abs, -3)
+    queue.clear()
+    assert tmpdir.join('tasks').listdir() == []
+    assert queue.stop_token() is None
+    assert queue.result(tid) is None
@@ -0,0 +1,64 @@
+import pytest
+
+from ..apps import Computer
+from ..loader import load_many
+
+
+class Square(Computer):
+
+    x = 1
+
+    def run(self):
+        self.results.y = self.x ** 2
+
+
+@pytest.fixture
+def sweep(tmpdir):
+    for x in range(10):
+        app = Square(x=x)
+        app.datastore.dir = str(tmpdir.join('{0:02d}'.format(x)))
+        app.execute()
+    return tmpdir
+
+
+@pytest.mark.parametrize('workers, executor, loader', [
+    (0, 'thread', 'load'),
+    (3, 'thread', 'load'),
+    (3, 'thread', 'read'),
+    (3, 'process', 'read'),
+])
+def test_load_many(sweep, workers, executor, loader):
+    runs = list(load_many(str(sweep.join('*')), keys=['y'], workers=workers,
+                          executor=executor, loader=loader))
+    assert [run.results['y'] for (_, run, _) in runs] == \
+        [x ** 2 for x in range(10)]
+    assert all(error is None for (_, _, error) in runs)
+
+
+def test_corrupt_runs_are_reported(sweep):
+    sweep.join('03', 'meta.json').write('{broken')
+    sweep.join('05', 'results.json').remove()
+    failed = [(path, error) for (path, run, error)
+              in load_many(str(sweep.join('*')), workers=2, loader='read')
+              if error is not None]
+    assert [path for (path, _) in failed] == [
+        str(sweep.join('03')), str(sweep.join('05'))]
+
+
+def test_bounded(sweep):
+    consumed = []
+
+    def paths():
+        for i in range(10):
+            consumed.append(i)
+            yield str(sweep.join('{0:02d}'.format(i)))
+
+    runs = load_many(paths(), workers=2, loader='read', window=3)
+    next(runs)
+    assert len(consumed) <= 4
+    runs.close()
+
+
+def test_process_requires_read():
+    with pytest.raises(ValueError):
+        next(load_many([], workers=2, executor='process'))
@@ -0,0 +1,34 @@
+import sys
+import threading
+
+import pytest
+
+from ..utils.pool import imap_bounded
+
+
+def make_lock(_):
+    return threading.Lock()  # cannot be pickled
+
+
+@pytest.mark.skipif(sys.version_info[0] < 3,
+                    reason='error_callback is not supported')
+@pytest.mark.parametrize('ordered', [True, False])
+def test_unpicklable_result(ordered):
+    from multiprocessing import Pool
+    pool = Pool(2)
+    errors = []
+
+    def consume():
+        try:
+            list(imap_bounded(pool, make_lock, range(3), window=2,
+                              ordered=ordered))
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=consume)
+    thread.daemon = True
+    thread.start()
+    thread.join(60)
+    pool.terminate()
+    assert not thread.is_alive(), 'imap_bounded hangs'
+    assert len(errors) == 1
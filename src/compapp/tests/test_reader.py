@@ -0,0 +1,68 @@
+import sys
+
+import numpy
+import pytest
+
+from ..apps import Computer
+from ..plugins.serializers import NPZSerializer
+from ..reader import read
+
+
+class ArraysApp(Computer):
+
+    a = 1
+
+    def run(self):
+        self.results.x = numpy.arange(3)
+        self.results.y = numpy.ones(2)
+        self.results.n = 1
+
+
+@pytest.fixture
+def saved(tmpdir):
+    app = ArraysApp()
+    app.datastore.dir = str(tmpdir)
+    app.execute()
+    return tmpdir
+
+
+def test_no_import(saved, monkeypatch):
+    monkeypatch.setitem(sys.modules, __name__, None)  # break the import
+    run = read(str(saved))
+    assert run.params['a'] == 1
+    assert run.classpath == __name__ + '.ArraysApp'
+    assert run.results.n == 1
+    numpy.testing.assert_equal(run.results['x'], numpy.arange(3))
+
+
+def test_lazy(saved, monkeypatch):
+    loaded = []
+    load = NPZSerializer.load
+
+    def spy(self, path, keys=None):
+        loaded.append(keys)
+        return load(self, path, keys)
+    monkeypatch.setattr(NPZSerializer, 'load', spy)
+
+    run = read(str(saved.join('meta.json')))
+    assert sorted(run.results) == ['n', 'x', 'y']
+    assert loaded == []
+    run.results.x
+    run.results.x
+    assert loaded == [['x']]
+    with pytest.raises(KeyError):
+        run.results['z']
+    assert not hasattr(run.results, 'z')
+
+
+def test_without_manifest(saved):
+    saved.join('results.manifest.json').remove()
+    run = read(str(saved))
+    assert sorted(run.results) == ['n', 'x', 'y']
+    numpy.testing.assert_equal(run.results.y, numpy.ones(2))
+
+
+def test_load_live_object(saved):
+    app = read(str(saved)).load(keys=['x'])
+    assert isinstance(app, ArraysApp)
+    assert sorted(app.results) == ['x']
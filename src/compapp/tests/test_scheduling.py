@@ -0,0 +1,52 @@
+import random
+
+from ..scheduling import TimingCostModel
+
+
+def brute_force(samples, keys, point):
+    scales = {}
+    for key in keys:
+        values = [p[key] for p, _ in samples
+                  if isinstance(p.get(key), float)]
+        if values:
+            scales[key] = (max(values) - min(values)) or 1.0
+    best = None
+    for sample, cost in samples:
+        distance = 0.0
+        for key in keys:
+            a, b = point.get(key), sample.get(key)
+            if key in scales and isinstance(a, float) and \
+                    isinstance(b, float):
+                distance += ((a - b) / scales[key]) ** 2
+            elif a != b:
+                break
+        else:
+            if best is None or distance < best[0]:
+                best = (distance, cost)
+    if best is None:
+        return sum(c for _, c in samples) / len(samples)
+    return best[1]
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    keys = ['x', 'y', 'z']
+
+    def point():
+        return {'x': rng.random(),
+                'y': rng.choice(['a', 'b', None]),
+                'z': rng.choice([rng.random(), 'c'])}
+
+    samples = [(point(), rng.random()) for _ in range(200)]
+    model = TimingCostModel.from_samples(keys, samples)
+    for _ in range(100):
+        p = point()
+        assert model(p) == brute_force(samples, keys, p)
+
+
+def test_add_after_call():
+    model = TimingCostModel.from_samples(['x'], [({'x': 0.0}, 1.0)])
+    assert model({'x': 10.0}) == 1.0
+    model.add({'x': 10.0}, 5.0)
+    assert model({'x': 9.0}) == 5.0
+    assert model({'x': 1.0}) == 1.0
@@ -1,10 +1,17 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
 import pytest
 
-from ..apps import Computer
-from ..variator import Variator
+from ..apps import Computer, Memoizer
+from ..descriptors import Link
+from ..variator import ParamBuilder, Variator
 
-# executor_choices = Variator.executor.choices
-executor_choices = ['thread', 'dumb', pytest.mark.skip('process')]
+# The 'queue' executor needs workers; see test_queue.
+executor_choices = [e for e in Variator.executor.choices if e != 'queue']
 
 
 class SumAB(Computer):
@@ -59,3 +66,781 @@ def test_nested(executor):
     )
     app.execute()
     assert [v.x.results.c for v in app.variants] == list(range(2, 12))
+
+
+@pytest.mark.parametrize('executor', executor_choices)
+def test_shared_sysinfo(executor, tmpdir):
+    from ..plugins.sysinfo import RecordSysInfo
+    from ..reader import read
+    app = Variator(
+        classpath=__name__ + '.SumAB',
+        builder=dict(ranges=dict(a=(3,))),
+        executor=executor,
+        datastore=dict(dir=str(tmpdir))
+    )
+    app.execute()
+
+    assert len(tmpdir.join('sysinfo').listdir()) == 1
+    for i in range(3):
+        sysinfo = read(str(tmpdir.join(str(i)))).meta['sysinfo']
+        assert 'environ' not in sysinfo
+        full = RecordSysInfo.expand(sysinfo, str(tmpdir.join(str(i))))
+        assert 'environ' in full
+
+
+@pytest.mark.parametrize('table', ['npz', 'hdf5'])
+def test_table(table, tmpdir):
+    from ..aggregation import read_table
+    app = Variator(
+        classpath=__name__ + '.Sums',
+        builder=dict(ranges={'x.a': (3,)}, choices={'y.b': [10, 20]}),
+        datastore=dict(dir=str(tmpdir)),
+        table=table,
+    )
+    app.execute()
+    assert tmpdir.join('table.' + table).check()
+    assert not tmpdir.join('table.jsonl').check()
+
+    df = read_table(str(tmpdir))
+    assert list(df.columns) == ['index', 'x.a', 'y.b']
+    assert list(df['x.a']) == [0, 1, 2] * 2
+    assert list(df['y.b']) == [10, 10, 10, 20, 20, 20]
+
+    records = read_table(str(tmpdir), 'structured')
+    assert list(records['index']) == list(range(6))
+
+
+def test_table_results(tmpdir):
+    from ..aggregation import read_table
+    app = Variator(
+        classpath=__name__ + '.SumAB',
+        builder=dict(ranges=dict(a=(3,))),
+        datastore=dict(dir=str(tmpdir)),
+        table='npz',
+    )
+    app.execute()
+    table = read_table(str(tmpdir), 'dict')
+    assert list(table['results.c']) == [2.0, 3.0, 4.0]
+
+
+@pytest.mark.parametrize('executor', ['thread', 'dumb'])
+def test_stream(executor, tmpdir):
+    from ..aggregation import read_table
+    app = Variator(
+        classpath=__name__ + '.SumAB',
+        builder=dict(ranges=dict(a=(10,))),
+        executor=executor,
+        datastore=dict(dir=str(tmpdir)),
+        table='npz',
+        stream=True,
+        chunksize=3,
+        window=2,
+    )
+    app.execute()
+    assert app.variants == []
+    assert sorted(h.index for h in app.handles) == list(range(10))
+    for handle in app.handles:
+        assert handle.status == 'finished'
+        assert handle.params == {'a': handle.index}
+        assert handle.path == str(tmpdir.join(str(handle.index)))
+
+    table = read_table(str(tmpdir), 'dict')
+    assert list(table['index']) == list(range(10))
+    assert list(table['results.c']) == [i + 2.0 for i in range(10)]
+
+
+def test_stream_bounded():
+    from multiprocessing.dummy import Pool
+    from ..utils.pool import imap_bounded
+
+    consumed = []
+
+    def args():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    pool = Pool(2)
+    try:
+        results = imap_bounded(pool, lambda x: x, args(), window=2,
+                               chunksize=3, ordered=False)
+        first = next(results)
+        assert len(consumed) <= 3 * 3  # (window + 1) chunks at most
+        assert sorted([first] + list(results)) == list(range(100))
+    finally:
+        pool.close()
+
+
+class Counter(Computer):
+
+    x = 0
+
+    def run(self):
+        self.results.pid = os.getpid()
+
+
+def test_process_worker_preload(tmpdir):
+    app = Variator(
+        classpath=__name__ + '.Counter',
+        builder=dict(ranges=dict(x=(8,))),
+        executor='process',
+        processes=2,
+        maxtasksperchild=1,
+        chunksize=2,
+    )
+    app.execute()
+    assert [v.x for v in app.variants] == list(range(8))
+    pids = [v.results.pid for v in app.variants]
+    # Each worker executes one chunk (of two variants) and exits:
+    assert pids[0::2] == pids[1::2]
+    assert len(set(pids)) == 4
+    assert os.getpid() not in pids
+
+
+RUNS = []
+
+
+class CountRuns(Computer):
+
+    a = 0
+
+    def run(self):
+        RUNS.append(self.a)
+        self.results.b = self.a * 2
+
+
+def resumed_variator(tmpdir, resume, n=4, **kwds):
+    del RUNS[:]
+    app = Variator(
+        classpath=__name__ + '.CountRuns',
+        builder=dict(ranges=dict(a=(n,))),
+        executor='dumb',
+        datastore=dict(dir=str(tmpdir)),
+        table='npz',
+        resume=resume,
+        **kwds)
+    app.execute()
+    return app
+
+
+@pytest.mark.parametrize('resume', ['skip', 'load'])
+def test_resume(resume, tmpdir):
+    from ..aggregation import read_table
+    resumed_variator(tmpdir, 'no', n=2)
+    assert RUNS == [0, 1]
+    # Tamper the parameters of the second variant:
+    params = json.loads(tmpdir.join('1', 'params.json').read())
+    params['a'] = 100
+    tmpdir.join('1', 'params.json').write(json.dumps(params))
+
+    app = resumed_variator(tmpdir, resume)
+    assert RUNS == [1, 2, 3]
+    statuses = sorted((h.index, h.status) for h in app.handles)
+    first = 'skipped' if resume == 'skip' else 'loaded'
+    assert statuses == [(0, first), (1, 'finished'), (2, 'finished'),
+                        (3, 'finished')]
+    if resume == 'load':
+        assert [v.results.b for v in app.variants] == [0, 2, 4, 6]
+    else:
+        assert [v.results.b for v in app.variants] == [2, 4, 6]
+
+    table = read_table(str(tmpdir), 'dict')
+    assert list(table['index']) == [0, 1, 2, 3]
+    assert list(table['results.b']) == [0, 2, 4, 6]
+
+    # Everything is done now:
+    resumed_variator(tmpdir, resume)
+    assert RUNS == []
+
+
+def test_resume_incomplete_manifest(tmpdir):
+    resumed_variator(tmpdir, 'no', n=2)
+    with tmpdir.join('sweep.jsonl').open('a') as file:
+        file.write('{"index": 2, "sta')  # killed while writing
+    resumed_variator(tmpdir, 'skip', n=3)
+    assert RUNS == [2]
+    resumed_variator(tmpdir, 'skip', n=3)
+    assert RUNS == []
+
+
+def test_resume_from_another_directory(tmpdir, monkeypatch):
+    tmpdir.mkdir('a').mkdir('b')
+    monkeypatch.chdir(str(tmpdir))
+    resumed_variator('out', 'no', n=2)
+    assert RUNS == [0, 1]
+    entry = json.loads(tmpdir.join('out', 'sweep.jsonl').readlines()[0])
+    assert entry['path'] == '0'
+
+    monkeypatch.chdir(str(tmpdir.join('a', 'b')))
+    resumed_variator(os.path.join('..', '..', 'out'), 'skip', n=3)
+    assert RUNS == [2]
+
+
+@pytest.mark.parametrize('sampler', ['random', 'lhs', 'sobol', 'halton'])
+def test_sampler_cli(sampler):
+    app = Variator(classpath=__name__ + '.Sums', executor='dumb')
+    app.cli([
+        '--builder.sampler', sampler,
+        '--builder.samples', '8',
+        '--builder.uniforms["x.a"]:leval=(-1, 1)',
+        '--builder.loguniforms["x.b"]:leval=(0, 2)',
+        '--builder.choices["y.a"]:leval=[0, 10]',
+    ])
+    assert len(app.variants) == 8
+    xa = [v.x.a for v in app.variants]
+    xb = [v.x.b for v in app.variants]
+    assert all(-1 <= a < 1 for a in xa)
+    assert all(1 <= b < 100 for b in xb)
+    assert len(set(xa)) == 8
+    assert set(v.y.a for v in app.variants) == {0, 10}
+    for v in app.variants:
+        assert v.x.results.c == v.x.a + v.x.b
+
+
+def test_sampler_is_seeded():
+    def sample(seed):
+        builder = ParamBuilder(sampler='random', samples=3, seed=seed,
+                               uniforms={'a': (0, 1)})
+        return [p['a'] for p in builder.build_params()]
+    assert sample(0) == sample(0)
+    assert sample(0) != sample(1)
+
+
+def test_sampler_is_lazy():
+    builder = ParamBuilder(sampler='halton', samples=10 ** 9,
+                           uniforms={'a': (0, 1)})
+    params = builder.build_params()
+    assert next(params) == {'a': 0.5}
+
+
+def test_zip_different_lengths():
+    builder = ParamBuilder(sampler='zip', choices={'a': [1, 2]},
+                           ranges={'b': (3,)})
+    with pytest.raises(ValueError):
+        list(builder.build_params())
+
+
+class Step(Computer):
+
+    x = 0.0
+
+    def run(self):
+        self.results.y = self.x - 0.3
+
+
+def test_refine_bisection(tmpdir):
+    from ..aggregation import read_table
+    app = Variator(
+        classpath=__name__ + '.Step',
+        builder=dict(linspaces=dict(x=(0.0, 1.0, 3))),
+        refinerpath='.Bisection',
+        refiner=dict(axis='x', result='y', tolerance=0.01),
+        executor='dumb',
+        datastore=dict(dir=str(tmpdir)),
+        table='npz',
+    )
+    app.execute()
+    xs = sorted(v.x for v in app.variants)
+    # 0.5 / 2 ** 6 < 0.01: six bisections are needed.
+    assert len(xs) == 3 + 6
+    below = max(x for x in xs if x <= 0.3)
+    above = min(x for x in xs if x > 0.3)
+    assert above - below <= 0.01
+    assert [h.index for h in app.handles] == list(range(9))
+
+    table = read_table(str(tmpdir), 'dict')
+    assert sorted(table['x']) == xs
+
+
+@pytest.mark.parametrize('budget, rounds, num', [(2, 10, 5), (100, 3, 6)])
+def test_refine_budget(budget, rounds, num):
+    app = Variator(
+        classpath=__name__ + '.Step',
+        builder=dict(linspaces=dict(x=(0.0, 1.0, 3))),
+        refinerpath='.Gradient',
+        refiner=dict(axis='x', result='y', budget=budget, rounds=rounds,
+                     per_round=1),
+        executor='dumb',
+    )
+    app.execute()
+    assert len(app.variants) == num
+
+
+def propose_once(rows):
+    if len(rows) == 2:
+        return [{'x': 0.25}]
+    return []
+
+
+def test_refine_callback():
+    app = Variator(classpath=__name__ + '.Step', executor='dumb')
+    app.cli([
+        '--builder.choices["x"]:leval=[0.0, 1.0]',
+        '--refinerpath', '.Callback',
+        '--refiner.function', __name__ + '.propose_once',
+    ])
+    assert [v.x for v in app.variants] == [0.0, 1.0, 0.25]
+
+
+class Sleepy(Computer):
+
+    t = 0.0
+
+    def run(self):
+        time.sleep(self.t)
+
+
+def sleepy_cost(param):
+    return param['t']
+
+
+def run_sleepy(**kwds):
+    kwds.setdefault('executor', 'dumb')
+    app = Variator(
+        classpath=__name__ + '.Sleepy',
+        builder=dict(choices=dict(t=[0.0, 0.04, 0.02, 0.06])),
+        **kwds)
+    app.execute()
+    return app
+
+
+def execution_order(app):
+    return [h.params['t'] for h in sorted(app.handles,
+                                          key=lambda h: h.started)]
+
+
+def test_longest_first_cost_function():
+    app = run_sleepy(schedule='longest-first',
+                     cost=__name__ + '.sleepy_cost')
+    assert execution_order(app) == [0.06, 0.04, 0.02, 0.0]
+    # Results are still in the order of the builder:
+    assert [v.t for v in app.variants] == [0.0, 0.04, 0.02, 0.06]
+    assert [h.index for h in app.handles] == [0, 1, 2, 3]
+
+
+def test_longest_first_previous_timings(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    run_sleepy(datastore=dict(dir='old'))
+    monkeypatch.chdir(str(tmpdir.mkdir('elsewhere')))
+    app = run_sleepy(schedule='longest-first',
+                     cost_from=[os.path.join('..', 'old')])
+    assert execution_order(app) == [0.06, 0.04, 0.02, 0.0]
+
+
+def test_utilization_report(tmpdir):
+    from ..reader import read
+    app = run_sleepy(executor='thread', processes=2,
+                     schedule='longest-first',
+                     cost=__name__ + '.sleepy_cost',
+                     datastore=dict(dir=str(tmpdir)))
+    report = app.utilization
+    assert report['workers'] == 2
+    assert 0 < report['utilization'] <= 1
+    assert report['busy'] >= 0.12
+    assert read(str(tmpdir)).meta['utilization'] == report
+
+
+FAIL = {}
+
+
+class Flaky(Computer):
+
+    a = 0
+
+    def run(self):
+        failures = FAIL.get(self.a, 0)
+        if failures > 0:
+            FAIL[self.a] = failures - 1
+            raise RuntimeError('flaky {0}'.format(self.a))
+        RUNS.append(self.a)
+        self.results.b = self.a
+
+
+def run_flaky(tmpdir, failures, **kwds):
+    FAIL.clear()
+    FAIL.update(failures)
+    del RUNS[:]
+    kwds.setdefault('executor', 'dumb')
+    app = Variator(
+        classpath=__name__ + '.Flaky',
+        builder=dict(ranges=dict(a=(4,))),
+        datastore=dict(dir=str(tmpdir)),
+        table='npz',
+        **kwds)
+    app.execute()
+    return app
+
+
+@pytest.mark.parametrize('executor', ['dumb', 'thread'])
+def test_continue_on_error(executor, tmpdir):
+    from ..aggregation import read_table, read_rows
+    app = run_flaky(tmpdir, {1: 1, 2: 100}, on_error='continue',
+                    executor=executor)
+    assert sorted(RUNS) == [0, 3]
+    assert [v.a for v in app.variants] == [0, 3]
+    statuses = [h.status for h in app.handles]
+    assert statuses == ['finished', 'failed', 'failed', 'finished']
+    assert 'RuntimeError: flaky 1' in app.handles[1].error
+
+    failures = list(read_rows(str(tmpdir.join('failures.jsonl'))))
+    assert [f['index'] for f in sorted(failures, key=lambda f: f['index'])] \
+        == [1, 2]
+    for failure in failures:
+        assert failure['params'] == {'a': failure['index']}
+        assert 'Traceback' in failure['traceback']
+
+    assert list(read_table(str(tmpdir), 'dict')['index']) == [0, 3]
+
+    # Re-run only the failed variants:
+    app = run_flaky(tmpdir, {2: 1}, resume='failed', on_error='continue')
+    assert RUNS == [1]
+    statuses = [h.status for h in app.handles]
+    assert statuses == ['skipped', 'finished', 'failed', 'skipped']
+    app = run_flaky(tmpdir, {}, resume='failed')
+    assert RUNS == [2]
+    assert list(read_table(str(tmpdir), 'dict')['index']) == [0, 1, 2, 3]
+
+
+def test_raise_on_error(tmpdir):
+    with pytest.raises(RuntimeError) as excinfo:
+        run_flaky(tmpdir, {1: 1})
+    assert 'flaky 1' in str(excinfo.value)
+    # Variants are recorded even though the sweep is aborted:
+    from ..aggregation import read_rows
+    entries = list(read_rows(str(tmpdir.join('sweep.jsonl'))))
+    assert [(e['index'], e['status']) for e in entries] == \
+        [(0, 'finished'), (1, 'failed')]
+    failures = list(read_rows(str(tmpdir.join('failures.jsonl'))))
+    assert [f['index'] for f in failures] == [1]
+
+    # The failed variant and the ones not reached are re-run:
+    app = run_flaky(tmpdir, {}, resume='failed')
+    assert RUNS == [1, 2, 3]
+    statuses = [h.status for h in app.handles]
+    assert statuses == ['skipped', 'finished', 'finished', 'finished']
+
+
+def test_retries(tmpdir):
+    app = run_flaky(tmpdir, {1: 2}, retries=2, retry_delay=0.01)
+    assert sorted(RUNS) == [0, 1, 2, 3]
+    assert [h.attempts for h in app.handles] == [1, 3, 1, 1]
+
+
+class Slow(Computer):
+
+    t = 0.0
+
+    def run(self):
+        time.sleep(self.t)
+
+
+@pytest.mark.parametrize('executor', ['dumb', 'process'])
+def test_timeout(executor, tmpdir):
+    app = Variator(
+        classpath=__name__ + '.Slow',
+        builder=dict(choices=dict(t=[0.0, 5.0])),
+        datastore=dict(dir=str(tmpdir)),
+        executor=executor,
+        timeout=0.2,
+        on_error='continue',
+    )
+    start = time.time()
+    app.execute()
+    assert time.time() - start < 4
+    assert [h.status for h in app.handles] == ['finished', 'failed']
+    assert 'VariantTimeout' in app.handles[1].error
+
+
+def test_timeout_thread():
+    app = Variator(classpath=__name__ + '.Slow', executor='thread',
+                   timeout=1)
+    with pytest.raises(ValueError):
+        app.execute()
+
+
+UPSTREAM_RUNS = []
+
+
+class Upstream(Memoizer):
+
+    x = 1.0
+
+    def run(self):
+        UPSTREAM_RUNS.append(self.x)
+        time.sleep(0.05)
+        self.results.v = self.x * 10
+
+
+class Downstream(Computer):
+
+    up = Upstream
+    y = 0.0
+
+    def run(self):
+        self.up.execute()
+        self.results.z = self.up.results.v + self.y
+
+
+@pytest.mark.parametrize('executor', executor_choices)
+def test_dedup_upstreams(executor, cleancwd):
+    del UPSTREAM_RUNS[:]
+    app = Variator(
+        classpath=__name__ + '.Downstream',
+        builder=dict(ranges=dict(y=(6,)), choices={'up.x': [1.0, 2.0]}),
+        executor=executor,
+        processes=4,
+    )
+    app.execute()
+    zs = sorted(v.results.z for v in app.variants)
+    assert zs == sorted([10.0 + y for y in range(6)] +
+                        [20.0 + y for y in range(6)])
+    if executor != 'process':  # runs in child processes are invisible
+        assert sorted(UPSTREAM_RUNS) == [1.0, 2.0]
+    assert len(os.listdir(os.path.join('Data', 'memo'))) == 2
+
+    # Upstreams computed already are not computed again:
+    del UPSTREAM_RUNS[:]
+    app.execute()
+    assert UPSTREAM_RUNS == []
+
+
+def test_dedup_upstreams_stream(monkeypatch, cleancwd):
+    from .. import variator
+    monkeypatch.setattr(variator, '_DEDUP_CHUNK', 4)
+    chunks = []
+    compute_upstreams = Variator.compute_upstreams
+
+    def recording(self, params, *args):
+        params = list(params)
+        chunks.append(len(params))
+        return compute_upstreams(self, params, *args)
+
+    monkeypatch.setattr(Variator, 'compute_upstreams', recording)
+    del UPSTREAM_RUNS[:]
+    app = Variator(
+        classpath=__name__ + '.Downstream',
+        builder=dict(ranges=dict(y=(5,)), choices={'up.x': [1.0, 2.0]}),
+        executor='dumb',
+        stream=True,
+        datastore=dict(dir='out'),
+    )
+    app.execute()
+    assert chunks == [4, 4, 2]
+    assert sorted(UPSTREAM_RUNS) == [1.0, 2.0]
+    assert [h.status for h in app.handles] == ['finished'] * 10
+
+
+class NestedUpstream(Computer):
+
+    y = 0.0
+
+    class up(Memoizer):
+
+        x = 1.0
+
+        def run(self):
+            UPSTREAM_RUNS.append(self.x)
+            self.results.v = self.x * 10
+
+    def run(self):
+        self.up.execute()
+        self.results.z = self.up.results.v + self.y
+
+
+@pytest.mark.parametrize('executor', executor_choices)
+def test_dedup_nested_upstream_class(executor, cleancwd):
+    del UPSTREAM_RUNS[:]
+    app = Variator(
+        classpath=__name__ + '.NestedUpstream',
+        builder=dict(ranges=dict(y=(3,))),
+        executor=executor,
+    )
+    app.execute()
+    assert [v.results.z for v in app.variants] == [10.0, 11.0, 12.0]
+    if executor != 'process':
+        assert UPSTREAM_RUNS == [1.0]
+
+
+class LinkedUpstream(Memoizer):
+
+    a = Link('..a')
+
+    def run(self):
+        self.results.v = self.a * 10
+
+
+class LinkedDownstream(Computer):
+
+    a = 1
+    b = 0
+    up = LinkedUpstream
+
+    def run(self):
+        self.up.execute()
+        self.results.c = self.up.results.v + self.b
+
+
+@pytest.mark.parametrize('executor', executor_choices)
+def test_dedup_linked_upstream(executor, cleancwd):
+    # An upstream linking to its owner cannot be executed alone; the
+    # variants compute it instead.
+    app = Variator(
+        classpath=__name__ + '.LinkedDownstream',
+        builder=dict(ranges=dict(b=(1, 4))),
+        executor=executor,
+    )
+    app.execute()
+    assert [v.results.c for v in app.variants] == [11, 12, 13]
+    assert [h.status for h in app.handles] == ['finished'] * 3
+
+
+BATCHES = []
+
+
+class Batched(Computer):
+
+    x = 0.0
+    y = 'a'
+
+    def run(self):
+        raise AssertionError('run should not be called')
+
+    def run_batch(self, params):
+        BATCHES.append(len(params['x']))
+        if self.y == 'fail':
+            raise RuntimeError('failing on purpose')
+        return dict(z=params['x'] * 2, w=[self.y] * len(params['x']))
+
+
+@pytest.mark.parametrize('executor', executor_choices)
+def test_batch(executor, tmpdir):
+    del BATCHES[:]
+    app = Variator(
+        classpath=__name__ + '.Batched',
+        builder=dict(ranges=dict(x=(10,))),
+        base=dict(y='b'),
+        executor=executor,
+        batch_size=4,
+        datastore=dict(dir=str(tmpdir)),
+    )
+    app.execute()
+    assert [v.results.z for v in app.variants] == [2 * x for x in range(10)]
+    assert [v.results.w for v in app.variants] == ['b'] * 10
+    if executor != 'process':
+        assert sorted(BATCHES) == [2, 4, 4]
+    assert [h.status for h in app.handles] == ['finished'] * 10
+
+    with open(os.path.join(app.handles[3].path, 'params.json')) as file:
+        assert json.load(file)['x'] == 3
+    table = app.datastore.path('table')
+    if os.path.exists(table + '.npz'):
+        import numpy
+        with numpy.load(table + '.npz', allow_pickle=True) as npz:
+            assert npz['results.z'].tolist() == [2 * x for x in range(10)]
+
+
+def test_batch_continue_on_error():
+    app = Variator(
+        classpath=__name__ + '.Batched',
+        builder=dict(ranges=dict(x=(3,))),
+        base=dict(y='fail'),
+        executor='dumb',
+        batch_size=2,
+        on_error='continue',
+    )
+    app.execute()
+    assert app.variants == []
+    assert [h.status for h in app.handles] == ['failed'] * 3
+    assert 'failing on purpose' in app.handles[0].error
+
+
+def test_batch_requires_run_batch():
+    app = Variator(classpath=__name__ + '.SumAB', batch_size=2)
+    with pytest.raises(ValueError):
+        app.execute()
+
+
+def start_workers(queue, num):
+    import compapp
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(compapp.__file__))] +
+        env.get('PYTHONPATH', '').split(os.pathsep))
+    return [subprocess.Popen([sys.executable, '-m', 'compapp', 'worker',
+                              queue, '--idle', '60', '--lease', '3'],
+                             env=env, stdout=subprocess.PIPE)
+            for _ in range(num)]
+
+
+def test_queue(tmpdir):
+    from ..utils.filequeue import FileQueue
+    queue = str(tmpdir.join('queue'))
+    workers = start_workers(queue, 2)
+    try:
+        app = Variator(
+            classpath=__name__ + '.SumAB',
+            builder=dict(ranges=dict(a=(10,))),
+            executor='queue',
+            queue_dir=queue,
+            datastore=dict(dir=str(tmpdir.join('out'))),
+        )
+        app.execute()
+    finally:
+        FileQueue(queue).stop()
+        outputs = [w.communicate()[0] for w in workers]
+    assert [v.results.c for v in app.variants] == list(range(2, 12))
+    assert [h.status for h in app.handles] == ['finished'] * 10
+    assert len(set(h.worker for h in app.handles)) <= 2
+    assert sum(o.count(b'running task') for o in outputs) == 10
+
+
+def test_queue_reuse(tmpdir):
+    from ..utils.filequeue import FileQueue
+    queue = str(tmpdir.join('queue'))
+    for sweep in range(2):
+        # A stop request of the previous sweep must not affect workers:
+        workers = start_workers(queue, 1)
+        try:
+            app = Variator(
+                classpath=__name__ + '.SumAB',
+                builder=dict(ranges=dict(a=(3,))),
+                executor='queue',
+                queue_dir=queue,
+            )
+            app.execute()
+        finally:
+            FileQueue(queue).stop()
+            for w in workers:
+                w.communicate()
+        assert [v.results.c for v in app.variants] == [2, 3, 4]
+    assert tmpdir.join('queue', 'results').listdir() == []
+
+
+def test_queue_timeout(tmpdir):
+    from ..utils.filequeue import FileQueue
+    queue = str(tmpdir.join('queue'))
+    workers = start_workers(queue, 1)
+    try:
+        app = Variator(
+            classpath=__name__ + '.Slow',
+            builder=dict(choices=dict(t=[0.0, 5.0])),
+            executor='queue',
+            queue_dir=queue,
+            timeout=0.2,
+            on_error='continue',
+        )
+        start = time.time()
+        app.execute()
+    finally:
+        FileQueue(queue).stop()
+        for w in workers:
+            w.communicate()
+    assert time.time() - start < 4
+    assert [h.status for h in app.handles] == ['finished', 'failed']
+    assert 'VariantTimeout' in app.handles[1].error
+
+
+def test_queue_requires_directory():
+    app = Variator(classpath=__name__ + '.SumAB', executor='queue')
+    with pytest.raises(ValueError):
+        app.execute()
@@ -0,0 +1,157 @@
+import errno
+import hashlib
+import os
+import threading
+
+from .files import safewrite
+
+
+_UNLINKABLE = set(getattr(errno, name) for name in
+                  ['EXDEV', 'EPERM', 'EMLINK', 'ENOTSUP', 'EOPNOTSUPP']
+                  if hasattr(errno, name))
+
+
+class BlobStore(object):
+
+    """
+    Content-addressed storage of `numpy.ndarray`.
+
+    Arrays are stored as ``.npy`` files named after the hash of their
+    content (dtype, shape and data).  Storing the same array twice
+    writes it only once.
+
+    Examples
+    --------
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> import numpy
+    >>> store = BlobStore('blobs')
+    >>> d1 = store.put(numpy.arange(10))
+    >>> d2 = store.put(numpy.arange(10))
+    >>> d1 == d2
+    True
+    >>> store.get(d1)
+    array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+    >>> store.stats == {'arrays': 2, 'nbytes': 160, 'stored_bytes': 80}
+    True
+    >>> store.summary()['dedup_ratio']
+    0.5
+
+    """
+
+    def __init__(self, basedir):
+        self.basedir = basedir
+        self.stats = dict(arrays=0, nbytes=0, stored_bytes=0)
+        self._lock = threading.Lock()
+        self._writing = {}  # digest -> Event set when written
+
+    @staticmethod
+    def accepts(array):
+        """
+        Return `True` if `array` can be stored (no Python objects).
+        """
+        return not array.dtype.hasobject
+
+    @staticmethod
+    def digest(array):
+        import numpy
+        array = numpy.ascontiguousarray(array)
+        sha1 = hashlib.sha1()
+        sha1.update(array.dtype.str.encode())
+        sha1.update(repr(array.shape).encode())
+        sha1.update(array.reshape(-1).view(numpy.uint8).data)
+        return sha1.hexdigest()
+
+    def path(self, digest):
+        return os.path.join(self.basedir, digest[:2], digest[2:] + '.npy')
+
+    def put(self, array):
+        """
+        Store `array` (if not yet stored) and return its digest.
+
+        It is safe to call this method from multiple threads.  If
+        another thread is writing the same array, this method waits
+        until the blob is written so that it can be linked right
+        after this method returns.
+
+        """
+        digest = self.digest(array)
+        path = self.path(digest)
+        with self._lock:
+            self.stats['arrays'] += 1
+            self.stats['nbytes'] += array.nbytes
+        while True:
+            with self._lock:
+                writing = self._writing.get(digest)
+                if writing is None:
+                    if os.path.exists(path):
+                        return digest
+                    writing = self._writing[digest] = threading.Event()
+                    break
+            writing.wait()
+            # Loop again since the write may have failed.
+        try:
+            self._write(path, array)
+        finally:
+            with self._lock:
+                del self._writing[digest]
+            writing.set()
+        return digest
+
+    def _write(self, path, array):
+        import numpy
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Other process may have created it in the meantime.
+                if not os.path.isdir(dirname):
+                    raise
+        with safewrite(path, 'wb') as file:
+            numpy.save(file, array)
+        with self._lock:
+            self.stats['stored_bytes'] += array.nbytes
+
+    def get(self, digest):
+        import numpy
+        return numpy.load(self.path(digest))
+
+    def link(self, digest, path):
+        """
+        Hard-link the blob of `digest` at `path`; return `True` on success.
+
+        `False` is returned if hard-linking is not possible (e.g., the
+        blob store is on another file system).  Other errors (e.g.,
+        the blob does not exist) are raised.
+
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        try:
+            os.link(self.path(digest), path)
+        except AttributeError:  # os.link is not available
+            return False
+        except OSError as err:
+            if err.errno in _UNLINKABLE:
+                return False
+            raise
+        return True
+
+    def summary(self):
+        """
+        Statistics of deduplication as a JSON-friendly `dict`.
+
+        ``dedup_ratio`` is the fraction of bytes which did not have to
+        be written since they were already in the store.
+
+        """
+        nbytes = self.stats['nbytes']
+        saved = nbytes - self.stats['stored_bytes']
+        return dict(
+            self.stats,
+            bytes_saved=saved,
+            dedup_ratio=(saved / float(nbytes)) if nbytes else 0.0,
+        )
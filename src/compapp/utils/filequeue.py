@@ -0,0 +1,361 @@
+"""
+Work queue using a (shared) directory.
+
+A `FileQueue` needs no server: any process which can see the
+directory (e.g., on a network file system) can submit tasks or work
+on them.  The directory contains:
+
+:file:`tasks/`
+    Pending tasks; pickled ``(func, arg)``.
+:file:`claimed/`
+    Tasks being executed.  A worker claims a task by atomically
+    renaming it from :file:`tasks/` to a name containing its `owner`
+    ID and keeps touching it while the task is running (heartbeat).
+    Tasks whose heartbeat is older than the lease are moved back to
+    :file:`tasks/` by `requeue_expired`.
+:file:`results/`
+    Pickled ``(ok, value)`` where `value` is the return value or the
+    traceback.
+:file:`STOP`
+    Workers started before this file is (re-)written exit (see
+    `FileQueue.stop`).
+
+Since a task of a worker which is merely slow may be requeued, a task
+can be executed more than once.  A worker whose claim was requeued
+discards its result; results which arrive after the task is collected
+are removed by the collector.  Use `FileQueue.clear` to remove
+entries left by aborted runs.
+
+"""
+
+import collections
+import functools
+import itertools
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from .files import safewrite
+from .pool import _map_list, chunked
+
+
+class FileQueue(object):
+
+    """
+    A queue of tasks stored in directory `path`.
+
+    >>> getfixture('cleancwd')
+    >>> queue = FileQueue('queue')
+    >>> tid = queue.submit(abs, -1)
+    >>> work(queue, max_tasks=1)
+    1
+    >>> queue.result(tid)
+    (True, 1)
+
+    """
+
+    def __init__(self, path, lease=60.0, poll=0.1):
+        self.path = path
+        self.lease = lease
+        self.poll = poll
+        self.owner = uuid.uuid4().hex[:12]
+        for sub in ['tasks', 'claimed', 'results']:
+            subdir = os.path.join(path, sub)
+            if not os.path.isdir(subdir):
+                try:
+                    os.makedirs(subdir)
+                except OSError:  # created by another process
+                    if not os.path.isdir(subdir):
+                        raise
+
+    def _path(self, sub, tid):
+        return os.path.join(self.path, sub, tid + '.pkl')
+
+    def _claimed(self, tid):
+        return self._path('claimed', tid + '.' + self.owner)
+
+    def submit(self, func, arg):
+        """
+        Add a task ``func(arg)`` and return its ID.
+
+        IDs start with the submission time so that older tasks are
+        claimed first.
+        """
+        tid = '{0:.6f}-{1}'.format(time.time(), uuid.uuid4().hex)
+        with safewrite(self._path('tasks', tid), 'wb') as file:
+            pickle.dump((func, arg), file, pickle.HIGHEST_PROTOCOL)
+        return tid
+
+    def claim(self):
+        """
+        Claim the oldest pending task; return its ID or `None`.
+        """
+        for name in sorted(os.listdir(os.path.join(self.path, 'tasks'))):
+            if not name.endswith('.pkl'):
+                continue  # e.g., temporary file of safewrite
+            tid = name[:-len('.pkl')]
+            try:
+                os.rename(self._path('tasks', tid), self._claimed(tid))
+            except OSError:
+                continue  # claimed by another worker
+            self.heartbeat(tid)
+            return tid
+        return None
+
+    def heartbeat(self, tid):
+        try:
+            os.utime(self._claimed(tid), None)
+        except OSError:
+            pass  # requeued or finished
+
+    def load(self, tid):
+        with open(self._claimed(tid), 'rb') as file:
+            return pickle.load(file)
+
+    def finish(self, tid, ok, value):
+        """
+        Store the result of task `tid` and release the claim.
+
+        The result is discarded if the claim has been requeued (see
+        `requeue_expired`); the task is executed again anyway.  Return
+        `True` if the result is stored.
+
+        """
+        claimed = self._claimed(tid)
+        if not os.path.exists(claimed):
+            return False
+        with safewrite(self._path('results', tid), 'wb') as file:
+            pickle.dump((ok, value), file, pickle.HIGHEST_PROTOCOL)
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+        return True
+
+    def result(self, tid):
+        """
+        Return ``(ok, value)`` of finished task `tid` or `None`.
+
+        The result is removed from the queue.
+
+        """
+        path = self._path('results', tid)
+        try:
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+        except (IOError, OSError):
+            return None
+        os.remove(path)
+        return result
+
+    def requeue_expired(self):
+        """
+        Move claimed tasks not touched within `lease` back to the queue.
+
+        Return the number of requeued tasks.
+
+        """
+        count = 0
+        now = time.time()
+        for name in os.listdir(os.path.join(self.path, 'claimed')):
+            tid = name[:-len('.pkl')].rsplit('.', 1)[0]  # strip owner
+            claimed = os.path.join(self.path, 'claimed', name)
+            try:
+                if now - os.path.getmtime(claimed) < self.lease:
+                    continue
+                os.rename(claimed, self._path('tasks', tid))
+            except OSError:
+                continue  # finished or requeued meanwhile
+            count += 1
+        return count
+
+    def stop(self):
+        """
+        Ask running workers to exit after their current task.
+
+        Workers started after this call are not affected; i.e., the
+        queue directory can be reused.
+
+        """
+        with safewrite(os.path.join(self.path, 'STOP')) as file:
+            file.write(uuid.uuid4().hex)
+
+    def stop_token(self):
+        """
+        Return the token written by the last `stop` or `None`.
+        """
+        try:
+            with open(os.path.join(self.path, 'STOP')) as file:
+                return file.read()
+        except (IOError, OSError):
+            return None
+
+    def clear(self):
+        """
+        Remove all tasks, claims, results and the stop request.
+
+        Do not call this while a run submitting to this queue is in
+        progress.
+
+        """
+        for sub in ['tasks', 'claimed', 'results']:
+            subdir = os.path.join(self.path, sub)
+            for name in os.listdir(subdir):
+                try:
+                    os.remove(os.path.join(subdir, name))
+                except OSError:
+                    pass  # claimed or collected meanwhile
+        try:
+            os.remove(os.path.join(self.path, 'STOP'))
+        except OSError:
+            pass
+
+    def imap(self, func, iterable, window, chunksize=1, ordered=True):
+        """
+        Like `.imap_bounded` but the tasks are executed by workers.
+
+        Errors raised by `func` are re-raised as `RuntimeError` with
+        the traceback in the worker.
+
+        """
+        if chunksize > 1:
+            func = functools.partial(_map_list, func)
+            iterable = chunked(iterable, chunksize)
+        results = self._imap(func, iterable, window, ordered)
+        if chunksize > 1:
+            results = itertools.chain.from_iterable(results)
+        return results
+
+    def _imap(self, func, iterable, window, ordered):
+        iterator = iter(iterable)
+        order = collections.deque()
+        inflight = set()
+        ready = {}
+        collected = set()  # to remove results of duplicated executions
+        exhausted = False
+        while True:
+            while not exhausted and len(inflight) + len(ready) < window:
+                try:
+                    arg = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                tid = self.submit(func, arg)
+                inflight.add(tid)
+                order.append(tid)
+
+            if ordered:
+                while order and order[0] in ready:
+                    yield _unwrap(ready.pop(order.popleft()))
+            else:
+                for tid in list(ready):
+                    yield _unwrap(ready.pop(tid))
+            if exhausted and not inflight and not ready:
+                return
+
+            progress = False
+            names = set(os.listdir(os.path.join(self.path, 'results')))
+            for name in names:
+                tid = name[:-len('.pkl')]
+                if tid in collected:
+                    try:
+                        os.remove(os.path.join(self.path, 'results', name))
+                    except OSError:
+                        pass
+            for tid in sorted(inflight):
+                if tid + '.pkl' not in names:
+                    continue
+                result = self.result(tid)
+                if result is not None:
+                    inflight.remove(tid)
+                    collected.add(tid)
+                    ready[tid] = result
+                    progress = True
+            if not progress:
+                self.requeue_expired()
+                time.sleep(self.poll)
+
+
+def _unwrap(result):
+    ok, value = result
+    if not ok:
+        raise RuntimeError('Task failed in a worker:\n' + value)
+    return value
+
+
+class _Heartbeat(object):
+
+    def __init__(self, queue, tid, interval):
+        self.queue = queue
+        self.tid = tid
+        self.interval = interval
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.beat)
+        self.thread.daemon = True
+
+    def beat(self):
+        while not self.done.wait(self.interval):
+            self.queue.heartbeat(self.tid)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.done.set()
+        self.thread.join()
+
+
+def work(queue, idle=0, heartbeat=None, max_tasks=0, log=None):
+    """
+    Execute tasks in `queue` until it is stopped (by `FileQueue.stop`
+    called after this function started).
+
+    Parameters
+    ----------
+    queue : FileQueue
+    idle : float
+        Exit if there is no task for this many seconds.  ``0`` means
+        to wait forever (or until `FileQueue.stop` is called).
+    heartbeat : float, optional
+        Interval of heartbeats.  Default is a third of the lease.
+    max_tasks : int
+        Exit after executing this many tasks if positive.
+
+    Returns
+    -------
+    int
+        Number of executed tasks.
+
+    """
+    if heartbeat is None:
+        heartbeat = queue.lease / 3.0
+    worker = '{0}:{1}'.format(socket.gethostname(), os.getpid())
+    done = 0
+    last = time.time()
+    token = queue.stop_token()
+    while queue.stop_token() in (None, token):
+        if max_tasks and done >= max_tasks:
+            break
+        tid = queue.claim()
+        if tid is None:
+            if idle and time.time() - last > idle:
+                break
+            time.sleep(queue.poll)
+            continue
+        if log is not None:
+            log('{0}: running task {1}'.format(worker, tid))
+        with _Heartbeat(queue, tid, heartbeat):
+            try:
+                func, arg = queue.load(tid)
+                result = (True, func(arg))
+            except Exception:
+                result = (False, traceback.format_exc())
+        queue.finish(tid, *result)
+        done += 1
+        last = time.time()
+    return done
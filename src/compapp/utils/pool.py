@@ -0,0 +1,110 @@
+import collections
+import functools
+import itertools
+import sys
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+def _map_list(func, chunk):
+    return [func(arg) for arg in chunk]
+
+
+def _capture(func, arg):
+    try:
+        return (True, func(arg))
+    except Exception:
+        return (False, sys.exc_info()[1])
+
+
+def _unwrap(captured):
+    ok, value = captured
+    if not ok:
+        raise value
+    return value
+
+
+def chunked(iterable, size):
+    """
+    Split `iterable` into lists of at most `size` elements.
+
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _ordered(pool, func, iterable, window):
+    pending = collections.deque()
+    for arg in iterable:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (arg,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+def _unordered(pool, func, iterable, window):
+    done = queue.Queue()
+    callbacks = dict(callback=done.put)
+    if sys.version_info[0] >= 3:
+        # Errors outside of func (e.g., failing to pickle the result)
+        # are not captured by _capture.  Python 2 does not support
+        # error_callback.
+        callbacks['error_callback'] = lambda err: done.put((False, err))
+    pending = 0
+    for arg in iterable:
+        if pending >= window:
+            yield _unwrap(done.get())
+            pending -= 1
+        pool.apply_async(_capture, (func, arg), **callbacks)
+        pending += 1
+    while pending:
+        yield _unwrap(done.get())
+        pending -= 1
+
+
+def imap_bounded(pool, func, iterable, window, chunksize=1, ordered=True):
+    """
+    Like ``pool.imap(func, iterable)`` but submit at most `window` tasks.
+
+    `multiprocessing.Pool.imap` consumes `iterable` as fast as it can
+    and keeps all the results which are not yet retrieved.  This
+    function keeps at most `window` tasks in flight so that the memory
+    usage is bounded even when the consumer is slow.  Each task
+    processes `chunksize` elements of `iterable`.  Results are yielded
+    in the order of `iterable` if `ordered` is true and in the order
+    of completion (like ``pool.imap_unordered``) otherwise.
+
+    >>> from multiprocessing.dummy import Pool
+    >>> pool = Pool(2)
+    >>> list(imap_bounded(pool, lambda x: x * 2, range(5), window=2))
+    [0, 2, 4, 6, 8]
+    >>> sorted(imap_bounded(pool, lambda x: x * 2, range(5), window=2,
+    ...                     chunksize=2, ordered=False))
+    [0, 2, 4, 6, 8]
+    >>> pool.close()
+
+    """
+    if window < 1:
+        raise ValueError('window must be positive: got {0!r}'.format(window))
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive: got {0!r}'
+                         .format(chunksize))
+    if chunksize > 1:
+        func = functools.partial(_map_list, func)
+        iterable = chunked(iterable, chunksize)
+    imap = _ordered if ordered else _unordered
+    results = imap(pool, func, iterable, window)
+    if chunksize > 1:
+        results = itertools.chain.from_iterable(results)
+    return results
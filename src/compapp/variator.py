@@ -1,19 +1,116 @@
+import contextlib
+import functools
 import itertools
+import json
+import os
+import shutil
+import signal
+import threading
+import time
+import traceback
+from multiprocessing import cpu_count
 
-from .base import dotted_to_nested, deepmixdicts
+from .aggregation import (
+    TableWriter, flatten, getdotted, read_rows, table_row)
+from .base import DictObject, dotted_to_nested, deepmixdicts, nesteditems
 from .core import Parametric
 from .apps import Computer
-from .descriptors import Dict, OfType, Choice, dynamic_class
+from .descriptors import Dict, List, OfType, Choice, dynamic_class
+from .scheduling import (
+    TimingCostModel, flatten_point, longest_first, utilization)
+from .interface import Executable
+from .plugins.datastores import HashDataStore
+from .utils.importer import import_object
+from .utils.pool import chunked, imap_bounded
+
+_DEDUP_CHUNK = 1024  # variants whose upstreams are found at once (stream)
 
 
 class ParamBuilder(Parametric):
 
+    """
+    Build parameters of the variants of `Variator`.
+
+    Examples
+    --------
+    >>> builder = ParamBuilder()
+    >>> builder.choices['a'] = [1, 2]
+    >>> builder.choices['b.c'] = ['x', 'y']
+    >>> for param in builder.build_params():
+    ...     print(sorted(nesteditems(param)))
+    [(('a',), 1), (('b', 'c'), 'x')]
+    [(('a',), 1), (('b', 'c'), 'y')]
+    [(('a',), 2), (('b', 'c'), 'x')]
+    [(('a',), 2), (('b', 'c'), 'y')]
+
+    >>> builder.sampler = 'zip'
+    >>> for param in builder.build_params():
+    ...     print(sorted(nesteditems(param)))
+    [(('a',), 1), (('b', 'c'), 'x')]
+    [(('a',), 2), (('b', 'c'), 'y')]
+
+    Samplers (`sampler`) other than ``'product'`` and ``'zip'`` draw
+    `samples` points which also cover continuous axes (`uniforms` and
+    `loguniforms`):
+
+    >>> builder = ParamBuilder(sampler='sobol', samples=4)
+    >>> builder.uniforms['x'] = (0, 10)
+    >>> builder.choices['y'] = ['p', 'q']
+    >>> [(p['x'], p['y']) for p in builder.build_params()]
+    [(0.0, 'p'), (5.0, 'q'), (2.5, 'q'), (7.5, 'p')]
+
+    """
+
     choices = Dict(str, (list, tuple), default={})
     ranges = Dict(str, (list, tuple), default={})
     linspaces = Dict(str, (list, tuple), default={})
     logspaces = Dict(str, (list, tuple), default={})
 
-    def build_params(self):
+    uniforms = Dict(str, (list, tuple), default={})
+    """
+    Continuous axes ``{name: (low, high)}``.  Only for samplers.
+    """
+
+    loguniforms = Dict(str, (list, tuple), default={})
+    """
+    Continuous axes ``{name: (low, high)}`` sampled uniformly in
+    the exponents (i.e., values are in ``10 ** low`` to
+    ``10 ** high``).  Only for samplers.
+    """
+
+    sampler = Choice('product', 'zip', 'random', 'lhs', 'sobol', 'halton')
+    """
+    How to combine the axes.
+
+    ``'product'``
+        Cartesian product of all discrete axes (default).
+    ``'zip'``
+        Pair the values of discrete axes (which must be of the
+        same length) like `zip`.
+    ``'random'``
+        Seeded uniformly random sampling.
+    ``'lhs'``
+        Latin hypercube sampling.
+    ``'sobol'``, ``'halton'``
+        Low-discrepancy sequences (see `compapp.sampling`).
+
+    For samplers other than ``'product'`` and ``'zip'``, a point in
+    the unit hypercube is mapped to an element of each discrete axis
+    (``choices``, ``ranges``, ``linspaces`` and ``logspaces``) by
+    splitting the unit interval into equal bins.
+    """
+
+    samples = 0
+    """
+    Number of points to be drawn by samplers.
+    """
+
+    seed = 0
+    """
+    Random seed for ``'random'`` and ``'lhs'`` samplers.
+    """
+
+    def _discrete_axes(self):
         import numpy
         names = list(self.choices)
         values = [self.choices[k] for k in names]
@@ -26,8 +123,55 @@ class ParamBuilder(Parametric):
         for key, args in self.logspaces.items():
             names.append(key)
             values.append(numpy.logspace(*args))
-        return (dotted_to_nested(dict(zip(names, xs)))
-                for xs in itertools.product(*values))
+        return names, values
+
+    def _unit_points(self, dim):
+        from . import sampling
+        if self.samples < 1:
+            raise ValueError('ParamBuilder.samples must be positive for'
+                             ' sampler {0!r}'.format(self.sampler))
+        if self.sampler == 'random':
+            return sampling.uniform(self.samples, dim, self.seed)
+        elif self.sampler == 'lhs':
+            return sampling.latin_hypercube(self.samples, dim, self.seed)
+        elif self.sampler == 'sobol':
+            points = sampling.sobol(dim)
+        else:
+            points = sampling.halton(dim)
+        return itertools.islice(points, self.samples)
+
+    def _sampled(self, names, values):
+        continuous = [(k, lo, hi, False)
+                      for k, (lo, hi) in self.uniforms.items()]
+        continuous.extend((k, lo, hi, True)
+                          for k, (lo, hi) in self.loguniforms.items())
+        names = names + [k for k, _, _, _ in continuous]
+        for point in self._unit_points(len(names)):
+            xs = [vs[min(int(u * len(vs)), len(vs) - 1)]
+                  for u, vs in zip(point, values)]
+            for u, (_, lo, hi, log) in zip(point[len(values):], continuous):
+                x = lo + u * (hi - lo)
+                xs.append(10.0 ** x if log else x)
+            yield dotted_to_nested(dict(zip(names, xs)))
+
+    def build_params(self):
+        names, values = self._discrete_axes()
+        if self.sampler in ('product', 'zip'):
+            if self.uniforms or self.loguniforms:
+                raise ValueError(
+                    'uniforms and loguniforms require a sampler other'
+                    ' than {0!r}'.format(self.sampler))
+            if self.sampler == 'zip':
+                if len(set(map(len, values))) > 1:
+                    raise ValueError(
+                        'Axes with different lengths cannot be zipped: {0}'
+                        .format(dict(zip(names, map(len, values)))))
+                combined = zip(*values)
+            else:
+                combined = itertools.product(*values)
+            return (dotted_to_nested(dict(zip(names, xs)))
+                    for xs in combined)
+        return self._sampled(names, values)
 
     def keys(self):
         return itertools.chain(
@@ -35,6 +179,8 @@ class ParamBuilder(Parametric):
             self.ranges,
             self.linspaces,
             self.logspaces,
+            self.uniforms,
+            self.loguniforms,
         )
 
 
@@ -45,28 +191,824 @@ def execute(arg):
     return app
 
 
+class VariantHandle(object):
+
+    """
+    Lightweight record of an executed variant.
+
+    Attributes
+    ----------
+    index : int
+        Position of the variant in the sweep.
+    params : dict
+        Varied parameters (nested `dict` as built by `ParamBuilder`).
+    path : str or None
+        Datastore directory of the variant.
+    status : str
+        ``'finished'`` if the variant is executed successfully,
+        ``'loaded'`` if loaded from the datastore, ``'failed'`` if
+        it raised an error (see `Variator.on_error`) and
+        ``'skipped'`` if it is not executed (see `Variator.resume`).
+    worker : str or None
+        Process and thread which executed the variant.
+    started, finished : float or None
+        Time (`time.time`) when the execution started and finished.
+    attempts : int
+        Number of times the execution is tried (see `Variator.retries`).
+    error : str or None
+        Traceback if the status is ``'failed'``.
+
+    """
+
+    def __init__(self, index, params, path=None, status='finished',
+                 worker=None, started=None, finished=None,
+                 attempts=1, error=None):
+        self.index = index
+        self.params = params
+        self.path = path
+        self.status = status
+        self.worker = worker
+        self.started = started
+        self.finished = finished
+        self.attempts = attempts
+        self.error = error
+
+    def __repr__(self):
+        return '<{0} {1} {2}>'.format(type(self).__name__, self.index,
+                                      self.status)
+
+
+def collect_results(obj, prefix=''):
+    """
+    Collect results of `obj` and its nested executables.
+
+    Return a `dict` mapping dotted path (``''`` for `obj` itself) to
+    the results (`dict`).  Links are not followed.
+
+    """
+    collected = {}
+    results = getattr(obj, 'results', None)
+    if isinstance(results, DictObject):
+        collected[prefix] = dict(results())
+    for name, value in obj.params(nested=True).items():
+        if isinstance(value, dict):
+            child = getattr(obj, name)
+            if isinstance(child, Parametric):
+                collected.update(collect_results(child, prefix + name + '.'))
+    return collected
+
+
+def restore_results(obj, collected):
+    """
+    Set results collected by `collect_results` to `obj`.
+    """
+    for path, results in collected.items():
+        target = getdotted(obj, path[:-1]) if path else obj
+        target.results = DictObject(results)
+
+
+def memoized_upstreams(obj, prefix=''):
+    """
+    Yield executables under `obj` whose datastore is `.HashDataStore`.
+
+    Pairs of the dotted path from `obj` and the executable are
+    yielded.  Executables under the yielded ones are not searched
+    since they are taken care of by their memoized owner.
+
+    """
+    for name, value in obj.params(nested=True).items():
+        if not isinstance(value, dict):
+            continue
+        child = getattr(obj, name)
+        if not isinstance(child, Parametric):
+            continue
+        if (isinstance(child, Executable) and
+                isinstance(getattr(child, 'datastore', None), HashDataStore)):
+            yield prefix + name, child
+        else:
+            for pair in memoized_upstreams(child, prefix + name + '.'):
+                yield pair
+
+
+def execute_upstream(arg):
+    """
+    Execute an upstream; return the traceback if fails.
+
+    `arg` is ``(cls, params, path)`` where `path` is the dotted path
+    to the upstream in an instance of `cls` made with `params`.  The
+    upstream is specified this way (rather than by its class) so that
+    nested or dynamically created classes work in worker processes.
+    If `cls` is `None`, the one imported by `init_worker` is used.
+
+    The upstream is executed as a root app so that it dumps
+    :file:`params.json` and is loadable by the variants.  If it fails
+    (e.g., it links to its owner), the datastore directory created by
+    it is removed so that the variants compute the upstream by
+    themselves.
+
+    """
+    cls, params, path = arg
+    app = created = None
+    try:
+        nested = getdotted((cls or _worker['class'])(params), path)
+        app = type(nested)(nested.params(nested=True))
+        app.datastore.prepare()
+        created = not os.path.exists(app.datastore.dir)
+        app.execute()
+    except Exception:
+        if created:
+            shutil.rmtree(app.datastore.dir, ignore_errors=True)
+        return traceback.format_exc()
+
+
+_worker = {}
+
+
+def init_worker(classpath):
+    """
+    Import the class at `classpath` once per worker process.
+    """
+    _worker['class'] = import_object(classpath)
+
+
+class VariantTimeout(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    Raise `VariantTimeout` in the block if it takes more than `seconds`.
+
+    It uses ``SIGALRM`` and hence works only in the main thread on
+    Unix.  ``seconds <= 0`` means no limit.
+
+    """
+    if seconds <= 0:
+        yield
+        return
+
+    def handler(signum, frame):
+        raise VariantTimeout('Timed out after {0} seconds'.format(seconds))
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def execute_variant(arg, keys=None, max_size=16, send='app',
+                    retries=0, retry_delay=1.0, timeout=0, catch=False):
+    """
+    Execute a variant and return ``(handle, row, payload)``.
+
+    `row` is the row of the sweep table (or `None` if `keys` is
+    `None`).  `payload` is the executed app if `send` is ``'app'``,
+    the results collected by `collect_results` if ``'results'`` and
+    `None` otherwise.  Both handle and row are computed here so that
+    it is not necessary to send the app itself back to the parent
+    process.  If the class in `arg` is `None`, the one imported by
+    `init_worker` is used.
+
+    A failed execution is retried at most `retries` times, waiting
+    ``retry_delay * 2 ** n`` seconds before the ``n``-th retry.  If it
+    still fails, the error is re-raised unless `catch` is true, in
+    which case a handle with status ``'failed'`` is returned.
+
+    """
+    cls, index, param, varied = arg
+    worker = '{0}:{1}'.format(os.getpid(), threading.current_thread().ident)
+    started = time.time()
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+        try:
+            with time_limit(timeout):
+                app = execute((cls or _worker['class'], param))
+            break
+        except Exception:
+            error = traceback.format_exc()
+            if attempt < retries:
+                continue
+            if not catch:
+                raise
+            path = param.get('datastore', {}).get('dir')
+            handle = VariantHandle(index, varied, path, 'failed',
+                                   worker, started, time.time(),
+                                   attempts=attempt + 1, error=error)
+            return handle, None, None
+    return _executed(app, index, varied, worker, started, attempt + 1,
+                     keys, max_size, send)
+
+
+def _executed(app, index, varied, worker, started, attempts,
+              keys, max_size, send):
+    finished = time.time()
+    datastore = getattr(app, 'datastore', None)
+    path = getattr(datastore, 'dir', None)
+    status = 'loaded' if getattr(app, 'mode', None) == 'load' else 'finished'
+    handle = VariantHandle(index, varied, path, status,
+                           worker, started, finished, attempts=attempts)
+    row = None if keys is None else table_row(app, index, keys, max_size)
+    if send == 'app':
+        payload = app
+    elif send == 'results':
+        payload = collect_results(app)
+    else:
+        payload = None
+    return handle, row, payload
+
+
+def batch_signature(task):
+    """
+    Return a key which is equal for tasks that can share a batch.
+
+    Tasks varying the same parameters can be batched.  Variants to be
+    loaded (see `Variator.resume`) are never batched.
+
+    """
+    _, index, param, varied = task
+    if param.get('mode') == 'load':
+        return ('load', index)
+    return tuple(sorted(flatten(varied)))
+
+
+def group_tasks(tasks, size):
+    """
+    Group consecutive compatible `tasks` into lists of at most `size`.
+
+    >>> tasks = [(None, i, {}, {'a': i}) for i in range(3)]
+    >>> tasks.append((None, 3, {}, {'b': 0}))
+    >>> [[t[1] for t in g] for g in group_tasks(tasks, 2)]
+    [[0, 1], [2], [3]]
+
+    """
+    group = []
+    for task in tasks:
+        if group and (len(group) >= size or
+                      batch_signature(group[0]) != batch_signature(task)):
+            yield group
+            group = []
+        group.append(task)
+    if group:
+        yield group
+
+
+def batch_columns(varieds):
+    """
+    Convert a list of varied parameters to arrays keyed by dotted names.
+
+    >>> columns = batch_columns([{'a': {'b': 1}}, {'a': {'b': 2}}])
+    >>> list(columns), columns['a.b'].tolist()
+    (['a.b'], [1, 2])
+
+    """
+    import numpy
+    flat = [flatten(varied) for varied in varieds]
+    return dict((key, numpy.asarray([f[key] for f in flat]))
+                for key in sorted(flat[0]))
+
+
+def split_results(results, num):
+    """
+    Split a `dict` of sequences of length `num` into `num` `dict`\\ s.
+
+    >>> split_results({'x': [1, 2], 'y': [[0, 1], [2, 3]]}, 2) == [
+    ...     {'x': 1, 'y': [0, 1]}, {'x': 2, 'y': [2, 3]}]
+    True
+
+    Elements of 1D arrays are converted to Python scalars since
+    `.DumpResults` does not store NumPy scalars.
+
+    """
+    for name, values in results.items():
+        if len(values) != num:
+            raise ValueError(
+                'run_batch returned {0} values of {1!r} for {2} variants'
+                .format(len(values), name, num))
+    return [dict((name, _item(values[i]))
+                 for name, values in results.items())
+            for i in range(num)]
+
+
+def _item(value):
+    import numpy
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+def replay(app, results):
+    """
+    Execute `app` using precomputed `results` instead of its `run`.
+
+    Plugins (e.g., `.DumpResults`) run as usual so that the datastore
+    of `app` is indistinguishable from the one of a normal execution.
+
+    """
+    def run():
+        app.results = DictObject(results)
+    app.run = run
+    app.execute()
+    return app
+
+
+def execute_batch(tasks, base=None, keys=None, max_size=16, send='app',
+                  retries=0, retry_delay=1.0, timeout=0, catch=False):
+    """
+    Execute `tasks` by one ``run_batch`` call; return a list of
+    ``(handle, row, payload)``.
+
+    `tasks` is a list of arguments for `execute_variant`.  A
+    ``run_batch`` method of an instance of the class made with `base`
+    is called with the varied parameters as `batch_columns`.  The
+    returned arrays are split by `split_results` and each variant is
+    executed by `replay`.  A single task to be loaded is just passed
+    to `execute_variant`.  Retries and errors are handled as in
+    `execute_variant` but for the whole batch; `timeout` is per
+    variant.
+
+    """
+    kwds = dict(keys=keys, max_size=max_size, send=send, retries=retries,
+                retry_delay=retry_delay, timeout=timeout, catch=catch)
+    if batch_signature(tasks[0])[0] == 'load':
+        return [execute_variant(tasks[0], **kwds)]
+    cls = tasks[0][0] or _worker['class']
+    worker = '{0}:{1}'.format(os.getpid(), threading.current_thread().ident)
+    started = time.time()
+    columns = batch_columns([varied for _, _, _, varied in tasks])
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+        try:
+            with time_limit(timeout * len(tasks)):
+                results = cls(base).run_batch(columns)
+            results = split_results(results, len(tasks))
+            break
+        except Exception:
+            error = traceback.format_exc()
+            if attempt < retries:
+                continue
+            if not catch:
+                raise
+            failed = time.time()
+            return [(VariantHandle(index, varied,
+                                   param.get('datastore', {}).get('dir'),
+                                   'failed', worker, started, failed,
+                                   attempts=attempt + 1, error=error),
+                     None, None)
+                    for _, index, param, varied in tasks]
+    executed = []
+    for (_, index, param, varied), result in zip(tasks, results):
+        try:
+            app = replay(cls(param), result)
+        except Exception:
+            if not catch:
+                raise
+            executed.append((VariantHandle(
+                index, varied, param.get('datastore', {}).get('dir'),
+                'failed', worker, started, time.time(),
+                attempts=attempt + 1, error=traceback.format_exc()),
+                None, None))
+            continue
+        executed.append(_executed(app, index, varied, worker, started,
+                                  attempt + 1, keys, max_size, send))
+        started = time.time()
+    return executed
+
+
+def _jsonable(obj):
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError('{0!r} is not JSON serializable'.format(obj))
+
+
+def params_match(stored, planned):
+    """
+    Return `True` if `stored` parameters agree with `planned` ones.
+
+    Keys in `planned` which are not in `stored` are ignored, as they
+    are not parameters (e.g., ``datastore.dir``) of the app which
+    dumped `stored`.
+
+    >>> params_match({'a': 1.0, 'b': {'c': [1, 2]}}, {'b': {'c': (1, 2)}})
+    True
+    >>> params_match({'a': 1.0}, {'a': 2})
+    False
+    >>> params_match({'a': 1.0}, {'a': 1, 'datastore': {'dir': 'out'}})
+    True
+
+    """
+    planned = json.loads(json.dumps(planned, default=_jsonable))
+    for keys, value in nesteditems(planned):
+        actual = stored
+        try:
+            for key in keys:
+                actual = actual[key]
+        except (KeyError, TypeError):
+            continue
+        if actual != value:
+            return False
+    return True
+
+
+def relative_entry_path(manifest, path):
+    """
+    Express `path` relative to the directory of `manifest`.
+    """
+    if path is None:
+        return None
+    try:
+        return os.path.relpath(path, os.path.dirname(
+            os.path.abspath(manifest)))
+    except ValueError:  # e.g., another drive on Windows
+        return os.path.abspath(path)
+
+
+def resolve_entry_path(manifest, path):
+    """
+    Inverse of `relative_entry_path`.
+    """
+    if path is None:
+        return None
+    return os.path.join(os.path.dirname(manifest), path)
+
+
+class SweepManifest(object):
+
+    """
+    Status of each variant recorded in a JSON-lines file.
+
+    An entry (``index``, ``status``, ``path`` and optionally the
+    table ``row``) is appended each time a variant finishes.  Entries
+    found in the file when it is opened are available in `entries`
+    (the last one for each index wins).  The ``path`` is stored
+    relative to the directory of the manifest (so that the sweep can
+    be resumed from another working directory) and it is resolved
+    against the directory in `entries`.
+
+    Failed variants are also appended to the file `failures` (if
+    given) with their parameters, number of attempts, traceback and
+    time.  Note that it is a log of all failures; use `entries` to
+    know which variants are failing now.
+
+    """
+
+    def __init__(self, path, failures=None):
+        self.path = path
+        self.failures = failures
+        self._failures = None
+        self.entries = {}
+        if os.path.exists(path):
+            for entry in read_rows(path):
+                entry['path'] = resolve_entry_path(path, entry.get('path'))
+                self.entries[entry['index']] = entry
+        self._file = open(path, 'a')
+        if self._file.tell() > 0:
+            self._file.write('\n')  # in case the last line is incomplete
+
+    def record(self, handle, row=None):
+        entry = dict(index=handle.index, status=handle.status,
+                     path=relative_entry_path(self.path, handle.path))
+        if row is not None:
+            entry['row'] = row
+        if handle.error is not None:
+            entry['error'] = handle.error.strip().splitlines()[-1]
+        self._file.write(json.dumps(entry, default=_jsonable) + '\n')
+        self._file.flush()
+        if handle.status == 'failed' and self.failures:
+            self.record_failure(handle)
+
+    def record_failure(self, handle):
+        if self._failures is None:
+            self._failures = open(self.failures, 'a')
+        self._failures.write(json.dumps(dict(
+            index=handle.index,
+            params=handle.params,
+            path=relative_entry_path(self.path, handle.path),
+            attempts=handle.attempts,
+            traceback=handle.error,
+            time=handle.finished,
+        ), default=_jsonable) + '\n')
+        self._failures.flush()
+
+    def finished(self, index):
+        """
+        Return the entry if the variant `index` finished or is loaded.
+        """
+        entry = self.entries.get(index)
+        if entry and entry['status'] in ('finished', 'loaded'):
+            return entry
+        return None
+
+    def completed(self, index, planned):
+        """
+        Return the entry if the variant `index` completed with `planned`.
+        """
+        entry = self.finished(index)
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(entry['path'], 'params.json')) as file:
+                stored = json.load(file)
+        except (IOError, OSError, ValueError, TypeError):
+            return None
+        if not params_match(stored, planned):
+            return None
+        return entry
+
+    def close(self):
+        self._file.close()
+        if self._failures is not None:
+            self._failures.close()
+
+
 class Variator(Computer):
 
     base, classpath = dynamic_class(Parametric)
     builder = ParamBuilder
     processes = -1
-    executor = Choice('thread', 'process', 'dumb')
+    executor = Choice('thread', 'process', 'dumb', 'queue')
+    """
+    How to execute variants.
+
+    ``'process'`` is recommended for CPU-bound sweeps.  Each worker
+    process imports the class at `classpath` once and only the varied
+    parameters are sent to it.  Instead of the app, its results (and
+    those of nested executables) are sent back and set to an app
+    re-created in this process so that `variants` behaves as in
+    other executors; in the streaming mode (`stream`) nothing but
+    handles is sent back.  ``'thread'`` is suitable for sweeps which
+    release the GIL (e.g., I/O or numpy-heavy code) and ``'dumb'``
+    runs variants one by one in this thread.
+
+    ``'queue'`` puts variants in a directory (`queue_dir`) which is
+    watched by any number of worker processes, possibly on other
+    nodes sharing the file system::
+
+      capp worker QUEUE_DIR
+
+    Results are sent back as in ``'process'``.  See
+    `compapp.utils.filequeue`.
+    """
+
+    queue_dir = ''
+    """
+    Directory of the queue for the ``'queue'`` executor.  Default is
+    :file:`queue` under `datastore`, which is cleared (see
+    `.FileQueue.clear`) before submitting variants.  A directory given
+    here is not cleared since it may be shared by other sweeps.
+    """
+
+    queue_lease = 60.0
+    """
+    Variants claimed by a worker which has not sent a heartbeat for
+    this many seconds are put back to the queue.
+    """
+
+    maxtasksperchild = 0
+    """
+    Number of chunks a worker process executes before it is replaced
+    by a fresh one (``0`` means unlimited).  Only for the
+    ``'process'`` executor.  Use this to bound leaked memory.
+    """
+
     datastore_format = '{}'
     variants = OfType(list, isparam=False)
 
+    table = Choice('auto', 'none', 'npz', 'hdf5', 'parquet')
+    """
+    Format of the table of the varied parameters and the scalar (or
+    small array) results of each variant.  The table is written to
+    :file:`table.<format>` in the datastore and can be read by
+    `.read_table`.  ``'auto'`` means Parquet if ``pyarrow`` is
+    installed and npz otherwise.  Rows are appended to
+    :file:`table.jsonl` as variants finish and converted to the
+    columnar format at the end.
+    """
+
+    table_max_size = 16
+    """
+    Arrays with at most this many elements are included in the table.
+    """
+
+    stream = False
+    """
+    Execute variants in the streaming mode.
+
+    In the streaming mode, variants are passed to the pool as they
+    finish in a bounded window (`window`) and only
+    `VariantHandle`\\ s are kept in `handles`; the executed apps are
+    not kept in `variants`.  This makes the memory usage independent
+    of the number of variants.  Use this for large sweeps and read
+    the results from the datastore or the table (see `table`).
+    """
+
+    chunksize = 1
+    """
+    Number of variants sent to a worker at once.
+    """
+
+    window = 0
+    """
+    Maximum number of chunks in flight.  ``0`` means four times the
+    number of workers (or 1024 for the ``'queue'`` executor).
+    """
+
+    resume = Choice('no', 'skip', 'load', 'failed')
+    """
+    What to do with variants completed by a previous (interrupted)
+    run in the same datastore.  ``'skip'`` does not execute them at
+    all and ``'load'`` executes them in the ``'load'`` `.Assembler.mode`
+    so that their results are available in `variants`.  A variant is
+    considered completed if it is recorded as such in the sweep
+    manifest :file:`sweep.jsonl` and its :file:`params.json` matches
+    the planned parameters.  Other variants are (re-)run.
+    ``'failed'`` skips the variants recorded as finished or loaded in
+    the manifest (without checking :file:`params.json`) and runs all
+    others, i.e., the failed ones and the ones not reached by the
+    previous run.
+    """
+
+    on_error = Choice('raise', 'continue')
+    """
+    What to do when a variant fails (after `retries`).  In any case,
+    the failure is recorded in the sweep manifest and
+    :file:`failures.jsonl` (with the traceback and parameters).
+    ``'raise'`` then stops the sweep by raising `RuntimeError` with
+    the traceback.  ``'continue'`` goes on; failed variants are not
+    in `variants`.  Use `resume` ``= 'failed'`` to re-run only the
+    failed (and unfinished) variants.
+    """
+
+    retries = 0
+    """
+    Number of times a failed variant is retried.
+    """
+
+    retry_delay = 1.0
+    """
+    Seconds to wait before the first retry; doubled for each retry.
+    """
+
+    timeout = 0.0
+    """
+    Time limit in seconds for each execution of a variant (``0``
+    means no limit).  It is implemented by ``SIGALRM`` and hence
+    available only on Unix with the ``'process'``, ``'dumb'`` and
+    ``'queue'`` executors (``capp worker`` executes tasks in its main
+    thread).  A timed-out variant fails with `VariantTimeout`.
+    """
+
+    refiner, refinerpath = dynamic_class('.Refiner',
+                                         prefix='compapp.refinement')
+    """
+    Acquisition rule for adaptive refinement (see `compapp.refinement`).
+
+    After the variants given by `builder` are executed, points
+    proposed by the rule are executed in rounds until it proposes
+    nothing, `.Refiner.rounds` is reached or `.Refiner.budget`
+    variants are added.  The default rule does not refine.  Note that
+    the table rows of all variants are kept in memory while refining.
+    """
+
+    schedule = Choice('given', 'longest-first')
+    """
+    Order of execution.  ``'given'`` executes variants in the order
+    of `builder`.  ``'longest-first'`` sorts them by decreasing
+    estimated cost (see `cost` and `cost_from`) and submits them one
+    by one (`chunksize` is ignored) so that idle workers pick up the
+    next task dynamically.  Note that it holds all parameters of a
+    round in memory to sort them.  The indices (and hence datastore
+    directories) of variants do not depend on the schedule.
+    """
+
+    cost = ''
+    """
+    Dotted path to a function which takes the (nested) varied
+    parameters and returns an estimated cost.  If not given, the
+    wall time recorded by `.RecordTiming` in the sweeps `cost_from`
+    for the nearest parameters is used.
+    """
+
+    cost_from = List(str, default=[])
+    """
+    Datastore directories of previous sweeps whose timings are used
+    as cost estimates.  Default is the datastore of this sweep.
+    """
+
+    dedup_upstreams = True
+    """
+    Execute each distinct memoized upstream (an executable with
+    `.HashDataStore`, e.g., `.Memoizer`) only once before dispatching
+    the variants.
+
+    Variants which differ only in downstream parameters share the
+    same upstreams (i.e., the same hash).  Without this, each worker
+    computes them in parallel.  With this, the variants of each round
+    are instantiated (hence held in memory) in this process to find
+    the upstreams; then each distinct upstream not computed yet is
+    executed (in parallel) and the variants load it.  This is done
+    only when the class at `classpath` has memoized upstreams.  In
+    the `stream` mode, it is done for each chunk of 1024 variants.  An
+    upstream which cannot be executed without its owner (e.g., it has
+    a `.Link` to the owner) is computed in each variant as usual.
+    """
+
+    batch_size = 0
+    """
+    Maximum number of variants computed by one call of ``run_batch``.
+
+    If positive, the class at `classpath` must define a method
+    ``run_batch(self, params)`` which computes many variants at once
+    (e.g., vectorized by NumPy).  It is called on an instance
+    configured by `base` and `params` is a `dict` mapping the dotted
+    names of the varied parameters to arrays (one element per
+    variant).  It must return a `dict` mapping names of results to
+    sequences of the same length.  Consecutive variants varying the
+    same parameters are batched.  Each variant is then executed with
+    the precomputed results in place of its ``run``; i.e., plugins
+    still save the datastore of each variant.  See `execute_batch`.
+    When batching, `chunksize` is ignored.
+
+    Only ``run`` is batched: each variant is still instantiated and
+    executed with its plugins, and each batch additionally makes an
+    instance for ``run_batch``.  Hence batching does not make a sweep
+    of cheap variants faster; it helps only when ``run`` dominates the
+    cost of a variant.
+
+    Example::
+
+      class MyApp(Computer):
+          x = 0.0
+
+          def run(self):
+              self.results.y = numpy.sin(self.x)
+
+          def run_batch(self, params):
+              return dict(y=numpy.sin(params['x']))
+    """
+
+    handles = OfType(list, isparam=False)
+
+    utilization = OfType(dict, type(None), default=None, isparam=False)
+    """
+    Worker utilization report of the last run; see `.utilization`.
+    """
+
     def run(self):
         processes = None if self.processes == -1 else self.processes
+        if self.timeout > 0 and self.executor == 'thread':
+            raise ValueError("Variator.timeout is not supported by the"
+                             " 'thread' executor.")
+        if (self.executor == 'queue' and not self.queue_dir and
+                not self.datastore.is_writable()):
+            raise ValueError("Variator.queue_dir or datastore is required"
+                             " by the 'queue' executor.")
+        cls = self.__class__.classpath.getclass(self)
+        if self.batch_size > 0 and not hasattr(cls, 'run_batch'):
+            raise ValueError('Variator.batch_size is given but {0} does not'
+                             ' define run_batch.'.format(cls.__name__))
 
         if self.executor == 'dumb':
-            pmap = map
+            workers = 1
+
+            def pimap(func, tasks, ordered=True, chunksize=1):
+                return map(func, tasks)
+        elif self.executor == 'queue':
+            from .utils.filequeue import FileQueue
+            queue = FileQueue(self.queue_dir or self.datastore.path('queue'),
+                              lease=self.queue_lease)
+            if not self.queue_dir:
+                queue.clear()  # remove leftovers of an aborted run
+            self.log.info('Submitting variants to {0};'
+                          ' run "capp worker {0}" to execute them.'
+                          .format(queue.path))
+            workers = 0  # unknown; counted in report_utilization
+            window = self.window or 1024
+
+            def pimap(func, tasks, ordered, chunksize):
+                return queue.imap(func, tasks, window,
+                                  chunksize=chunksize, ordered=ordered)
         else:
             if self.executor == 'thread':
                 # Note: multiprocessing.dummy implements threading pool
                 from multiprocessing.dummy import Pool
+                pool = Pool(processes)
             else:
                 from multiprocessing import Pool
-            pool = Pool(processes)
-            pmap = pool.map
+                pool = Pool(processes, initializer=init_worker,
+                            initargs=(self.__class__.classpath.resolve(self),),
+                            maxtasksperchild=self.maxtasksperchild or None)
+            workers = processes or cpu_count()
+            window = self.window or 4 * workers
+
+            def pimap(func, tasks, ordered, chunksize):
+                return imap_bounded(pool, func, tasks, window,
+                                    chunksize=chunksize, ordered=ordered)
 
             self.defer()(pool.close)
             # Got "RuntimeError: can't start new thread" if I don't
@@ -75,15 +1017,208 @@ class Variator(Computer):
         base = self.base.params(nested=True)
 
         if self.datastore.is_writable():
+            aux = {}
+            if hasattr(getattr(cls, 'magics', None), 'sysinfo'):
+                # Share one system information snapshot in the sweep:
+                aux['magics'] = dict(sysinfo=dict(snapshotdir=os.path.abspath(
+                    self.datastore.path('sysinfo'))))
+
             def auxparam(i):
-                return dict(datastore=dict(dir=self.datastore.path(
+                return dict(aux, datastore=dict(dir=self.datastore.path(
                     self.datastore_format.format(i))))
         else:
             def auxparam(i):
                 return {}
 
-        self.variants = list(pmap(
-            execute,
-            ((self.__class__.classpath.getclass(self),
-              deepmixdicts(base, auxparam(i), param))
-             for i, param in enumerate(self.builder.build_params()))))
+        writer = manifest = None
+        if self.datastore.is_writable():
+            manifest = SweepManifest(self.datastore.path('sweep.jsonl'),
+                                     self.datastore.path('failures.jsonl'))
+            self.defer()(manifest.close)
+            if self.table != 'none':
+                writer = TableWriter(self.datastore.path('table'), self.table)
+                self.defer()(writer.close)
+        refiner = self.refiner
+        refine = refiner.rounds > 0 and refiner.budget > 0
+        rows = [] if refine else None
+        keys = list(self.builder.keys())
+        inprocess = self.executor in ('thread', 'dumb')
+        if self.stream:
+            send = None
+        else:
+            send = 'app' if inprocess else 'results'
+        func = functools.partial(
+            execute_variant,
+            keys=keys if writer is not None or refine else None,
+            max_size=self.table_max_size,
+            send=send,
+            retries=self.retries,
+            retry_delay=self.retry_delay,
+            timeout=self.timeout,
+            catch=True)  # raised after recorded; see on_error
+        if self.batch_size > 0:
+            func = functools.partial(execute_batch, base=base, **func.keywords)
+
+            def dispatch(tasks, ordered, chunksize):
+                return itertools.chain.from_iterable(pimap(
+                    func, group_tasks(tasks, self.batch_size),
+                    ordered=ordered, chunksize=1))
+        else:
+            def dispatch(tasks, ordered, chunksize):
+                return pimap(func, tasks, ordered=ordered,
+                             chunksize=chunksize)
+
+        self.variants = []
+        self.handles = []
+        apps = []
+
+        def tasks(indexed):
+            for i, param in indexed:
+                planned = deepmixdicts(base, auxparam(i), param)
+                entry = None
+                if manifest is None or self.resume == 'no':
+                    pass
+                elif self.resume == 'failed':
+                    entry = manifest.finished(i)
+                else:
+                    entry = manifest.completed(i, planned)
+                if entry is None:
+                    pass
+                elif self.resume in ('skip', 'failed'):
+                    self.handles.append(VariantHandle(
+                        i, param, entry.get('path'), 'skipped'))
+                    row = entry.get('row')
+                    if writer is not None and row is not None:
+                        writer.append(row)
+                    if rows is not None and row is not None:
+                        rows.append(row)
+                    continue
+                else:
+                    planned['mode'] = 'load'
+                    self.log.debug('Loading variant {0}'.format(i))
+                yield (None if self.executor == 'process' else cls,
+                       i, planned, param)
+
+        dedup = (self.dedup_upstreams and
+                 any(True for _ in memoized_upstreams(cls(base))))
+        sendclass = None if self.executor == 'process' else cls
+
+        def sweep_chunk(indexed):
+            if self.schedule == 'longest-first':
+                indexed = longest_first(list(indexed), self._cost_function())
+                results = dispatch(tasks(indexed),
+                                   ordered=False, chunksize=1)
+            else:
+                results = dispatch(tasks(indexed),
+                                   ordered=not self.stream,
+                                   chunksize=self.chunksize)
+            for handle, row, payload in results:
+                self.handles.append(handle)
+                if manifest is not None:
+                    manifest.record(handle, row)
+                if handle.status == 'failed':
+                    message = 'Variant {0} failed after {1} attempt(s):\n{2}' \
+                        .format(handle.index, handle.attempts, handle.error)
+                    if self.on_error == 'raise':
+                        raise RuntimeError(message)
+                    self.log.error(message)
+                    continue
+                if send == 'app':
+                    apps.append((handle.index, payload))
+                elif send == 'results':
+                    app = cls(deepmixdicts(base, auxparam(handle.index),
+                                           handle.params))
+                    restore_results(app, payload)
+                    apps.append((handle.index, app))
+                if writer is not None:
+                    writer.append(row)
+                if rows is not None:
+                    rows.append(row)
+
+        def sweep(params, start=0):
+            indexed = enumerate(params, start)
+            if not dedup:
+                sweep_chunk(indexed)
+                return
+            if self.stream:  # keep the memory usage bounded
+                chunks = chunked(indexed, _DEDUP_CHUNK)
+            else:
+                chunks = [list(indexed)]
+            for chunk in chunks:
+                self.compute_upstreams(
+                    (deepmixdicts(base, auxparam(i), p) for i, p in chunk),
+                    cls, sendclass, pimap)
+                sweep_chunk(chunk)
+
+        sweep(self.builder.build_params())
+
+        remaining = refiner.budget if refine else 0
+        for _ in range(refiner.rounds if refine else 0):
+            points = list(itertools.islice(refiner.propose(rows), remaining))
+            if not points:
+                break
+            self.log.info('Refinement: adding {0} variants'.format(
+                len(points)))
+            sweep(map(dotted_to_nested, points), len(self.handles))
+            remaining -= len(points)
+            if remaining <= 0:
+                break
+
+        apps.sort(key=lambda pair: pair[0])
+        self.variants = [app for _, app in apps]
+        self.handles.sort(key=lambda handle: handle.index)
+        self.report_utilization(workers)
+
+    def compute_upstreams(self, params, cls, sendclass, pimap):
+        """
+        Execute distinct memoized upstreams of the variants which are
+        not computed yet.  See `dedup_upstreams`.
+
+        `params` are the parameters of the variants (instances of
+        `cls`) and `sendclass` is the class sent to `execute_upstream`.
+
+        """
+        distinct = {}
+        total = 0
+        for param in params:
+            for path, upstream in memoized_upstreams(cls(param)):
+                total += 1
+                upstream.datastore.prepare()
+                key = upstream.datastore.dir
+                if key in distinct or upstream.is_loadable():
+                    continue
+                distinct[key] = (sendclass, param, path)
+        if not distinct:
+            return
+        self.log.info('Computing {0} distinct upstreams (used {1} times)'
+                      .format(len(distinct), total))
+        tasks = [distinct[k] for k in sorted(distinct)]
+        for error in pimap(execute_upstream, tasks, ordered=False,
+                           chunksize=1):
+            if error is not None:
+                self.log.warn('Upstream cannot be executed alone;'
+                              ' variants using it compute it:\n' + error)
+
+    def _cost_function(self):
+        keys = list(self.builder.keys())
+        if self.cost:
+            function = import_object(self.cost)
+            return lambda item: function(item[1])
+        dirs = list(self.cost_from)
+        if not dirs and self.datastore.is_writable():
+            dirs = [self.datastore.dir]
+        model = TimingCostModel.from_sweeps(keys, dirs)
+        return lambda item: model(flatten_point(item[1], keys))
+
+    def report_utilization(self, workers):
+        """
+        Compute `utilization` and record it in the meta data.
+        """
+        self.utilization = utilization(self.handles, workers)
+        if self.utilization is None:
+            return
+        self.log.info(
+            'Worker utilization: {utilization:.0%} of {workers} workers'
+            ' over {wall:.3g} s (tail: {tail:.3g} s)'
+            .format(**self.utilization))
+        self.magics.meta.record('utilization', self.utilization)